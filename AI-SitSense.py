@@ -1,31 +1,73 @@
 import av
 import os
+import atexit
 import sys
 import time
 import threading
 import traceback
 import subprocess
 import platform
-import requests
+import numpy as np
 import streamlit as st
 from typing import Optional
 from aiortc.contrib.media import MediaRecorder
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from streamlit_webrtc import VideoHTMLAttributes, webrtc_streamer
 
 BASE_DIR = os.path.abspath(os.path.join(__file__, '../../'))
 sys.path.append(BASE_DIR)
 
-from utils import get_mediapipe_pose
-from process import process, state_tracker
+from utils import get_mediapipe_pose, get_mediapipe_face_mesh
+from process import evaluate, face_mesh_required
 from frame_instance import FrameInstance
+from pose_pipeline import FaceMeshStage, build_pose_pipeline
+from session_registry import PosePool, SessionRegistry
+from landmark_store import LandmarkWriter
+from event_log import event_log
+from posture_store import PostureStore
+from report_jobs import DONE, FAILED, ReportCache, ReportClient, ReportJobs, build_report_payload
+
+# 关键帧之间最多用光流传播的帧数，1 表示每帧都运行完整推理
+KEYFRAME_MAX_INTERVAL = 6
+# 送入姿态模型的画面宽度，None 表示使用采集分辨率
+INFERENCE_WIDTH = 640
+# 只在上半身 ROI 内推理，跟丢时自动回到整帧搜索
+ROI_TRACKING = True
+# 同时在线会话可租用的姿态模型上限，以及会话空闲多久后回收（秒）
+MAX_POSE_INSTANCES = 16
+SESSION_IDLE_TIMEOUT = 300.0
+
+
+def build_face_mesh():
+    return FaceMeshStage(get_mediapipe_face_mesh())
+
 
-# 初始化 MediaPipe 姿态模型（全局共用，降低加载开销）
-pose = get_mediapipe_pose()
 output_video_file = "output_live.flv"
 
+# 可选：把每个会话的归一化关键点写成列式记录，之后可以不重新推理直接离线分析
+RECORD_LANDMARKS = False
+landmark_record_dir = "landmark_recordings"
+
+# 异步推理：视频回调不等待推理完成，直接用最近一次的结果标注当前帧
+ASYNC_INFERENCE = True
+
+# 本地 SQLite 坐姿记录：会话、片段与每分钟汇总，重启后仍可查看历史趋势；None 表示不持久化
+POSTURE_DB_PATH = "posture_history.db"
+# 历史页面汇总的天数
+HISTORY_DAYS = 30
+
+# 坐姿事件日志（JSON lines）的输出文件，None 表示写到标准输出
+EVENT_LOG_PATH = None
+event_log.set_path(EVENT_LOG_PATH)
+
 # DeepSeek API 配置
-DEEPSEEK_API_KEY = "sk-17391aedc9a54cdfb23ec38744989584"  # TODO: 放入安全存储
-DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
+# 密钥只从环境变量 DEEPSEEK_API_KEY 读取，未设置时不能生成报告；
+# DEEPSEEK_API_URL 可用环境变量覆盖，例如指向本地的替身服务做测试
+DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY", "")
+DEEPSEEK_API_URL = os.environ.get("DEEPSEEK_API_URL", "https://api.deepseek.com/chat/completions")
+# 已生成报告的缓存目录（按统计数据的哈希寻址），以及等待报告时轮询任务状态的间隔（秒）
+REPORT_CACHE_DIR = "report_cache"
+REPORT_POLL_INTERVAL = 1.0
 
 # 系统通知支持
 NOTIFICATION_AVAILABLE = False
@@ -111,65 +153,135 @@ def _trigger_system_notification(duration: float, posture_key: Optional[str]) ->
     threading.Thread(target=show_system_notification, args=(duration, posture_key), daemon=True).start()
 
 
-def call_deepseek_api(stats_data: dict) -> str:
-    """调用 DeepSeek API 生成坐姿分析报告"""
-    try:
-        prompt = f"""
-        你是一个专业的坐姿矫正师，请你依据坐姿检测数据说明用户存在的坐姿问题并且给出建议。
+def _check_alert(session, frame_instance=None) -> None:
+    alert_needed, posture_key, alert_duration = session.state_tracker.should_trigger_alert(
+        BAD_POSTURE_ALERT_THRESHOLD
+    )
+    if alert_needed:
+        _trigger_system_notification(alert_duration, posture_key)
+
+
+def landmark_recorder_factory(session_id: str) -> LandmarkWriter:
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}_{session_id[:8]}"
+    return LandmarkWriter(os.path.join(landmark_record_dir, name))
+
+
+@st.cache_resource
+def get_report_jobs() -> ReportJobs:
+    """进程级报告任务执行器：共用连接池与报告缓存"""
+    return ReportJobs(ReportClient(DEEPSEEK_API_URL, DEEPSEEK_API_KEY), ReportCache(REPORT_CACHE_DIR))
+
+
+def render_report_job() -> None:
+    """显示当前报告任务的结果；任务还在进行时由定时重跑的片段轮询状态，页面其余部分照常渲染"""
+    job_id = st.session_state['report_job']
+    job = get_report_jobs().status(job_id) if job_id is not None else None
+    if job is None:
+        return
+    if job.state == DONE:
+        st.markdown("### 坐姿评估报告")
+        st.info(job.report)
+        if job.cached:
+            st.caption("相同的检测统计已生成过报告，直接显示缓存结果。")
+    elif job.state == FAILED:
+        st.error(job.error)
+    else:
+        poll_report_job(job_id)
+
+
+@st.fragment(run_every=REPORT_POLL_INTERVAL)
+def poll_report_job(job_id: str) -> None:
+    """每 REPORT_POLL_INTERVAL 秒只重跑这一段检查任务状态，任务结束后整页重跑一次显示结果"""
+    job = get_report_jobs().status(job_id)
+    if job is None or job.state in (DONE, FAILED):
+        st.rerun()
+    st.info(f"正在调用AI完成坐姿评估（已等待 {time.time() - job.submitted_at:.0f} 秒），完成后会自动显示...")
+
+
+@st.cache_resource
+def get_posture_store() -> Optional[PostureStore]:
+    """进程级坐姿记录库，所有会话共用一个后台写线程；进程退出前提交队列中剩余的写入"""
+    if not POSTURE_DB_PATH:
+        return None
+    store = PostureStore(POSTURE_DB_PATH)
+    atexit.register(store.close)
+    return store
+
+
+@st.cache_resource
+def get_session_registry() -> SessionRegistry:
+    """进程级会话注册表：每个浏览器会话独立的状态跟踪器与租用的姿态模型"""
+    pose_pool = PosePool(
+        lambda: build_pose_pipeline(get_mediapipe_pose(), INFERENCE_WIDTH, ROI_TRACKING, KEYFRAME_MAX_INTERVAL),
+        max_size=MAX_POSE_INSTANCES,
+    )
+    # 只有注册的规则用到虹膜/面部关键点时才加载 Face Mesh，并且只在规则请求时运行
+    face_mesh_factory = build_face_mesh if face_mesh_required() else None
+    registry = SessionRegistry(pose_pool, face_mesh_factory, idle_timeout=SESSION_IDLE_TIMEOUT,
+                               async_inference=ASYNC_INFERENCE, on_result=_check_alert,
+                               recorder_factory=landmark_recorder_factory if RECORD_LANDMARKS else None,
+                               store=get_posture_store())
+    # 在记录库关闭之前（atexit 按注册的逆序执行）结束仍在线的会话
+    atexit.register(registry.close_all)
+    return registry
 
-        坐姿检测数据：
-        - 检测总时长：{stats_data['detection_duration']:.1f}秒
-        - 头部前倾：发生了{stats_data['forward_head_count']}次，平均每次持续{stats_data['forward_head_avg_duration']:.1f}秒
-        - 头部歪斜：发生了{stats_data['head_tilt_count']}次，平均每次持续{stats_data['head_tilt_avg_duration']:.1f}秒
-        - 脊柱侧弯：发生了{stats_data['spinal_curvature_count']}次，平均每次持续{stats_data['spinal_curvature_avg_duration']:.1f}秒
 
-        详细记录：
-        {stats_data['detailed_records']}
+def get_session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "default"
 
-        请用专业但易懂的语言，以200-300字分析问题、给出建议、指出注意事项。
-        """
 
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-        }
+def make_video_frame_callback(registry: SessionRegistry, session_id: str):
+    def callback(frame: av.VideoFrame) -> av.VideoFrame:
+        return video_frame_callback(frame, registry.get(session_id))
 
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "你是一个专业的坐姿矫正师，专注于帮助用户改善坐姿问题，预防颈椎和脊柱疾病。"
-                },
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": 0.7,
-            "max_tokens": 800,
-        }
-
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        return result['choices'][0]['message']['content']
-    except requests.exceptions.RequestException as exc:
-        return f"API调用失败: {exc}"
-    except Exception as exc:
-        return f"处理响应时出错: {exc}"
+    return callback
 
 
-def video_frame_callback(frame: av.VideoFrame) -> av.VideoFrame:
+def video_frame_callback(frame: av.VideoFrame, session) -> av.VideoFrame:
     """webrtc 视频帧回调：处理画面并触发后台通知"""
     try:
-        ndarray = frame.to_ndarray(format="rgb24")
-        processed = process(FrameInstance(ndarray, pose))
-
-        alert_needed, posture_key, alert_duration = state_tracker.should_trigger_alert(
-            BAD_POSTURE_ALERT_THRESHOLD
-        )
-        if alert_needed:
-            _trigger_system_notification(alert_duration, posture_key)
+        metrics = session.metrics
+        captured_at = time.time()
+        started = time.perf_counter()
+        session.frames += 1
+        metrics.count('frames_in')
+        metrics.input_rate.tick(started)
+        if session.pose is None:
+            # 姿态模型池已满，暂不标注，后续帧会继续尝试租用
+            metrics.count('dropped')
+            return frame
 
-        return av.VideoFrame.from_ndarray(processed, format="rgb24")
+        ndarray = frame.to_ndarray(format="rgb24")
+        decoded = time.perf_counter()
+        metrics.record('decode', decoded - started)
+        if session.worker is not None:
+            # 原始帧交给推理线程，输出帧只叠加最近一次完成的结果
+            session.worker.submit(ndarray, decoded)
+            overlay_started = time.perf_counter()
+            processed = session.worker.annotate(ndarray.copy())
+            metrics.record('overlay', time.perf_counter() - overlay_started)
+        else:
+            frame_instance = FrameInstance(ndarray, session.pose, session.face_mesh, deferred=True)
+            inferred = time.perf_counter()
+            evaluate(frame_instance, session.state_tracker, history=session.history)
+            overlay_started = time.perf_counter()
+            metrics.record('inference', inferred - decoded)
+            metrics.record('rules', overlay_started - inferred)
+            metrics.count('processed')
+            metrics.inference_rate.tick(overlay_started)
+            processed = frame_instance.flush()
+            overlay_finished = time.perf_counter()
+            metrics.record('overlay', overlay_finished - overlay_started)
+            # 关键点记录（文件追加）与提醒检查单独计时，不计入叠加层
+            session.record(frame_instance, captured_at)
+            _check_alert(session)
+            metrics.record('record', time.perf_counter() - overlay_finished)
+
+        encode_started = time.perf_counter()
+        output = av.VideoFrame.from_ndarray(processed, format="rgb24")
+        metrics.record('encode', time.perf_counter() - encode_started)
+        return output
     except Exception as exc:
         traceback.print_exc()
         raise exc
@@ -179,11 +291,50 @@ def out_recorder_factory() -> MediaRecorder:
     return MediaRecorder(output_video_file)
 
 
-def render_live_status(ctx) -> None:
+PIPELINE_STAGE_LABELS = {
+    "queue_wait": "排队等待",
+    "decode": "解码",
+    "inference": "姿态推理",
+    "rules": "坐姿规则",
+    "record": "记录与提醒",
+    "overlay": "叠加层",
+    "encode": "编码",
+}
+
+
+def render_pipeline_metrics(session) -> None:
+    """调试信息中的流水线健康状况：帧率、帧计数、结果延迟与各阶段耗时分位数"""
+    snapshot = session.metrics.snapshot()
+    counters = snapshot['counters']
+    cols = st.columns(4)
+    cols[0].metric("输入帧率", f"{snapshot['fps']['input']:.1f} FPS")
+    cols[1].metric("推理帧率", f"{snapshot['fps']['inference']:.1f} FPS")
+    cols[2].metric("已处理 / 输入", f"{counters['processed']} / {counters['frames_in']}")
+    cols[3].metric("丢弃帧", f"{counters['dropped']}")
+
+    if session.worker is not None:
+        result_age = session.worker.stats()['result_age']
+        age_text = f"{result_age * 1000:.0f} ms" if result_age is not None else "暂无结果"
+        st.caption(f"异步推理：当前标注对应的帧已过去 {age_text}")
+
+    rows = ["| 阶段 | p50 ms | p95 ms | p99 ms |", "| --- | ---: | ---: | ---: |"]
+    for stage, summary in snapshot['stages'].items():
+        rows.append(f"| {PIPELINE_STAGE_LABELS.get(stage, stage)} | {summary['p50']:.1f} | "
+                    f"{summary['p95']:.1f} | {summary['p99']:.1f} |")
+    if len(rows) > 2:
+        st.markdown("\n".join(rows))
+
+    log_stats = event_log.stats()
+    st.caption(f"事件日志：已写出 {log_stats['written']} 条，待写 {log_stats['pending']} 条，"
+               f"队列满丢弃 {log_stats['dropped']} 条，限速丢弃 {log_stats['rate_limited']} 条")
+
+
+def render_live_status(ctx, session) -> None:
     """展示融合自“开始锻炼”页面的实时姿态状态与调试信息"""
     st.subheader("实时坐姿状态")
     status_placeholder = st.empty()
 
+    state_tracker = session.state_tracker
     if ctx.state.playing:
         current_state = state_tracker.get_state()
         durations = {
@@ -228,6 +379,12 @@ def render_live_status(ctx) -> None:
                 cols[2].metric("肩膀不平", f"{durations['spinal_curvature']:.1f} 秒")
                 status_text = "已触发" if alert_needed else "等待阈值"
                 st.caption(f"系统通知监控：{status_text} (阈值 {BAD_POSTURE_ALERT_THRESHOLD:.0f}s)")
+                render_pipeline_metrics(session)
+                registry_stats = get_session_registry().stats()
+                pool_stats = registry_stats['pool']
+                st.caption(f"本会话内存约 {session.memory_bytes() / 1024:.0f} KB；"
+                           f"在线会话 {len(registry_stats['sessions'])} 个，"
+                           f"姿态模型 {pool_stats['leased']}/{pool_stats['max_size']} 已租用")
 
             if alert_needed:
                 label = POSTURE_LABELS.get(alert_key, "不良坐姿")
@@ -239,16 +396,52 @@ def render_live_status(ctx) -> None:
             st.info("等待启动摄像头... 点击上方“实时检测”中的按钮以开始。")
 
 
-def render_detection_dashboard(ctx):
+def duration_records(posture_stats) -> list:
+    """一种姿势最近几次的持续时间记录，序号接着会话中的总次数"""
+    return [f"第{i}次: {duration:.1f} 秒"
+            for i, duration in enumerate(posture_stats['durations'], posture_stats['first_index'])]
+
+
+def duration_quantiles_text(posture_stats) -> str:
+    """已结束片段持续时间的分位数，如 “p50 18.2 / p90 41.0 / p99 75.3 秒”"""
+    quantiles = posture_stats['quantiles']
+    return " / ".join(f"p{q} {value:.1f}" for q, value in quantiles.items()) + " 秒"
+
+
+# 趋势图可选的时间范围（秒）与各项指标的名称，顺序与 metric_history.METRIC_NAMES 一致
+HISTORY_WINDOWS = {"最近 1 分钟": 60, "最近 1 小时": 3600, "最近 1 天": 86400}
+HISTORY_METRIC_LABELS = ("头部前倾角 (°)", "歪头偏差 (°)", "肩膀高度差 (px)")
+
+
+def render_metric_history(session) -> None:
+    """坐姿指标趋势：按所选范围从对应的降采样层读取，不扫描原始帧"""
+    window_label = st.radio("趋势范围", list(HISTORY_WINDOWS), horizontal=True, key="history_window")
+    resolution, buckets = session.history.series(HISTORY_WINDOWS[window_label])
+    if len(buckets) == 0:
+        st.caption("暂无足够的数据绘制趋势")
+        return
+
+    data = {"分钟": (buckets['time'] - session.history.latest_time()) / 60}
+    for k, label in enumerate(HISTORY_METRIC_LABELS):
+        data[label] = buckets['mean'][:, k]
+    st.line_chart(data, x="分钟")
+
+    ranges = " | ".join(f"{label} {np.nanmin(buckets['min'][:, k]):.0f}~{np.nanmax(buckets['max'][:, k]):.0f}"
+                        for k, label in enumerate(HISTORY_METRIC_LABELS)) if buckets['valid'].any() else "无有效帧"
+    st.caption(f"每个点为 {resolution} 秒内有效帧的均值；范围内最小~最大：{ranges}")
+
+
+def render_detection_dashboard(ctx, session):
     """原 AI 页面中的检测统计与 DeepSeek 评估逻辑"""
     st.subheader("检测统计")
 
+    state_tracker = session.state_tracker
     if ctx.state.playing:
         if st.session_state['detection_start_time'] is None:
             st.session_state['detection_start_time'] = time.time()
             state_tracker.reset_stats()
             st.session_state['detection_completed'] = False
-            st.session_state['deepseek_response'] = None
+            st.session_state['report_job'] = None
 
         detection_duration = time.time() - st.session_state['detection_start_time']
         current_stats = state_tracker.get_all_stats()
@@ -264,6 +457,8 @@ def render_detection_dashboard(ctx):
         col3.metric("脊柱侧弯次数", current_stats['spinal_curvature']['count'])
         col3.metric("平均持续", f"{current_stats['spinal_curvature']['avg_duration']:.1f} 秒")
 
+        render_metric_history(session)
+
         total_bad_postures = (
             current_stats['forward_head']['count'] +
             current_stats['head_tilt']['count'] +
@@ -274,22 +469,23 @@ def render_detection_dashboard(ctx):
             with st.expander("实时详细记录", expanded=False):
                 if current_stats['forward_head']['count'] > 0:
                     st.write("**头部前倾记录：**")
-                    for i, duration in enumerate(current_stats['forward_head']['durations'], 1):
-                        st.write(f"第{i}次: {duration:.1f} 秒")
+                    for record in duration_records(current_stats['forward_head']):
+                        st.write(record)
                 if current_stats['head_tilt']['count'] > 0:
                     st.write("**歪头记录：**")
-                    for i, duration in enumerate(current_stats['head_tilt']['durations'], 1):
-                        st.write(f"第{i}次: {duration:.1f} 秒")
+                    for record in duration_records(current_stats['head_tilt']):
+                        st.write(record)
                 if current_stats['spinal_curvature']['count'] > 0:
                     st.write("**脊柱侧弯记录：**")
-                    for i, duration in enumerate(current_stats['spinal_curvature']['durations'], 1):
-                        st.write(f"第{i}次: {duration:.1f} 秒")
+                    for record in duration_records(current_stats['spinal_curvature']):
+                        st.write(record)
     else:
         if st.session_state['detection_start_time'] is not None and not st.session_state['detection_completed']:
             detection_duration = time.time() - st.session_state['detection_start_time']
             st.session_state['detection_duration'] = detection_duration
             st.session_state['detection_completed'] = True
             st.session_state['final_stats'] = state_tracker.get_all_stats()
+            session.save_stats(st.session_state['final_stats'])
             st.session_state['detection_start_time'] = None
 
         if st.session_state['detection_completed'] and st.session_state['final_stats']:
@@ -310,6 +506,9 @@ def render_detection_dashboard(ctx):
             col2.metric("平均持续", f"{final_stats['head_tilt']['avg_duration']:.1f} 秒")
             col3.metric("脊柱侧弯次数", spinal_curvature_count)
             col3.metric("平均持续", f"{final_stats['spinal_curvature']['avg_duration']:.1f} 秒")
+            col1.caption(duration_quantiles_text(final_stats['forward_head']))
+            col2.caption(duration_quantiles_text(final_stats['head_tilt']))
+            col3.caption(duration_quantiles_text(final_stats['spinal_curvature']))
 
             total_bad_postures = forward_head_count + head_tilt_count + spinal_curvature_count
             if total_bad_postures == 0:
@@ -323,47 +522,65 @@ def render_detection_dashboard(ctx):
                 detailed_records = []
                 if forward_head_count > 0:
                     st.write("**头部前倾记录：**")
-                    for i, duration in enumerate(final_stats['forward_head']['durations'], 1):
-                        record = f"第{i}次: {duration:.1f} 秒"
+                    for record in duration_records(final_stats['forward_head']):
                         st.write(record)
                         detailed_records.append(record)
                 if head_tilt_count > 0:
                     st.write("**歪头记录：**")
-                    for i, duration in enumerate(final_stats['head_tilt']['durations'], 1):
-                        record = f"第{i}次: {duration:.1f} 秒"
+                    for record in duration_records(final_stats['head_tilt']):
                         st.write(record)
                         detailed_records.append(record)
                 if spinal_curvature_count > 0:
                     st.write("**脊柱侧弯记录：**")
-                    for i, duration in enumerate(final_stats['spinal_curvature']['durations'], 1):
-                        record = f"第{i}次: {duration:.1f} 秒"
+                    for record in duration_records(final_stats['spinal_curvature']):
                         st.write(record)
                         detailed_records.append(record)
 
                 st.markdown("---")
                 st.subheader("AI 坐姿评估")
 
-                if st.button("生成坐姿评估报告", type="primary"):
-                    with st.spinner("正在调用AI完成坐姿评估，请稍候..."):
-                        stats_data = {
-                            'detection_duration': detection_duration,
-                            'forward_head_count': forward_head_count,
-                            'forward_head_avg_duration': final_stats['forward_head']['avg_duration'],
-                            'head_tilt_count': head_tilt_count,
-                            'head_tilt_avg_duration': final_stats['head_tilt']['avg_duration'],
-                            'spinal_curvature_count': spinal_curvature_count,
-                            'spinal_curvature_avg_duration': final_stats['spinal_curvature']['avg_duration'],
-                            'detailed_records': "\n".join(detailed_records) or "检测期间未记录详细问题。",
-                        }
-                        st.session_state['deepseek_response'] = call_deepseek_api(stats_data)
-
-                if st.session_state['deepseek_response']:
-                    st.markdown("### 坐姿评估报告")
-                    st.info(st.session_state['deepseek_response'])
+                if not DEEPSEEK_API_KEY:
+                    st.warning("未设置环境变量 DEEPSEEK_API_KEY，无法生成坐姿评估报告。")
+                if st.button("生成坐姿评估报告", type="primary", disabled=not DEEPSEEK_API_KEY):
+                    stats_data = {
+                        'detection_duration': detection_duration,
+                        'forward_head_count': forward_head_count,
+                        'forward_head_avg_duration': final_stats['forward_head']['avg_duration'],
+                        'head_tilt_count': head_tilt_count,
+                        'head_tilt_avg_duration': final_stats['head_tilt']['avg_duration'],
+                        'spinal_curvature_count': spinal_curvature_count,
+                        'spinal_curvature_avg_duration': final_stats['spinal_curvature']['avg_duration'],
+                        'detailed_records': "\n".join(detailed_records) or "检测期间未记录详细问题。",
+                    }
+                    # 后台生成，页面不等待网络请求；相同的统计直接取缓存
+                    st.session_state['report_job'] = get_report_jobs().submit(build_report_payload(stats_data))
+
+                render_report_job()
         else:
             st.info("点击上方“开始”按钮即可开启新一轮检测。")
 
 
+def render_posture_history() -> None:
+    """最近 HISTORY_DAYS 天每天各类不良姿势的次数与平均持续时间，数据来自本地坐姿记录库"""
+    store = get_posture_store()
+    if store is None:
+        return
+    st.subheader("历史趋势")
+    now = time.time()
+    rows = store.daily_summary(now - HISTORY_DAYS * 86400, now)
+    if not rows:
+        st.caption("还没有历史记录，完成检测后会自动保存。")
+        return
+
+    days = sorted({day for day, *_ in rows})
+    counts = {label: [0] * len(days) for label in POSTURE_LABELS.values()}
+    for day, posture, count, avg_duration, total_duration in rows:
+        if posture in POSTURE_LABELS:
+            counts[POSTURE_LABELS[posture]][days.index(day)] = count
+    st.bar_chart({"日期": days, **counts}, x="日期")
+    st.caption(f"最近 {HISTORY_DAYS} 天每天计数的不良姿势次数")
+
+
 def render_download_section():
     st.markdown("---")
     download_button = st.empty()
@@ -389,7 +606,7 @@ def render_app():
     # 初始化会话状态
     st.session_state.setdefault('download', False)
     st.session_state.setdefault('detection_start_time', None)
-    st.session_state.setdefault('deepseek_response', None)
+    st.session_state.setdefault('report_job', None)
     st.session_state.setdefault('detection_completed', False)
     st.session_state.setdefault('final_stats', None)
     st.session_state.setdefault('detection_duration', 0.0)
@@ -403,10 +620,15 @@ def render_app():
         - 检测结束后可调用 AI 生成个性化建议
         """)
 
+    registry = get_session_registry()
+    session_id = get_session_id()
+    # 只读取会话状态；姿态模型在视频帧到达时才租用
+    session = registry.get(session_id, lease=False)
+
     st.subheader("实时检测")
     ctx = webrtc_streamer(
         key="posture-monitor",
-        video_frame_callback=video_frame_callback,
+        video_frame_callback=make_video_frame_callback(registry, session_id),
         rtc_configuration={"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]},
         media_stream_constraints={
             "video": {
@@ -424,8 +646,9 @@ def render_app():
         out_recorder_factory=out_recorder_factory,
     )
 
-    render_live_status(ctx)
-    render_detection_dashboard(ctx)
+    render_live_status(ctx, session)
+    render_detection_dashboard(ctx, session)
+    render_posture_history()
     render_download_section()
 
 
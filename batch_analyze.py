@@ -0,0 +1,189 @@
+"""
+离线批量分析：不经过浏览器，对录制的视频（如 output_live.flv）重新评分。
+视频按时间切成若干段，在进程池中并行处理，每个工作进程持有自己的姿态模型；
+每段运行与实时检测相同的 FrameInstance -> trainer_process -> StateTracker 流程，
+最后按帧时间提取不良姿势片段，并把跨越分段边界的片段合并。
+
+用法：
+    python batch_analyze.py output_live.flv --workers 8 --chunk-seconds 120 --json report.json
+"""
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import av
+import cv2
+
+from episodes import POSTURE_TYPES, tracker_active_flags, extract_episodes, merge_chunk_episodes, \
+    summarize_episodes
+
+# 单个分段的处理结果
+ChunkResult = namedtuple('ChunkResult', 'index start end frames valid_frames episodes elapsed')
+
+# 工作进程内的姿态模型，由 _init_worker 创建，进程内所有分段复用
+_worker_pose = None
+
+
+def probe_time_range(path):
+    """返回视频流的 (起始时间, 结束时间)，单位秒"""
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        start = float(stream.start_time * stream.time_base) if stream.start_time is not None else 0.0
+        if stream.duration is not None:
+            return start, start + float(stream.duration * stream.time_base)
+        if container.duration is not None:
+            return start, start + container.duration / av.time_base
+
+        # 直播录制的 FLV 常常没有时长信息：只解复用不解码，取最后一个包的时间戳
+        end = start
+        for packet in container.demux(stream):
+            if packet.pts is not None:
+                end = max(end, float((packet.pts + (packet.duration or 0)) * stream.time_base))
+        return start, end
+
+
+def split_chunks(start, end, chunk_seconds):
+    """切分为首尾相接的时间段；首段和末段向外延伸，保证不会漏掉边缘的帧"""
+    count = max(1, int((end - start) // chunk_seconds) + (1 if (end - start) % chunk_seconds else 0))
+    bounds = [start + i * chunk_seconds for i in range(count + 1)]
+    bounds[0] = float('-inf')
+    bounds[-1] = float('inf')
+    return [(i, bounds[i], bounds[i + 1]) for i in range(count)]
+
+
+def _init_worker(inference_width, roi_tracking, keyframe_interval):
+    """每个工作进程只创建一次模型；OpenCV 限制为单线程，避免多进程之间争抢核心"""
+    global _worker_pose
+    cv2.setNumThreads(1)
+
+    # 延迟导入：mediapipe 与规则模块只在工作进程中加载
+    import trainer_process_example
+    from event_log import event_log
+    from utils import get_mediapipe_pose
+    from pose_pipeline import build_pose_pipeline
+
+    trainer_process_example.SOUND_ENABLED = False
+    # 坐姿事件写到标准输出会混进汇总结果，且 atexit 不在工作进程中执行，队列尾部会丢失；离线分析不需要
+    event_log.enabled = False
+    _worker_pose = build_pose_pipeline(get_mediapipe_pose(), inference_width, roi_tracking, keyframe_interval)
+
+
+def analyze_chunk(path, index, start, end, warmup=1.0):
+    """
+    处理 [start, end) 内的帧。分段开头之前 warmup 秒的帧只送入姿态模型，
+    让跟踪状态稳定下来，不参与坐姿判断
+    """
+    from frame_instance import FrameInstance
+    from process import create_state_tracker, evaluate
+    from state_tracker import FrameClock
+
+    began = time.perf_counter()
+    _worker_pose.reset()
+    # StateTracker 按视频时间计时，在分段的第一帧才创建，避免把分段之前的时间算作无活动
+    clock = FrameClock()
+    state_tracker = None
+    timestamps = []
+    active = []
+    next_timestamp = None
+    frames = valid_frames = 0
+
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        seek_to = start - warmup
+        if seek_to > 0:
+            try:
+                # 跳到目标时间之前最近的关键帧
+                container.seek(int(seek_to / stream.time_base), stream=stream, backward=True)
+            except av.error.FFmpegError:
+                # 不支持随机访问的文件只能从头解码
+                container.seek(0)
+
+        for frame in container.decode(stream):
+            t = frame.time
+            if t is None or t < seek_to:
+                continue
+            if t >= end:
+                next_timestamp = t
+                break
+
+            frame_instance = FrameInstance(frame.to_ndarray(format="rgb24"), _worker_pose, deferred=True)
+            if t < start:
+                continue
+
+            clock.set(t)
+            if state_tracker is None:
+                state_tracker = create_state_tracker(clock)
+            evaluate(frame_instance, state_tracker)
+            frame_instance.flush(render=False)
+            frames += 1
+            valid_frames += bool(frame_instance.validate())
+            timestamps.append(t)
+            active.append(tracker_active_flags(state_tracker))
+
+    return ChunkResult(index, start, end, frames, valid_frames,
+                       extract_episodes(timestamps, active, next_timestamp=next_timestamp),
+                       time.perf_counter() - began)
+
+
+def analyze_video(path, workers=None, chunk_seconds=120.0, warmup=1.0,
+                  inference_width=640, roi_tracking=True, keyframe_interval=1):
+    """并行分析整段视频，返回 (合并后的片段列表, 各分段结果)"""
+    workers = workers or os.cpu_count() or 1
+    start, end = probe_time_range(path)
+    chunks = split_chunks(start, end, chunk_seconds)
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker,
+                             initargs=(inference_width, roi_tracking, keyframe_interval)) as executor:
+        futures = [executor.submit(analyze_chunk, path, index, chunk_start, chunk_end, warmup)
+                   for index, chunk_start, chunk_end in chunks]
+        results = [future.result() for future in futures]
+
+    results.sort(key=lambda r: r.index)
+    return merge_chunk_episodes([r.episodes for r in results]), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数，默认为 CPU 核数')
+    parser.add_argument('--chunk-seconds', type=float, default=120.0, help='每个分段的时长（秒）')
+    parser.add_argument('--warmup', type=float, default=1.0, help='分段开头预热姿态模型的时长（秒）')
+    parser.add_argument('--inference-width', type=int, default=640)
+    parser.add_argument('--no-roi', action='store_true', help='关闭上半身 ROI 跟踪')
+    parser.add_argument('--keyframe-interval', type=int, default=1,
+                        help='关键帧间隔，1 表示每帧都运行完整推理')
+    parser.add_argument('--json', help='把统计与片段写入 JSON 文件')
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    episodes, results = analyze_video(
+        args.video, args.workers, args.chunk_seconds, args.warmup,
+        args.inference_width, not args.no_roi, args.keyframe_interval,
+    )
+    elapsed = time.perf_counter() - began
+    stats = summarize_episodes(episodes)
+
+    frames = sum(r.frames for r in results)
+    valid_frames = sum(r.valid_frames for r in results)
+    print(f"{len(results)} 个分段，{frames} 帧（检出 {valid_frames} 帧），"
+          f"耗时 {elapsed:.1f} 秒，{frames / max(elapsed, 1e-9):.1f} 帧/秒")
+    for posture in POSTURE_TYPES:
+        print(f"{posture:>18}: {stats[posture]['count']} 次，"
+              f"平均持续 {stats[posture]['avg_duration']:.1f} 秒")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'video': args.video,
+                'frames': frames,
+                'valid_frames': valid_frames,
+                'stats': stats,
+                'episodes': [e._asdict() for e in episodes],
+            }, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
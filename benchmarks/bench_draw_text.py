@@ -0,0 +1,82 @@
+"""
+draw_text 微基准：对比逐次加载字体的旧实现与字体/字形缓存后的实现
+
+用法：
+    python benchmarks/bench_draw_text.py --frames 200 --font simhei.ttf
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+import utils
+
+# 一帧内 trainer_process 与 StateTracker.after_process 绘制的典型文本
+HUD_LINES = [
+    ('处于不良坐姿', (40, 580)),
+    ('头部前倾 + 歪头', (40, 630)),
+    ('前倾: 112° | 歪斜: 17.5° | 肩膀差: 24px', (40, 680)),
+    ('不良坐姿 - 前倾: 12.3秒 | 歪头: 4.1秒', (720, 30)),
+]
+
+
+def legacy_draw_text(img, text, pos, text_color, bg_color, font_path):
+    """旧实现：每次调用都重新打开并解析字体文件"""
+    font = ImageFont.truetype(font_path, 20, encoding="utf-8")
+    left, top, right, bottom = font.getbbox(text)
+    text_w, text_h = right - left, bottom - top
+    x, y = pos
+    rec_start = (x - 20, y - 10)
+    rec_end = (x + text_w - 5, y + text_h + 10)
+    img = utils.draw_rounded_rect(img, rec_start, rec_end, 8, bg_color)
+
+    pil_img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    font = ImageFont.truetype(font_path, 20, encoding="utf-8")
+    ImageDraw.Draw(pil_img).text((rec_start[0] + 10, y + text_h - 18), text, text_color, font=font)
+    return cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+
+
+def cached_draw_text(img, text, pos, text_color, bg_color, font_path):
+    return utils.draw_text(img, text, pos=pos, text_color=text_color, text_color_bg=bg_color)
+
+
+def run(draw, frames, width, height, font_path):
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    for _ in range(frames):
+        img = frame.copy()
+        for text, pos in HUD_LINES:
+            img = draw(img, text, pos, (255, 255, 230), (221, 0, 0), font_path)
+    elapsed = time.perf_counter() - start
+    return frames / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=960)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--font', default=utils.FONT_PATH)
+    args = parser.parse_args()
+
+    # draw_text 使用模块级默认字体
+    utils.FONT_PATH = args.font
+
+    before = run(legacy_draw_text, args.frames, args.width, args.height, args.font)
+    # 预热：第一帧完成字形光栅化
+    run(cached_draw_text, 1, args.width, args.height, args.font)
+    after = run(cached_draw_text, args.frames, args.width, args.height, args.font)
+
+    print(f"分辨率 {args.width}x{args.height}，每帧 {len(HUD_LINES)} 次 draw_text")
+    print(f"优化前: {before:8.1f} 帧/秒")
+    print(f"优化后: {after:8.1f} 帧/秒  (x{after / before:.2f})")
+
+
+if __name__ == '__main__':
+    main()
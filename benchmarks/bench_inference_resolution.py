@@ -0,0 +1,81 @@
+"""
+推理分辨率扫描：对同一段视频按不同推理宽度运行姿态模型，
+报告每帧推理耗时与检测角度相对采集分辨率结果的漂移
+
+用法：
+    python benchmarks/bench_inference_resolution.py output_live.flv --widths 960 640 480 320 --frames 300
+"""
+import argparse
+import os
+import sys
+import time
+
+import av
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from utils import get_mediapipe_pose
+from frame_instance import FrameInstance
+from pose_pipeline import ScaledPose
+from trainer_process_example import HEAD_FORWARD_ANGLE, calculate_head_tilt_angle, calculate_shoulder_level
+
+
+def load_frames(path, max_frames):
+    frames = []
+    with av.open(path) as container:
+        for frame in container.decode(video=0):
+            frames.append(frame.to_ndarray(format="rgb24"))
+            if len(frames) >= max_frames:
+                break
+    return frames
+
+
+def measure(frames, width):
+    """返回 (每帧推理耗时数组, 每帧 [前倾角, 歪斜偏差, 肩膀差] 数组，未检测到为 NaN)"""
+    pose = ScaledPose(get_mediapipe_pose(), width=width)
+    latencies = np.empty(len(frames))
+    metrics = np.full((len(frames), 3), np.nan)
+
+    for i, frame in enumerate(frames):
+        start = time.perf_counter()
+        frame_instance = FrameInstance(frame, pose)
+        latencies[i] = time.perf_counter() - start
+
+        if frame_instance.validate():
+            tilt = calculate_head_tilt_angle(frame_instance.get_coord('left_ear'), frame_instance.get_coord('right_ear'))
+            metrics[i] = (
+                frame_instance.get_angle(HEAD_FORWARD_ANGLE),
+                min(abs(tilt - 180), abs(tilt - 0)),
+                calculate_shoulder_level(frame_instance.get_coord('left_shldr'), frame_instance.get_coord('right_shldr')),
+            )
+    return latencies, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video')
+    parser.add_argument('--widths', type=int, nargs='+', default=[960, 640, 480, 320, 256])
+    parser.add_argument('--frames', type=int, default=300)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, args.frames)
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} 帧，采集分辨率 {width}x{height}")
+
+    # 以采集分辨率的结果为基准
+    _, reference = measure(frames, None)
+
+    print(f"{'推理宽度':>8} {'p50 ms':>8} {'p95 ms':>8} {'检出率':>7} "
+          f"{'前倾漂移°':>10} {'歪斜漂移°':>10} {'肩膀差漂移px':>12}")
+    for inference_width in args.widths:
+        latencies, metrics = measure(frames, inference_width)
+        drift = np.nanmean(np.abs(metrics - reference), axis=0)
+        detected = np.mean(~np.isnan(metrics[:, 0]))
+        p50, p95 = np.percentile(latencies * 1000, [50, 95])
+        print(f"{inference_width:>8} {p50:>8.1f} {p95:>8.1f} {detected:>7.1%} "
+              f"{drift[0]:>10.2f} {drift[1]:>10.2f} {drift[2]:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+逐阶段延迟基准：用合成画面和按脚本输出关键点的假姿态模型，
+按 video_frame_callback 的顺序计时每个阶段，不需要摄像头和模型文件：
+    to_ndarray -> FrameInstance 构造 -> process.evaluate -> DisplayList.composite -> from_ndarray
+延迟模式下 evaluate 中的绘制调用只记录图元，叠加层的渲染开销全部计入 composite；
+recomposite 为异步推理把同一叠加层合成到下一帧上的开销。
+--immediate 时绘制在 evaluate 内完成，另外按文本分别列出每个 draw_text 的耗时。
+
+每个分辨率报告各阶段的 p50/p95/p99（毫秒）。--save-baseline 保存结果，
+--baseline 与保存的结果比较，任一阶段的 p50 或 p95 超出容差时以非零状态退出。
+
+用法：
+    python benchmarks/bench_pipeline.py --font simhei.ttf --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --font simhei.ttf --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+import av
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+import utils
+import trainer_process_example
+from event_log import event_log
+from frame_instance import FrameInstance
+from pose_pipeline import PoseResult
+from process import create_state_tracker, evaluate
+from state_tracker import FrameClock
+
+RESOLUTIONS = {
+    '480p': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+}
+
+# 比较基线时忽略低于该值的绝对增量（毫秒），避免微秒级阶段的计时噪声误报
+MIN_REGRESSION_MS = 0.05
+
+FPS = 30.0
+
+
+class StageTimer:
+    """按阶段收集每次耗时（秒）"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def summary(self):
+        """{阶段: {'p50', 'p95', 'p99', 'calls'}}，单位毫秒"""
+        result = {}
+        for stage, samples in self.samples.items():
+            p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+            result[stage] = {'p50': p50, 'p95': p95, 'p99': p99, 'calls': len(samples)}
+        return result
+
+
+class TimedFrameInstance(FrameInstance):
+    """立即绘制模式下给每次 draw_text 计时，按去掉数字后的文本归类，动态文本归到同一个阶段"""
+    __slots__ = ()
+    timer = None
+
+    def draw_text(self, text, *args, **kwargs):
+        start = time.perf_counter()
+        super().draw_text(text, *args, **kwargs)
+        self.timer.record('draw_text:' + re.sub(r'[\d.]+', '#', text), time.perf_counter() - start)
+
+
+class ScriptedPose:
+    """
+    确定性的假姿态模型：按脚本依次输出良好、头部前倾、歪头、肩膀不平的姿势与未检测到人体的帧，
+    并叠加小幅正弦晃动，使含数字的文本每帧都在变化
+    """
+
+    # 每种姿势持续的帧数
+    SEGMENT = 90
+
+    def __init__(self):
+        base = np.zeros((33, 4), dtype=np.float32)
+        base[:, 3] = 1.0
+        base[:, :2] = 0.5
+        base[0, :2] = (0.50, 0.35)   # 鼻子
+        base[7, :2] = (0.58, 0.33)   # 左耳
+        base[8, :2] = (0.42, 0.33)   # 右耳
+        base[11, :2] = (0.65, 0.60)  # 左肩
+        base[12, :2] = (0.35, 0.60)  # 右肩
+
+        forward = base.copy()
+        forward[0, 1] = 0.50
+        tilt = base.copy()
+        tilt[7, 1] += 0.08
+        uneven = base.copy()
+        uneven[11, 1] += 0.08
+        self.script = [base, forward, tilt, uneven, None]
+        self.i = 0
+
+    def process(self, frame):
+        landmarks = self.script[(self.i // self.SEGMENT) % len(self.script)]
+        if landmarks is not None:
+            landmarks = landmarks.copy()
+            landmarks[:, :2] += 0.005 * np.sin(self.i * 0.3)
+        self.i += 1
+        return PoseResult(landmarks)
+
+    def reset(self):
+        self.i = 0
+
+
+def synthetic_frames(width, height, count=8):
+    """几帧带渐变与噪声的 av.VideoFrame，循环使用"""
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    frames = []
+    for _ in range(count):
+        image = np.clip(gradient + rng.normal(0, 20, (height, width, 3)), 0, 255).astype(np.uint8)
+        frames.append(av.VideoFrame.from_ndarray(image, format="rgb24"))
+    return frames
+
+
+def run_resolution(width, height, frames, warmup, deferred=True):
+    timer = StageTimer()
+    TimedFrameInstance.timer = timer
+    instance_type = FrameInstance if deferred else TimedFrameInstance
+    clock = FrameClock()
+    state_tracker = create_state_tracker(clock)
+    pose = ScriptedPose()
+    inputs = synthetic_frames(width, height)
+
+    for i in range(warmup + frames):
+        if i == warmup:
+            timer.samples.clear()
+        clock.advance(1 / FPS)
+        frame = inputs[i % len(inputs)]
+        began = time.perf_counter()
+
+        start = time.perf_counter()
+        ndarray = frame.to_ndarray(format="rgb24")
+        timer.record('to_ndarray', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        frame_instance = instance_type(ndarray, pose, deferred=deferred)
+        timer.record('frame_instance', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        evaluate(frame_instance, state_tracker)
+        timer.record('evaluate', time.perf_counter() - start)
+
+        # 与 frame_instance.flush() 相同的合成，保留图元以便再测一次重复合成
+        next_frame = ndarray.copy() if deferred else None
+        start = time.perf_counter()
+        processed = frame_instance.canvas.composite(ndarray, clear=False)
+        timer.record('composite', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        av.VideoFrame.from_ndarray(processed, format="rgb24")
+        timer.record('from_ndarray', time.perf_counter() - start)
+        timer.record('total', time.perf_counter() - began)
+
+        if deferred:
+            start = time.perf_counter()
+            frame_instance.canvas.composite(next_frame, clear=False)
+            timer.record('recomposite', time.perf_counter() - start)
+            frame_instance.canvas.clear()
+    return timer.summary()
+
+
+def compare(results, baseline, tolerance):
+    """返回超出容差的 (分辨率, 阶段, 指标, 基线, 当前) 列表"""
+    regressions = []
+    for resolution, stages in results.items():
+        for stage, current in stages.items():
+            reference = baseline.get(resolution, {}).get(stage)
+            if reference is None:
+                continue
+            for key in ('p50', 'p95'):
+                limit = max(reference[key] * (1 + tolerance), reference[key] + MIN_REGRESSION_MS)
+                if current[key] > limit:
+                    regressions.append((resolution, stage, key, reference[key], current[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resolutions', nargs='+', choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument('--frames', type=int, default=450)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--font', help='中文字体路径，默认使用 utils.FONT_PATH')
+    parser.add_argument('--immediate', action='store_true',
+                        help='使用立即绘制的画布（draw_text 内直接渲染），默认与实时检测相同的延迟合成')
+    parser.add_argument('--save-baseline', help='把结果保存为基线 JSON')
+    parser.add_argument('--baseline', help='与基线 JSON 比较')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的相对回退比例')
+    args = parser.parse_args()
+
+    if args.font:
+        utils.FONT_PATH = args.font
+    trainer_process_example.SOUND_ENABLED = False
+    # 事件照常记录（计入 evaluate），但不写到终端
+    event_log.set_path(os.devnull)
+
+    results = {}
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        results[resolution] = run_resolution(width, height, args.frames, args.warmup, not args.immediate)
+
+        print(f"\n{resolution} ({width}x{height})")
+        print(f"{'阶段':<48} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'次数':>6}")
+        # 先按流水线顺序列出各阶段，再列出每个 draw_text
+        stages = sorted(results[resolution], key=lambda stage: stage.startswith('draw_text:'))
+        for stage in stages:
+            summary = results[resolution][stage]
+            print(f"{stage:<48} {summary['p50']:>8.3f} {summary['p95']:>8.3f} {summary['p99']:>8.3f} "
+                  f"{summary['calls']:>6}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到 {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} 项超出容差 {args.tolerance:.0%}：")
+            for resolution, stage, key, reference, current in regressions:
+                print(f"  {resolution} {stage} {key}: {reference:.3f} -> {current:.3f} ms")
+            sys.exit(1)
+        print(f"\n所有阶段都在基线的 {args.tolerance:.0%} 容差内")
+
+
+if __name__ == '__main__':
+    main()
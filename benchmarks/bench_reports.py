@@ -0,0 +1,118 @@
+"""
+报告任务基准：在本地启动一个替身 chat/completions 服务（固定延迟，前几次请求返回 503），
+用与应用相同的 ReportJobs 提交报告，报告 submit() 的耗时、等待结果的时间、服务端实际收到的请求数，
+以及相同统计再次提交与新进程从磁盘缓存读取时是否命中缓存。不访问外部网络。
+
+用法：
+    python benchmarks/bench_reports.py --latency 0.5 --failures 2
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from report_jobs import DONE, FAILED, ReportCache, ReportClient, ReportJobs, build_report_payload
+
+STATS_DATA = {
+    'detection_duration': 600.0,
+    'forward_head_count': 3,
+    'forward_head_avg_duration': 24.5,
+    'head_tilt_count': 1,
+    'head_tilt_avg_duration': 18.0,
+    'spinal_curvature_count': 0,
+    'spinal_curvature_avg_duration': 0.0,
+    'detailed_records': "第1次: 24.5 秒",
+}
+
+
+class StandInServer(ThreadingHTTPServer):
+    """替身服务：每个请求先等待 latency 秒，前 failures 个请求返回 503"""
+
+    daemon_threads = True
+
+    def __init__(self, latency, failures):
+        super().__init__(('127.0.0.1', 0), StandInHandler)
+        self.latency = latency
+        self.failures = failures
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with self.server.lock:
+            self.server.requests += 1
+            fail = self.server.requests <= self.server.failures
+        time.sleep(self.server.latency)
+        if fail:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({'choices': [{'message': {
+            'content': f"替身报告（{len(payload['messages'][-1]['content'])} 字提示）"}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def wait(jobs, job_id, poll=0.01):
+    while jobs.status(job_id).state not in (DONE, FAILED):
+        time.sleep(poll)
+    return jobs.status(job_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency', type=float, default=0.5, help='替身服务每个请求的延迟（秒）')
+    parser.add_argument('--failures', type=int, default=2, help='开头返回 503 的请求数')
+    args = parser.parse_args()
+
+    server = StandInServer(args.latency, args.failures)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        jobs = ReportJobs(ReportClient(url, 'stand-in', backoff=0.1), ReportCache(cache_dir))
+        payload = build_report_payload(STATS_DATA)
+
+        start = time.perf_counter()
+        job_id = jobs.submit(payload)
+        submitted = time.perf_counter() - start
+        job = wait(jobs, job_id)
+        print(f"首次提交：submit {submitted * 1000:.2f} ms，{job.state}，"
+              f"等待 {job.finished_at - job.submitted_at:.2f} 秒，服务端收到 {server.requests} 个请求")
+        print(f"  结果：{job.report or job.error}")
+
+        # 正在生成与已生成的相同请求都不会再次访问服务
+        requests_before = server.requests
+        start = time.perf_counter()
+        again = jobs.submit(build_report_payload(dict(STATS_DATA)))
+        print(f"相同统计再次提交：submit {(time.perf_counter() - start) * 1000:.2f} ms，"
+              f"同一任务 {again == job_id}，新增请求 {server.requests - requests_before} 个")
+
+        # 新的执行器（相当于进程重启）从磁盘缓存读取
+        fresh = ReportJobs(ReportClient(url, 'stand-in'), ReportCache(cache_dir))
+        cached = fresh.status(fresh.submit(payload))
+        print(f"新执行器读取磁盘缓存：{cached.state}，cached={cached.cached}，"
+              f"新增请求 {server.requests - requests_before} 个")
+
+        jobs.shutdown()
+        fresh.shutdown()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
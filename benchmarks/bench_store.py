@@ -0,0 +1,97 @@
+"""
+坐姿记录库基准：通过 PostureStore 的后台写线程写入一年的合成数据（每天 8 小时的会话、
+已计数的不良姿势片段与每分钟汇总），报告写入吞吐量以及常用查询的耗时（毫秒）。
+
+用法：
+    python benchmarks/bench_store.py --days 365 --db /tmp/bench_posture.db
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from metric_history import bucket_dtype
+from posture_store import PostureStore
+from state_tracker import POSTURE_TYPES
+
+DAY = 86400.0
+
+
+def populate(store, days, episodes_per_hour, seed=0):
+    """写入合成数据，返回 (片段数, 分钟汇总数)"""
+    rng = np.random.default_rng(seed)
+    origin = time.time() - days * DAY
+    bucket = np.zeros((), dtype=bucket_dtype(len(POSTURE_TYPES)))
+    bucket['frames'] = bucket['valid'] = 1800
+    episodes = rollups = 0
+    for day in range(days):
+        session_id = f'bench-{day}'
+        started = origin + day * DAY + 9 * 3600
+        store.start_session(session_id, started)
+        for posture in POSTURE_TYPES:
+            count = rng.poisson(episodes_per_hour * 8)
+            starts = np.sort(started + rng.random(count) * 8 * 3600)
+            for start, duration in zip(starts, 15 + rng.exponential(20, count)):
+                store.add_episode(session_id, posture, float(start), float(start + duration))
+            episodes += count
+        for minute in range(8 * 60):
+            bucket['mean'] = rng.normal(100, 10, 3)
+            store.add_minute_rollup(session_id, started + minute * 60, bucket)
+            rollups += 1
+        store.end_session(session_id, started + 8 * 3600)
+    return episodes, rollups
+
+
+def time_query(query, repeat):
+    """返回 (p50 毫秒, 结果行数)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = query()
+        samples.append(time.perf_counter() - start)
+    return np.percentile(samples, 50) * 1000, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--episodes-per-hour', type=float, default=4.0, help='每种姿势每小时的片段数')
+    parser.add_argument('--db', default='bench_posture.db')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    store = PostureStore(args.db)
+    start = time.perf_counter()
+    episodes, rollups = populate(store, args.days, args.episodes_per_hour)
+    enqueued = time.perf_counter() - start
+    store.flush(timeout=None)
+    written = time.perf_counter() - start
+    print(f"写入 {episodes} 个片段、{rollups} 条分钟汇总：入队 {enqueued:.2f} 秒，"
+          f"全部提交 {written:.2f} 秒（{(episodes + rollups) / written:.0f} 行/秒）")
+
+    now = time.time()
+    queries = {
+        '某类片段，最近 1 天': lambda: store.episodes_by_type('forward_head', now - DAY, now),
+        '某类片段，最近 7 天': lambda: store.episodes_by_type('forward_head', now - 7 * DAY, now),
+        '某类片段，最近 30 天': lambda: store.episodes_by_type('head_tilt', now - 30 * DAY, now),
+        '某类片段，全年': lambda: store.episodes_by_type('spinal_curvature', now - 366 * DAY, now),
+        '按天汇总，最近 30 天': lambda: store.daily_summary(now - 30 * DAY, now),
+        '分钟汇总，最近 1 天': lambda: store.minute_rollups(now - DAY, now),
+    }
+    print(f"\n{'查询':<24} {'p50 ms':>8} {'行数':>8}")
+    for name, query in queries.items():
+        p50, rows = time_query(query, args.repeat)
+        print(f"{name:<24} {p50:>8.2f} {rows:>8}")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
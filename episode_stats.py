@@ -0,0 +1,160 @@
+import math
+from collections import deque
+
+import numpy as np
+
+# 汇总中给出的持续时间分位数
+EPISODE_QUANTILES = (50, 90, 99)
+
+
+class RunningStats:
+    """Welford 在线均值/方差与最小/最大值，可以与另一份统计合并"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """合并另一份统计（Chan 等人的并行方差公式）"""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self):
+        """样本方差，少于两个样本时为 0"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def std(self):
+        return math.sqrt(self.variance())
+
+
+class QuantileSketch:
+    """
+    对数分桶的分位数草图：第 i 个桶覆盖 (min_value*gamma^(i-1), min_value*gamma^i]，
+    估计值的相对误差不超过 relative_accuracy。桶数固定，内存与样本数无关；
+    参数相同的两份草图合并只是桶计数相加
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=0.1, max_value=1e6):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        # 第 0 个桶收集不大于 min_value 的值，最后一个桶收集超出 max_value 的值
+        num_buckets = int(math.ceil(math.log(max_value / min_value) / self._log_gamma)) + 2
+        self.counts = np.zeros(num_buckets, dtype=np.int64)
+        self.count = 0
+
+    def add(self, value):
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(int(math.ceil(math.log(value / self.min_value) / self._log_gamma)), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+
+    def merge(self, other):
+        if (other.relative_accuracy, other.min_value, other.max_value) != \
+                (self.relative_accuracy, self.min_value, self.max_value):
+            raise ValueError("只能合并参数相同的分位数草图")
+        self.counts += other.counts
+        self.count += other.count
+
+    def quantiles(self, q):
+        """q 为百分数序列，返回各分位数的估计值；没有样本时为 None"""
+        if self.count == 0:
+            return None
+        # 最近秩：第 ceil(q/100*n) 个样本（从 1 开始）所在的桶
+        ranks = np.maximum(np.ceil(np.asarray(q, dtype=np.float64) / 100 * self.count), 1)
+        index = np.searchsorted(np.cumsum(self.counts), ranks)
+        # 取桶区间的中心，使落在桶内任意位置的值相对误差都不超过 relative_accuracy
+        values = self.min_value * self.gamma ** index * 2 / (self.gamma + 1)
+        return np.where(index == 0, self.min_value, values)
+
+
+class EpisodeStats:
+    """
+    一种不良姿势的持续时间统计：运行中的计数/均值/方差/极值、分位数草图，
+    以及最近 recent 次的原始持续时间。内存和读取开销与会话长度无关
+    """
+
+    def __init__(self, recent=100):
+        self.running = RunningStats()
+        self.sketch = QuantileSketch()
+        self.recent = deque(maxlen=recent)
+        self._summary = None
+
+    def add(self, duration):
+        self.running.add(duration)
+        self.sketch.add(duration)
+        self.recent.append(duration)
+        self._summary = None
+
+    def merge(self, other):
+        """合并另一份统计；最近记录按 other 在后的顺序拼接"""
+        self.running.merge(other.running)
+        self.sketch.merge(other.sketch)
+        self.recent.extend(other.recent)
+        self._summary = None
+
+    def summary(self):
+        """
+        {'total', 'mean', 'std', 'min', 'max', 'quantiles': {50: ..}, 'recent': [...], 'first_index'}，
+        first_index 是 recent 中第一条记录的序号（从 1 开始）。结果缓存到下一次 add/merge
+        """
+        if self._summary is None:
+            running = self.running
+            estimates = self.sketch.quantiles(EPISODE_QUANTILES)
+            if estimates is None:
+                quantiles = dict.fromkeys(EPISODE_QUANTILES, 0.0)
+            else:
+                # 估计值限制在真实极值范围内
+                quantiles = {q: float(np.clip(v, running.min, running.max))
+                             for q, v in zip(EPISODE_QUANTILES, estimates)}
+            self._summary = {
+                'total': running.count,
+                'mean': running.mean,
+                'std': running.std(),
+                'min': running.min if running.count else 0.0,
+                'max': running.max if running.count else 0.0,
+                'quantiles': quantiles,
+                'recent': list(self.recent),
+                'first_index': running.count - len(self.recent) + 1,
+            }
+        return self._summary
+
+
+def posture_stats_entry(count, episode_stats):
+    """get_all_stats 中一种姿势的统计：count 为计数次数，其余取自已结束片段的持续时间统计"""
+    summary = episode_stats.summary()
+    return {
+        'count': count,
+        'avg_duration': summary['mean'] if count > 0 and summary['total'] else 0.0,
+        'std_duration': summary['std'],
+        'min_duration': summary['min'],
+        'max_duration': summary['max'],
+        'quantiles': dict(summary['quantiles']),
+        # 只保留最近的原始记录，first_index 为其中第一条的序号
+        'durations': list(summary['recent']),
+        'first_index': summary['first_index'],
+    }
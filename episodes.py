@@ -0,0 +1,104 @@
+from collections import namedtuple
+import numpy as np
+
+# StateTracker 中登记的不良姿势类型，以及计入次数的持续时长阈值（秒）
+from state_tracker import POSTURE_TYPES, COUNT_THRESH
+from episode_stats import EpisodeStats, posture_stats_entry
+
+# 一段连续的不良姿势：
+#   start/end 为视频时间（秒），end 是第一帧不再处于该姿势的时间；
+#   last_active 为最后一帧仍处于该姿势的时间，用于判断是否计数；
+#   open_start/open_end 表示该段碰到了分段的开头/结尾，可能需要与相邻分段合并
+Episode = namedtuple('Episode', 'posture start end last_active open_start open_end')
+
+
+def tracker_active_flags(state_tracker):
+    """读取 StateTracker 当前每种不良姿势是否正在计时，按姿势 id 排列"""
+    return state_tracker.active_mask()
+
+
+def extract_episodes(timestamps, active, posture_types=POSTURE_TYPES, next_timestamp=None):
+    """
+    从逐帧的计时状态中提取不良姿势片段。
+    timestamps: (T,) 帧时间；active: (T, K) bool，第 k 列对应 posture_types[k]；
+    next_timestamp: 分段之后第一帧的时间，用作末尾仍在持续的片段的结束时间
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    active = np.asarray(active, dtype=bool).reshape(len(timestamps), len(posture_types))
+    n = len(timestamps)
+    episodes = []
+    if n == 0:
+        return episodes
+    if next_timestamp is None:
+        next_timestamp = timestamps[-1]
+
+    # 在两端补 False 后做差分，得到每段连续 True 的 [起点, 终点)
+    padded = np.zeros((n + 2, len(posture_types)), dtype=np.int8)
+    padded[1:-1] = active
+    edges = np.diff(padded, axis=0)
+    for k, posture in enumerate(posture_types):
+        starts = np.flatnonzero(edges[:, k] == 1)
+        stops = np.flatnonzero(edges[:, k] == -1)
+        for i, j in zip(starts, stops):
+            open_end = j == n
+            episodes.append(Episode(
+                posture=posture,
+                start=float(timestamps[i]),
+                # 分段末尾仍在持续的片段暂以下一分段第一帧结束，合并时会被后续分段延长
+                end=float(timestamps[j] if not open_end else next_timestamp),
+                last_active=float(timestamps[j - 1]),
+                open_start=bool(i == 0),
+                open_end=bool(open_end),
+            ))
+    episodes.sort(key=lambda e: (e.start, e.posture))
+    return episodes
+
+
+def merge_chunk_episodes(chunks):
+    """
+    按时间顺序合并相邻分段的片段。chunks 为每个分段的片段列表，且分段首尾相接；
+    前一段在末尾仍持续、后一段从第一帧就处于同一姿势的两个片段合并为一个
+    """
+    merged = []
+    # 每种姿势在上一分段末尾仍在持续的片段（在 merged 中的下标）
+    pending = {}
+    for chunk_index, episodes in enumerate(chunks):
+        carried = {}
+        for episode in episodes:
+            index = pending.get(episode.posture)
+            if episode.open_start and index is not None:
+                head = merged[index]
+                merged[index] = head._replace(end=episode.end, last_active=episode.last_active,
+                                              open_end=episode.open_end)
+                del pending[episode.posture]
+            else:
+                if episode.open_start and chunk_index > 0:
+                    # 恰好从分段边界开始、前一分段末尾没有同一姿势：片段在边界处开始
+                    episode = episode._replace(open_start=False)
+                index = len(merged)
+                merged.append(episode)
+            if episode.open_end:
+                carried[episode.posture] = index
+        # 没有在本分段延续的片段在分段边界处结束
+        for index in pending.values():
+            merged[index] = merged[index]._replace(open_end=False)
+        pending = carried
+    merged.sort(key=lambda e: (e.start, e.posture))
+    return merged
+
+
+def is_counted(episode, count_thresh=COUNT_THRESH):
+    """片段持续期间是否已超过计数阈值"""
+    return episode.last_active - episode.start > count_thresh
+
+
+def summarize_episodes(episodes, posture_types=POSTURE_TYPES, count_thresh=COUNT_THRESH):
+    """汇总为与 StateTracker.get_all_stats 相同结构的统计"""
+    stats = {}
+    for posture in posture_types:
+        episode_stats = EpisodeStats()
+        for e in episodes:
+            if e.posture == posture and is_counted(e, count_thresh):
+                episode_stats.add(e.end - e.start)
+        stats[posture] = posture_stats_entry(episode_stats.running.count, episode_stats)
+    return stats
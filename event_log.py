@@ -0,0 +1,165 @@
+import atexit
+import json
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+def _to_json(value):
+    """numpy 标量等 json 不认识的值转成 Python 值"""
+    item = getattr(value, 'item', None)
+    return item() if item is not None else str(value)
+
+
+class EventLog:
+    """
+    结构化事件日志：emit() 只把 (时间, 事件类型, 字段) 放进有界队列，不格式化、不阻塞，
+    只在更新令牌桶与计数时持有一把很短的锁；后台线程定期批量取出，格式化成 JSON lines 写到文件或标准输出。
+    限速按 (会话, 事件类型) 分别计算，队列满或超出限速时直接丢弃并计数
+    """
+
+    def __init__(self, path=None, capacity=4096, flush_interval=0.25, rate=20.0, burst=40, rate_limits=None):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        # 每个会话每种事件类型一个令牌桶：(每秒事件数, 最大突发数)，未单独配置的类型使用默认值
+        self.default_limit = (rate, burst)
+        self.rate_limits = dict(rate_limits or {})
+        self.enabled = True
+
+        self.emitted = 0
+        self.written = 0
+        self.dropped = Counter()        # 队列满而丢弃的事件，按类型计数
+        self.rate_limited = Counter()   # 超出限速而丢弃的事件，按类型计数
+
+        self._pending = deque()
+        self._buckets = {}  # (会话, 事件类型) -> [剩余令牌, 上次补充时间]
+        self._lock = threading.Lock()
+        self._reported_drops = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def set_rate_limit(self, event, rate, burst):
+        with self._lock:
+            self.rate_limits[event] = (rate, burst)
+            for key in [key for key in self._buckets if key[1] == event]:
+                del self._buckets[key]
+
+    def forget_session(self, session):
+        """会话结束时丢弃它的令牌桶"""
+        with self._lock:
+            for key in [key for key in self._buckets if key[0] == session]:
+                del self._buckets[key]
+
+    def set_path(self, path):
+        """之后的批次写到 path（None 表示标准输出）"""
+        self.path = path
+
+    def emit(self, event, session=None, **fields):
+        """
+        记录一条事件，返回是否被接受；不会阻塞调用线程。
+        给出 session 时一并写入记录，且该会话的事件单独限速，一个会话的突发不会挤掉其它会话的事件
+        """
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+
+        with self._lock:
+            key = (session, event)
+            bucket = self._buckets.get(key)
+            rate, burst = self.rate_limits.get(event, self.default_limit)
+            if bucket is None:
+                bucket = self._buckets[key] = [burst, now]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self.rate_limited[event] += 1
+                return False
+            bucket[0] = tokens - 1
+
+            if len(self._pending) >= self.capacity:
+                self.dropped[event] += 1
+                return False
+            if session is not None:
+                fields['session'] = session
+            # 容量检查与入队在同一把锁内，并发写入不会超出 capacity
+            self._pending.append((time.time(), event, fields))
+            self.emitted += 1
+
+        if self._thread is None:
+            self._start()
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'emitted': self.emitted,
+                'written': self.written,
+                'pending': len(self._pending),
+                'dropped': sum(self.dropped.values()),
+                'rate_limited': sum(self.rate_limited.values()),
+            }
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-log', daemon=True)
+                self._thread.start()
+
+    def _format(self, timestamp, event, fields):
+        record = {'ts': round(timestamp, 3), 'event': event}
+        record.update(fields)
+        return json.dumps(record, ensure_ascii=False, default=_to_json)
+
+    def _drain(self):
+        """取出当前队列中的全部事件并写出一批"""
+        lines = []
+        pending = self._pending
+        while pending:
+            lines.append(self._format(*pending.popleft()))
+
+        # 有新的丢弃时写一条汇总，便于在日志里发现过载
+        with self._lock:
+            dropped, rate_limited = dict(self.dropped), dict(self.rate_limited)
+        drops = sum(dropped.values()) + sum(rate_limited.values())
+        if drops != self._reported_drops:
+            self._reported_drops = drops
+            lines.append(self._format(time.time(), 'log_dropped', {
+                'queue_full': dropped,
+                'rate_limited': rate_limited,
+            }))
+        if not lines:
+            return
+
+        text = '\n'.join(lines) + '\n'
+        try:
+            if self.path is None:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(text)
+            self.written += len(lines)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"事件日志写入失败: {e}\n")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+
+    def close(self):
+        """停止后台线程并写出剩余事件"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            self._drain()
+
+
+# 全局事件日志，默认写到标准输出；进程退出前写出队列中剩余的事件
+event_log = EventLog()
+atexit.register(event_log.close)
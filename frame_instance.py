@@ -1,7 +1,11 @@
+from collections import namedtuple
+
 import cv2
 import numpy as np
 
-from utils import find_angle, get_landmark_features, draw_text, draw_dotted_line, calculate_angle_between_two_points
+from utils import calculate_angle_between_two_points, denormalize_landmarks, pose_result_array, face_result_array, \
+    find_angles, angle_triplets, REF_VERTICAL, REF_HORIZONTAL, REF_NVERTICAL, REF_NHORIZONTAL
+from overlay import ImmediateCanvas, DisplayList
 
 COLORS = {
     'black': (0, 0, 0),
@@ -25,174 +29,228 @@ LINE_TYPE = cv2.LINE_AA
 FONT = cv2.FONT_HERSHEY_SIMPLEX
 OFFSET_THRESH = 35.0
 
+# 命名关键点在 MediaPipe Pose 33 点数组中的下标
+POSE_LANDMARKS = {
+    'nose': 0,
+    'left_eye_inner': 1,
+    'left_eye': 2,
+    'left_eye_outer': 3,
+    'right_eye_inner': 4,
+    'right_eye': 5,
+    'right_eye_outer': 6,
+    'left_ear': 7,
+    'right_ear': 8,
+    'left_mouth': 9,
+    'right_mouth': 10,
+    'left_shldr': 11,
+    'right_shldr': 12,
+    'left_elbow': 13,
+    'right_elbow': 14,
+    'left_wrist': 15,
+    'right_wrist': 16,
+    'left_hip': 23,
+    'right_hip': 24,
+    'left_knee': 25,
+    'right_knee': 26,
+    'left_ankle': 27,
+    'right_ankle': 28,
+    'left_foot': 31,
+    'right_foot': 32,
+}
+
+# 虹膜中心在 Face Mesh（refine_landmarks=True）478 点数组中的下标
+FACE_LANDMARKS = {
+    'left_iris': 468,
+    'right_iris': 473,
+}
+
+# 需要 Face Mesh 才能解析的关键点（含由左右虹膜求中点的通用 iris）
+FACE_FEATURES = frozenset(FACE_LANDMARKS) | {'iris'}
+
+
+def requires_face_mesh(features):
+    """判断一组关键点需求是否用到 Face Mesh"""
+    return any(feature in FACE_FEATURES for feature in features)
+
+
+# 无效关键点统一返回的只读零坐标，避免逐次分配
+ZERO_COORD = np.zeros(2, dtype=np.int32)
+ZERO_COORD.flags.writeable = False
+
+# 尚未运行 Face Mesh 的占位标记
+_NOT_RUN = object()
+
+
+REFERENCE_POINTS = {
+    'vertical': REF_VERTICAL,
+    'horizontal': REF_HORIZONTAL,
+    'nvertical': REF_NVERTICAL,
+    'nhorizontal': REF_NHORIZONTAL,
+}
+
+# 预编译的角度规格：(点1, 顶点, 点3) 在 33 点数组中的下标，点3 可以是参考方向
+AngleSpec = namedtuple('AngleSpec', ['point1', 'vertex', 'point3'])
+
+
+def compile_angle_spec(point1, point2, point3):
+    """把 get_angle 的关键点名字编译成整数下标的角度规格，point2 为顶点"""
+    try:
+        index1 = POSE_LANDMARKS[point1]
+        index2 = POSE_LANDMARKS[point2]
+        index3 = REFERENCE_POINTS[point3] if point3 in REFERENCE_POINTS else POSE_LANDMARKS[point3]
+    except KeyError as e:
+        raise ValueError(f"angle spec points need to be pose landmarks ({', '.join(POSE_LANDMARKS)}) "
+                         f"or a reference direction for point3, got {e}")
+    return AngleSpec(index1, index2, index3)
+
+
+# 双肩-鼻子夹角，用于判断朝向，也是头部前倾角度
+SHOULDER_NOSE_ANGLE = compile_angle_spec('left_shldr', 'nose', 'right_shldr')
+
+
+# 朝向相关的通用关键点：正面时取左右中点（身体部位无定义），侧面时取对应一侧
+GENERIC_BODY_FEATURES = ('shldr', 'elbow', 'wrist', 'hip', 'knee', 'ankle', 'foot')
+GENERIC_HEAD_FEATURES = ('eye', 'ear', 'mouth', 'eye_inner', 'eye_outer', 'iris')
+
+COORD_NAMES = frozenset(POSE_LANDMARKS) | frozenset(FACE_LANDMARKS) | {'neck'} \
+    | frozenset(GENERIC_BODY_FEATURES) | frozenset(GENERIC_HEAD_FEATURES)
+
+
+def _midpoint(coord1, coord2):
+    if coord1 is None or coord2 is None:
+        return None
+    return (coord1[0] + coord2[0]) // 2, (coord1[1] + coord2[1]) // 2
+
+
+class LazyCoords:
+    """
+    按需解析的关键点表：第一次访问某个名字时才计算，并在本帧内缓存
+    对外表现与原先的 coord 字典一致（in / [] / get）
+    """
+
+    __slots__ = ('_frame_instance', '_cache')
+
+    def __init__(self, frame_instance):
+        self._frame_instance = frame_instance
+        self._cache = {}
+
+    def __contains__(self, name):
+        return name in COORD_NAMES
+
+    def __iter__(self):
+        return iter(COORD_NAMES)
+
+    def __len__(self):
+        return len(COORD_NAMES)
+
+    def __getitem__(self, name):
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        if name not in COORD_NAMES:
+            raise KeyError(name)
+        coord = self._resolve(name)
+        self._cache[name] = coord
+        return coord
+
+    def get(self, name, default=None):
+        return self[name] if name in COORD_NAMES else default
+
+    def _resolve(self, name):
+        fi = self._frame_instance
+        if not fi.validate():
+            return None
+
+        if name in POSE_LANDMARKS:
+            return fi.points[POSE_LANDMARKS[name]]
+        if name in FACE_LANDMARKS:
+            face_points = fi.face_points
+            index = FACE_LANDMARKS[name]
+            if face_points is None or index >= len(face_points):
+                return None
+            return face_points[index]
+        if name == 'neck':
+            # 颈部位置（肩膀中点）
+            return _midpoint(self['left_shldr'], self['right_shldr'])
+
+        orientation = fi.get_orientation()
+        if orientation == 'front':
+            # 正面朝向时，选择中间或平均值
+            if name in GENERIC_HEAD_FEATURES:
+                return _midpoint(self['left_' + name], self['right_' + name])
+            return None
+        return self[orientation + '_' + name]
+
 
 class FrameInstance:
-    def __init__(self, frame: np.array, pose, face_mesh=None):
+    __slots__ = ('frame', 'canvas', 'pose', 'face_mesh', 'frame_height', 'frame_width', 'keypoints',
+                 '_face_keypoints', 'coord', 'angle', '_orientation', '_landmarks', '_points', '_face_points')
+
+    def __init__(self, frame: np.array, pose, face_mesh=None, deferred=False, timestamp=None):
         self.frame = frame
+        # deferred=True 时绘制调用只记录图元，由 flush() 在帧末统一合成
+        self.canvas = DisplayList() if deferred else ImmediateCanvas(frame)
         self.pose = pose
         self.face_mesh = face_mesh
         self.frame_height, self.frame_width, _ = frame.shape
 
-        self.keypoints = pose.process(frame)
-        self.face_keypoints = face_mesh.process(frame) if face_mesh else None
-
-        self.coord = {
-            # 头部关键点
-            'nose': None,
-            'left_eye_inner': None,    # 左眼内眼角
-            'left_eye': None,          # 左眼中心
-            'left_eye_outer': None,    # 左眼外眼角
-            'right_eye_inner': None,   # 右眼内眼角
-            'right_eye': None,         # 右眼中心
-            'right_eye_outer': None,   # 右眼外眼角
-            'left_ear': None,
-            'right_ear': None,
-            'left_mouth': None,
-            'right_mouth': None,
-            'left_iris': None,         # 左眼虹膜中心
-            'right_iris': None,        # 右眼虹膜中心
-            'neck': None,
-
-            # 上半身左侧关键点
-            'left_shldr': None,
-            'left_elbow': None,
-            'left_wrist': None,
-            'left_hip': None,
-
-            # 上半身右侧关键点
-            'right_shldr': None,
-            'right_elbow': None,
-            'right_wrist': None,
-            'right_hip': None,
-
-            # 下半身关键点（保留原有）
-            'left_knee': None,
-            'left_ankle': None,
-            'left_foot': None,
-            'right_knee': None,
-            'right_ankle': None,
-            'right_foot': None,
-
-            # 通用关键点（根据朝向选择左右侧）
-            'shldr': None,
-            'elbow': None,
-            'wrist': None,
-            'hip': None,
-            'knee': None,
-            'ankle': None,
-            'foot': None,
-
-            # 新增通用头部关键点
-            'eye': None,
-            'ear': None,
-            'mouth': None,
-            'eye_inner': None,
-            'eye_outer': None,
-            'iris': None
-        }
-        self.angle = {}
-        self.orientation = None
-
-        if self.validate():
-            ps_lm = self.keypoints.pose_landmarks
-
-            # 获取头部关键点
-            self.coord['nose'] = get_landmark_features(ps_lm.landmark, 'nose', self.frame_width, self.frame_height)
-            self.coord['left_eye_inner'] = get_landmark_features(ps_lm.landmark, 'left_eye_inner', self.frame_width, self.frame_height)
-            self.coord['left_eye'] = get_landmark_features(ps_lm.landmark, 'left_eye', self.frame_width, self.frame_height)
-            self.coord['left_eye_outer'] = get_landmark_features(ps_lm.landmark, 'left_eye_outer', self.frame_width, self.frame_height)
-            self.coord['right_eye_inner'] = get_landmark_features(ps_lm.landmark, 'right_eye_inner', self.frame_width, self.frame_height)
-            self.coord['right_eye'] = get_landmark_features(ps_lm.landmark, 'right_eye', self.frame_width, self.frame_height)
-            self.coord['right_eye_outer'] = get_landmark_features(ps_lm.landmark, 'right_eye_outer', self.frame_width, self.frame_height)
-            self.coord['left_ear'] = get_landmark_features(ps_lm.landmark, 'left_ear', self.frame_width, self.frame_height)
-            self.coord['right_ear'] = get_landmark_features(ps_lm.landmark, 'right_ear', self.frame_width, self.frame_height)
-            self.coord['left_mouth'] = get_landmark_features(ps_lm.landmark, 'left_mouth', self.frame_width, self.frame_height)
-            self.coord['right_mouth'] = get_landmark_features(ps_lm.landmark, 'right_mouth', self.frame_width, self.frame_height)
-
-            # 获取虹膜关键点（如果Face Mesh可用）
-            if self.face_keypoints and self.face_keypoints.multi_face_landmarks:
-                face_lm = self.face_keypoints.multi_face_landmarks[0]
-                self.coord['left_iris'] = get_landmark_features(face_lm.landmark, 'left_iris', self.frame_width, self.frame_height)
-                self.coord['right_iris'] = get_landmark_features(face_lm.landmark, 'right_iris', self.frame_width, self.frame_height)
-
-            # 计算颈部位置（肩膀中点）
-            left_shldr, left_elbow, left_wrist, left_hip, left_knee, left_ankle, left_foot = get_landmark_features(
-                ps_lm.landmark, 'left', self.frame_width, self.frame_height)
-            right_shldr, right_elbow, right_wrist, right_hip, right_knee, right_ankle, right_foot = get_landmark_features(
-                ps_lm.landmark, 'right', self.frame_width, self.frame_height)
-
-            self.coord['left_shldr'] = left_shldr
-            self.coord['left_elbow'] = left_elbow
-            self.coord['left_wrist'] = left_wrist
-            self.coord['left_hip'] = left_hip
-            self.coord['left_knee'] = left_knee
-            self.coord['left_ankle'] = left_ankle
-            self.coord['left_foot'] = left_foot
-
-            self.coord['right_shldr'] = right_shldr
-            self.coord['right_elbow'] = right_elbow
-            self.coord['right_wrist'] = right_wrist
-            self.coord['right_hip'] = right_hip
-            self.coord['right_knee'] = right_knee
-            self.coord['right_ankle'] = right_ankle
-            self.coord['right_foot'] = right_foot
-
-            # 计算颈部位置
-            self.coord['neck'] = ((left_shldr[0] + right_shldr[0]) // 2,
-                                  (left_shldr[1] + right_shldr[1]) // 2)
-
-            offset_angle = self.get_angle('left_shldr', 'nose', 'right_shldr')
-
-            if offset_angle > OFFSET_THRESH:
-                self.orientation = 'front'
-                # 正面朝向时，选择中间或平均值
-                self.coord['eye'] = ((self.coord['left_eye'][0] + self.coord['right_eye'][0]) // 2,
-                                     (self.coord['left_eye'][1] + self.coord['right_eye'][1]) // 2)
-                self.coord['ear'] = ((self.coord['left_ear'][0] + self.coord['right_ear'][0]) // 2,
-                                     (self.coord['left_ear'][1] + self.coord['right_ear'][1]) // 2)
-                self.coord['mouth'] = ((self.coord['left_mouth'][0] + self.coord['right_mouth'][0]) // 2,
-                                       (self.coord['left_mouth'][1] + self.coord['right_mouth'][1]) // 2)
-                self.coord['eye_inner'] = ((self.coord['left_eye_inner'][0] + self.coord['right_eye_inner'][0]) // 2,
-                                           (self.coord['left_eye_inner'][1] + self.coord['right_eye_inner'][1]) // 2)
-                self.coord['eye_outer'] = ((self.coord['left_eye_outer'][0] + self.coord['right_eye_outer'][0]) // 2,
-                                           (self.coord['left_eye_outer'][1] + self.coord['right_eye_outer'][1]) // 2)
-                if self.coord['left_iris'] is not None and self.coord['right_iris'] is not None:
-                    self.coord['iris'] = ((self.coord['left_iris'][0] + self.coord['right_iris'][0]) // 2,
-                                          (self.coord['left_iris'][1] + self.coord['right_iris'][1]) // 2)
-            else:
-                dist_l_sh_hip = abs(self.coord['left_foot'][1] - self.coord['left_shldr'][1])
-                dist_r_sh_hip = abs(self.coord['right_foot'][1] - self.coord['right_shldr'][1])
+        # 给出帧的采集时间时一并交给推理链，KeyframePose 据此估计摄像头的帧间隔
+        self.keypoints = pose.process(frame) if timestamp is None else pose.process(frame, timestamp)
+        # Face Mesh 推迟到第一次请求虹膜等面部关键点时才运行
+        self._face_keypoints = _NOT_RUN
 
-                if dist_l_sh_hip > dist_r_sh_hip:
-                    self.orientation = 'left'
-                    self.coord['shldr'] = self.coord['left_shldr']
-                    self.coord['elbow'] = self.coord['left_elbow']
-                    self.coord['wrist'] = self.coord['left_wrist']
-                    self.coord['hip'] = self.coord['left_hip']
-                    self.coord['knee'] = self.coord['left_knee']
-                    self.coord['ankle'] = self.coord['left_ankle']
-                    self.coord['foot'] = self.coord['left_foot']
-                    self.coord['eye'] = self.coord['left_eye']
-                    self.coord['ear'] = self.coord['left_ear']
-                    self.coord['mouth'] = self.coord['left_mouth']
-                    self.coord['eye_inner'] = self.coord['left_eye_inner']
-                    self.coord['eye_outer'] = self.coord['left_eye_outer']
-                    self.coord['iris'] = self.coord['left_iris']
+        # 关键点、中点与朝向都在第一次被请求时才计算，并在本帧内缓存
+        self.coord = LazyCoords(self)
+        self.angle = {}
+        self._orientation = None
+        self._landmarks = None
+        self._points = None
+        self._face_points = None
+
+    @property
+    def landmarks(self):
+        """(33, 4) float32 像素坐标 (x, y, z, visibility)，无效帧为 None"""
+        if self._landmarks is None and self.validate():
+            self._landmarks = denormalize_landmarks(
+                pose_result_array(self.keypoints), self.frame_width, self.frame_height)
+        return self._landmarks
+
+    @property
+    def points(self):
+        """(33, 2) int32 像素坐标，命名关键点是它的行视图"""
+        if self._points is None and self.landmarks is not None:
+            self._points = self._landmarks[:, :2].astype(np.int32)
+        return self._points
+
+    @property
+    def face_keypoints(self):
+        """Face Mesh 结果；没有 Face Mesh 时为 None，第一次访问时才运行推理"""
+        if self._face_keypoints is _NOT_RUN:
+            self._face_keypoints = None
+            if self.face_mesh is not None:
+                # FaceMeshStage 可以借助姿态关键点裁剪人脸区域并按自己的频率运行
+                process_with_pose = getattr(self.face_mesh, 'process_with_pose', None)
+                if process_with_pose is not None:
+                    pose_landmarks = pose_result_array(self.keypoints) if self.validate() else None
+                    self._face_keypoints = process_with_pose(self.frame, pose_landmarks)
                 else:
-                    self.orientation = 'right'
-                    self.coord['shldr'] = self.coord['right_shldr']
-                    self.coord['elbow'] = self.coord['right_elbow']
-                    self.coord['wrist'] = self.coord['right_wrist']
-                    self.coord['hip'] = self.coord['right_hip']
-                    self.coord['knee'] = self.coord['right_knee']
-                    self.coord['ankle'] = self.coord['right_ankle']
-                    self.coord['foot'] = self.coord['right_foot']
-                    self.coord['eye'] = self.coord['right_eye']
-                    self.coord['ear'] = self.coord['right_ear']
-                    self.coord['mouth'] = self.coord['right_mouth']
-                    self.coord['eye_inner'] = self.coord['right_eye_inner']
-                    self.coord['eye_outer'] = self.coord['right_eye_outer']
-                    self.coord['iris'] = self.coord['right_iris']
+                    self._face_keypoints = self.face_mesh.process(self.frame)
+        return self._face_keypoints
+
+    @property
+    def face_points(self):
+        """Face Mesh 关键点的 int32 像素坐标，未检测到人脸时为 None"""
+        if self._face_points is None:
+            face_landmarks = face_result_array(self.face_keypoints)
+            if face_landmarks is not None:
+                self._face_points = denormalize_landmarks(
+                    face_landmarks, self.frame_width, self.frame_height)[:, :2].astype(np.int32)
+        return self._face_points
+
+    @property
+    def orientation(self):
+        return self.get_orientation()
 
     def validate(self):
         if self.keypoints.pose_landmarks:
@@ -213,15 +271,38 @@ class FrameInstance:
         if self.validate() and feature in self.coord:
             return self.coord[feature]
         else:
-            return np.array([0, 0])
+            return ZERO_COORD
 
     def get_orientation(self):
-        return self.orientation
+        if self._orientation is None and self.validate():
+            offset_angle = self.get_angle(SHOULDER_NOSE_ANGLE)
 
-    def get_angle(self, point1, point2, point3):
+            if offset_angle > OFFSET_THRESH:
+                self._orientation = 'front'
+            else:
+                dist_l_sh_hip = abs(self.coord['left_foot'][1] - self.coord['left_shldr'][1])
+                dist_r_sh_hip = abs(self.coord['right_foot'][1] - self.coord['right_shldr'][1])
+                self._orientation = 'left' if dist_l_sh_hip > dist_r_sh_hip else 'right'
+        return self._orientation
+
+    def get_angle(self, point1, point2=None, point3=None):
+        """按关键点名字或预编译的 AngleSpec 计算夹角"""
+        if isinstance(point1, AngleSpec):
+            return int(self.get_angles((point1,))[0])
         angle, coord1, coord2, coord3 = self.__get_angle__(point1, point2, point3)
         return int(angle)
 
+    def get_angles(self, specs):
+        """一次向量化计算多个预编译角度，返回与 specs 等长的整数数组"""
+        if not self.validate():
+            return np.zeros(len(specs), dtype=np.int64)
+        key = tuple(specs)
+        angles = self.angle.get(key)
+        if angles is None:
+            angles = find_angles(angle_triplets(self.points, specs, self.frame_width, self.frame_height))
+            self.angle[key] = angles
+        return angles
+
     def get_angle_and_draw(self, point1, point2, point3, text_color='light_green', line_color='light_blue',
                            point_color='yellow', ellipse_color='white', dotted_line_color='blue'):
         angle, coord1, coord2, coord3 = self.__get_angle__(point1, point2, point3)
@@ -238,16 +319,15 @@ class FrameInstance:
                 end_angle = end_angle - 360
             else:
                 end_angle = 360 + end_angle
-        cv2.ellipse(self.frame, coord2, (20, 20),
-                    angle=0, startAngle=start_angle, endAngle=end_angle,
-                    color=self.__get_color__(ellipse_color), thickness=3, lineType=LINE_TYPE)
+        self.canvas.ellipse(coord2, (20, 20), start_angle, end_angle,
+                            self.__get_color__(ellipse_color), 3, LINE_TYPE)
 
         # draw lines between points
         self.line(point1, point2, line_color, 4)
         if point3 == 'vertical' or point3 == 'horizontal' or point3 == 'nvertical' or point3 == 'nhorizontal':
             # draw vertical or horizontal line
-            draw_dotted_line(self.frame, coord2, start=coord2[1] - 50, end=coord2[1] + 20,
-                             line_color=self.__get_color__(dotted_line_color))
+            self.canvas.dotted_line(coord2, start=coord2[1] - 50, end=coord2[1] + 20,
+                                    color=self.__get_color__(dotted_line_color))
         else:
             self.line(point2, point3, line_color, 4)
 
@@ -258,27 +338,42 @@ class FrameInstance:
             self.circle(point3, radius=7, color=point_color)
 
         # show angle value
-        cv2.putText(self.frame, str(int(angle)), (coord2[0] + 15, coord2[1]), FONT, 0.6,
-                    self.__get_color__(text_color), 2, lineType=LINE_TYPE)
+        self.canvas.text(str(int(angle)), (coord2[0] + 15, coord2[1]), 0.6,
+                         self.__get_color__(text_color), 2, LINE_TYPE)
 
         return int(angle)
 
     def circle(self, *args, radius=7, color='yellow'):
         for arg in args:
             if arg in self.coord and self.coord[arg] is not None:
-                cv2.circle(self.frame, self.coord[arg], radius, self.__get_color__(color), -1)
+                self.canvas.circle(self.coord[arg], radius, self.__get_color__(color), -1)
 
     def line(self, pt1, pt2, color='light_blue', thickness=4):
         if pt1 in self.coord and pt2 in self.coord and self.coord[pt1] is not None and self.coord[pt2] is not None:
-            cv2.line(self.frame, self.coord[pt1], self.coord[pt2], self.__get_color__(color), thickness, LINE_TYPE)
+            self.canvas.line(self.coord[pt1], self.coord[pt2], self.__get_color__(color), thickness, LINE_TYPE)
+
+    def draw_line(self, coord1, coord2, color='light_blue', thickness=2, line_type=LINE_TYPE):
+        """按像素坐标画线（用于参考线等非关键点连线）"""
+        self.canvas.line(coord1, coord2, self.__get_color__(color), thickness, line_type)
 
     def draw_text(self, text, width=8, font=FONT, pos=(0, 0), font_scale=1.0, font_thickness=2, text_color=(0, 255, 0)
                   , bg_color=(0, 0, 0)):
-        self.frame = draw_text(self.frame, text, width, font, pos, font_scale, font_thickness, text_color, bg_color)
+        # 固定文本复用缓存的标签精灵，含数字的文本按字形缓存绘制
+        self.canvas.label(text, width, pos, font_scale, text_color, bg_color)
 
     def put_text(self, text, pos, font_scale, color, thickness, line_type=LINE_TYPE):
-        cv2.putText(self.frame, text=text, org=pos, fontFace=FONT, fontScale=font_scale,
-                    color=self.__get_color__(color), thickness=thickness, lineType=line_type)
+        self.canvas.text(text, pos, font_scale, self.__get_color__(color), thickness, line_type, FONT)
+
+    def flush(self, render=True):
+        """
+        合成本帧记录的全部图元并返回输出帧
+        render=False 时（输出不会被查看）直接丢弃图元，跳过全部渲染
+        """
+        if render:
+            self.frame = self.canvas.composite(self.frame)
+        else:
+            self.canvas.clear()
+        return self.frame
 
     def show_feedback(self, text, y, text_color, bg_color):
         self.draw_text(
@@ -292,7 +387,7 @@ class FrameInstance:
         return self.frame
 
     def __get_angle__(self, point1, point2, point3):
-        key = point1 + '#' + point2 + '#' + point3
+        key = (point1, point2, point3)
         if key not in self.angle:
             coord1 = self.get_coord(point1)
             coord2 = self.get_coord(point2)
@@ -312,7 +407,7 @@ class FrameInstance:
             if coord3 is None:
                 return 0, np.array([0, 0]), np.array([0, 0]), np.array([0, 0])
 
-            angle = find_angle(coord1, coord3, coord2)
+            angle = int(find_angles((coord1, coord2, coord3)))
             self.angle[key] = {
                 'angle': angle,
                 'coord1': coord1,
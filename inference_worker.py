@@ -0,0 +1,138 @@
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+from frame_instance import FrameInstance
+from process import evaluate
+
+# 一次完成的推理：待合成的叠加层、对应帧的提交时间与完成时间、像素坐标关键点
+InferenceResult = namedtuple('InferenceResult', ['overlay', 'timestamp', 'finished_at', 'landmarks'])
+
+
+class InferenceWorker:
+    """
+    后台推理线程：视频回调把帧放进单槽“最新帧优先”信箱后立即返回，
+    worker 只处理信箱里最新的一帧，来不及处理的旧帧直接丢弃而不排队
+    """
+
+    def __init__(self, pose, state_tracker, face_mesh=None, on_result=None, metrics=None, history=None):
+        self.pose = pose
+        self.state_tracker = state_tracker
+        self.face_mesh = face_mesh
+        # 每处理完一帧在 worker 线程中回调 on_result(frame_instance, 帧被提交时的墙上时间)
+        self.on_result = on_result
+        self.metrics = metrics  # 可选的 PipelineMetrics，记录排队、推理与规则耗时
+        self.history = history  # 可选的 MetricHistory，记录每帧的坐姿指标
+
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+
+        self._cond = threading.Condition()
+        self._pending = None  # (帧, 提交时间)
+        self._result = None
+        self._running = True
+        self._exited = False
+        self._on_stopped = None
+        self._thread = threading.Thread(target=self._run, name='inference-worker', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, timestamp=None):
+        """放入最新帧后立即返回；worker 会读取该帧，提交后调用方不应再修改它"""
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+                if self.metrics is not None:
+                    self.metrics.count('dropped')
+            self._pending = (frame, time.perf_counter() if timestamp is None else timestamp)
+            self.submitted += 1
+            self._cond.notify()
+
+    def latest(self):
+        """最近一次完成的推理结果，尚无结果时为 None"""
+        return self._result
+
+    def annotate(self, frame):
+        """
+        把最近一次完成的叠加层合成到 frame 上；标签精灵与脏矩形在该结果第一次合成时解析，
+        直到下一个结果到达前的输出帧只做绘制与混合
+        """
+        result = self._result
+        if result is not None:
+            frame = result.overlay.composite(frame, clear=False)
+        return frame
+
+    def stats(self):
+        result = self._result
+        with self._cond:
+            return {
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'pending': self._pending is not None,
+                # 当前显示的标注距其对应帧被提交已过去的时间
+                'result_age': time.perf_counter() - result.timestamp if result is not None else None,
+            }
+
+    def stop(self, timeout=1.0, on_stopped=None):
+        """
+        停止推理线程，最多等待 timeout 秒，返回线程是否已经退出。
+        on_stopped 在线程确实退出后恰好调用一次：线程已退出时在调用线程中立即调用，
+        否则由推理线程处理完手上的帧、退出前调用，调用方可以把归还模型等清理工作交给它
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+            if not self._exited:
+                self._on_stopped = on_stopped
+                on_stopped = None
+        if on_stopped is not None:
+            on_stopped()
+        self._thread.join(timeout)
+        return not self._thread.is_alive()
+
+    def _run(self):
+        try:
+            self._loop()
+        finally:
+            with self._cond:
+                self._exited = True
+                on_stopped, self._on_stopped = self._on_stopped, None
+            if on_stopped is not None:
+                on_stopped()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame, timestamp = self._pending
+                self._pending = None
+
+            try:
+                started = time.perf_counter()
+                # 提交时间是 perf_counter 读数，换算成墙上时间，记录的时间轴不含排队与推理的延迟
+                captured_at = time.time() - (started - timestamp)
+                frame_instance = FrameInstance(frame, self.pose, self.face_mesh, deferred=True, timestamp=timestamp)
+                inferred = time.perf_counter()
+                evaluate(frame_instance, self.state_tracker, history=self.history)
+                finished = time.perf_counter()
+                self._result = InferenceResult(frame_instance.canvas, timestamp, finished,
+                                               frame_instance.landmarks)
+                with self._cond:
+                    self.processed += 1
+                if self.metrics is not None:
+                    self.metrics.record('queue_wait', started - timestamp)
+                    self.metrics.record('inference', inferred - started)
+                    self.metrics.record('rules', finished - inferred)
+                    self.metrics.count('processed')
+                    self.metrics.inference_rate.tick(finished)
+                if self.on_result is not None:
+                    self.on_result(frame_instance, captured_at)
+                    if self.metrics is not None:
+                        self.metrics.record('record', time.perf_counter() - finished)
+            except Exception:
+                traceback.print_exc()
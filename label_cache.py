@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import utils
+from utils import draw_rounded_rect, blend_mask, label_layout, rasterize_text
+
+
+class LabelSprite:
+    """预渲染的 HUD 标签：预乘颜色 + 透明度，相对标签锚点的偏移"""
+
+    __slots__ = ('color', 'inv_alpha', 'offset', 'nbytes')
+
+    def __init__(self, color, alpha, offset):
+        self.color = color  # (h, w, 3) uint16，已按 alpha 预乘
+        self.inv_alpha = (255 - alpha.astype(np.uint16))[..., None]  # (h, w, 1) uint16
+        self.offset = offset  # 精灵左上角相对 pos 的偏移
+        self.nbytes = self.color.nbytes + self.inv_alpha.nbytes
+
+    def blit(self, img, x, y):
+        """一次向量化运算把精灵混合到 img 的 (x, y) 处"""
+        h, w = self.inv_alpha.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w, img.shape[1]), min(y + h, img.shape[0])
+        if x0 >= x1 or y0 >= y1:
+            return img
+
+        roi = img[y0:y1, x0:x1]
+        sy, sx = slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)
+        roi[...] = self.color[sy, sx] + (roi * self.inv_alpha[sy, sx] + 127) // 255
+        return img
+
+
+def render_label(text, width, font_scale, text_color, bg_color, box_offset):
+    """按 draw_text 的排版把标签渲染成精灵，锚点取 pos=(0, 0)"""
+    rec_start, rec_end, text_pos = label_layout(text, (0, 0), font_scale, box_offset)
+    mask, (mask_x, mask_y) = rasterize_text(text)
+    text_x, text_y = text_pos[0] + mask_x, text_pos[1] + mask_y
+
+    # 精灵范围取背景框（cv2 填充包含端点）与文字掩码的并集
+    left = min(rec_start[0], text_x)
+    top = min(rec_start[1], text_y)
+    right = max(rec_end[0] + 1, text_x + mask.shape[1])
+    bottom = max(rec_end[1] + 1, text_y + mask.shape[0])
+
+    color = np.zeros((bottom - top, right - left, 3), dtype=np.uint8)
+    alpha = np.zeros((bottom - top, right - left), dtype=np.uint8)
+    box_start = (rec_start[0] - left, rec_start[1] - top)
+    box_end = (rec_end[0] - left, rec_end[1] - top)
+    draw_rounded_rect(color, box_start, box_end, width, bg_color)
+    draw_rounded_rect(alpha, box_start, box_end, width, 255)
+
+    if mask.size:
+        # 黑底上混合出的文字颜色即为预乘颜色；文字颜色与 draw_zh 一样按逆序写入
+        blend_mask(color, mask, text_x - left, text_y - top, tuple(text_color)[::-1])
+        region = alpha[text_y - top:text_y - top + mask.shape[0], text_x - left:text_x - left + mask.shape[1]]
+        np.maximum(region, mask, out=region)
+
+    return LabelSprite(color.astype(np.uint16), alpha, (left, top))
+
+
+def is_dynamic_text(text):
+    """含数字的标签（持续时间、角度）每帧都在变化，不进入精灵缓存"""
+    return any(ch.isdigit() for ch in text)
+
+
+class LabelSpriteCache:
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.dynamic = 0  # 绕过缓存、直接按字形绘制的次数
+
+    def get(self, text, width=8, font_scale=1, text_color=(0, 255, 0), bg_color=(0, 0, 0), box_offset=(20, 10)):
+        """返回标签精灵，未命中时渲染并按 LRU 淘汰超出内存上限的旧精灵"""
+        key = (text, tuple(text_color), tuple(bg_color), width, font_scale, tuple(box_offset),
+               utils.FONT_PATH, utils.FONT_SIZE)
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+            self.misses += 1
+
+        sprite = render_label(text, width, font_scale, text_color, bg_color, box_offset)
+
+        with self._lock:
+            if key not in self._sprites:
+                self._sprites[key] = sprite
+                self._bytes += sprite.nbytes
+                while self._bytes > self.max_bytes and len(self._sprites) > 1:
+                    _, evicted = self._sprites.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    self.evictions += 1
+        return sprite
+
+    def sprite_for(self, text, width=8, font_scale=1, text_color=(0, 255, 0), bg_color=(0, 0, 0),
+                   box_offset=(20, 10)):
+        """返回可合成的精灵；含数字的文本每次现渲染，不占用缓存"""
+        if is_dynamic_text(text):
+            with self._lock:
+                self.dynamic += 1
+            return render_label(text, width, font_scale, text_color, bg_color, box_offset)
+        return self.get(text, width, font_scale, text_color, bg_color, box_offset)
+
+    def draw(self, img, text, width=8, pos=(0, 0), font_scale=1, text_color=(0, 255, 0), bg_color=(0, 0, 0),
+             box_offset=(20, 10)):
+        """与 utils.draw_text 效果相同的标签绘制，固定文本走精灵缓存"""
+        if is_dynamic_text(text):
+            with self._lock:
+                self.dynamic += 1
+            return utils.draw_text(img, text, width, pos=pos, font_scale=font_scale, text_color=text_color,
+                                   text_color_bg=bg_color, box_offset=box_offset)
+
+        sprite = self.get(text, width, font_scale, text_color, bg_color, box_offset)
+        return sprite.blit(img, int(pos[0]) + sprite.offset[0], int(pos[1]) + sprite.offset[1])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'dynamic': self.dynamic,
+                'entries': len(self._sprites),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._sprites.clear()
+            self._bytes = 0
+
+
+# 全局标签精灵缓存
+label_cache = LabelSpriteCache()
@@ -0,0 +1,174 @@
+"""
+关键点列式存储：把每帧的姿态关键点按列追加到目录中的三个原始二进制文件，
+读取时用 np.memmap 映射，按时间范围返回零拷贝的 NumPy 视图。
+
+目录结构：
+    meta.json        数据类型、关键点数量、画面尺寸等元信息
+    landmarks.bin    (N, 33, 4) 归一化坐标 (x, y, z, visibility)，默认 float16
+    timestamps.bin   (N,) float64 帧时间（秒），单调递增
+    valid.bin        (N,) uint8，该帧是否检测到人体
+
+帧数由各列文件的大小推出，因此写入中途崩溃时已落盘的整块数据依然可读。
+float16 下每帧约 273 字节，30 fps 录制一小时约 30 MB。
+"""
+import json
+import os
+
+import numpy as np
+
+META_FILE = 'meta.json'
+COLUMN_FILES = {
+    'landmarks': 'landmarks.bin',
+    'timestamps': 'timestamps.bin',
+    'valid': 'valid.bin',
+}
+FORMAT_VERSION = 1
+
+
+def _read_meta(path):
+    with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+class LandmarkWriter:
+    """
+    追加写入器：帧先写入预分配的块缓冲区，攒满 chunk_frames 帧后一次性追加到各列文件。
+    目录已存在时继续追加，要求数据类型与关键点数量一致
+    """
+
+    def __init__(self, path, dtype='float16', num_landmarks=33, chunk_frames=300,
+                 frame_width=None, frame_height=None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        if os.path.exists(os.path.join(path, META_FILE)):
+            meta = _read_meta(path)
+            if meta['dtype'] != np.dtype(dtype).name or meta['num_landmarks'] != num_landmarks:
+                raise ValueError(f"{path} 中已有 {meta['dtype']} x {meta['num_landmarks']} 的记录，"
+                                 f"无法追加 {np.dtype(dtype).name} x {num_landmarks}")
+            frame_width = frame_width or meta.get('frame_width')
+            frame_height = frame_height or meta.get('frame_height')
+
+        self.dtype = np.dtype(dtype)
+        self.num_landmarks = num_landmarks
+        self.chunk_frames = chunk_frames
+        self.frame_width = frame_width
+        self.frame_height = frame_height
+
+        self._landmarks = np.zeros((chunk_frames, num_landmarks, 4), dtype=self.dtype)
+        self._timestamps = np.zeros(chunk_frames, dtype=np.float64)
+        self._valid = np.zeros(chunk_frames, dtype=np.uint8)
+        self._count = 0
+        self._files = {name: open(os.path.join(path, filename), 'ab')
+                       for name, filename in COLUMN_FILES.items()}
+        self.frames = self._existing_frames()
+        self._write_meta()
+
+    def _existing_frames(self):
+        return os.path.getsize(os.path.join(self.path, COLUMN_FILES['timestamps'])) // 8
+
+    def _write_meta(self):
+        # 先写临时文件再替换，读取方不会看到写了一半的 meta.json
+        meta = {
+            'version': FORMAT_VERSION,
+            'dtype': self.dtype.name,
+            'num_landmarks': self.num_landmarks,
+            'frame_width': self.frame_width,
+            'frame_height': self.frame_height,
+        }
+        tmp = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+
+    def set_frame_size(self, frame_width, frame_height):
+        """记录画面尺寸，回放时用它把归一化坐标换算回像素（肩膀差阈值以像素为单位）"""
+        if (frame_width, frame_height) != (self.frame_width, self.frame_height):
+            self.frame_width = frame_width
+            self.frame_height = frame_height
+            self._write_meta()
+
+    def append(self, timestamp, landmarks=None):
+        """追加一帧；landmarks 为 (num_landmarks, 4) 归一化坐标，未检测到人体时传 None"""
+        i = self._count
+        self._timestamps[i] = timestamp
+        if landmarks is None:
+            self._landmarks[i] = 0
+            self._valid[i] = 0
+        else:
+            self._landmarks[i] = landmarks
+            self._valid[i] = 1
+        self._count += 1
+        if self._count == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区中的帧追加到各列文件；时间戳列最后写，保证帧数按它计算时其它列已完整"""
+        n = self._count
+        if n == 0:
+            return
+        for name, column in (('landmarks', self._landmarks), ('valid', self._valid),
+                             ('timestamps', self._timestamps)):
+            self._files[name].write(column[:n].tobytes())
+            self._files[name].flush()
+        self.frames += n
+        self._count = 0
+
+    def close(self):
+        if self._files is None:
+            return
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkReader:
+    """只读映射一段记录，read_range 返回的数组都是 memmap 上的切片，不复制数据"""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = _read_meta(path)
+        self.dtype = np.dtype(self.meta['dtype'])
+        self.num_landmarks = self.meta['num_landmarks']
+        self.frame_width = self.meta.get('frame_width')
+        self.frame_height = self.meta.get('frame_height')
+
+        frame_bytes = {
+            'landmarks': self.num_landmarks * 4 * self.dtype.itemsize,
+            'timestamps': 8,
+            'valid': 1,
+        }
+        # 以最短的列为准，忽略崩溃时写了一半的块
+        self.frames = min(os.path.getsize(os.path.join(path, COLUMN_FILES[name])) // size
+                          for name, size in frame_bytes.items())
+
+        self.timestamps = self._map('timestamps', np.float64, (self.frames,))
+        self.landmarks = self._map('landmarks', self.dtype, (self.frames, self.num_landmarks, 4))
+        self.valid = self._map('valid', np.uint8, (self.frames,))
+
+    def _map(self, name, dtype, shape):
+        if self.frames == 0:
+            # 空文件无法 memmap
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, COLUMN_FILES[name]), dtype=dtype, mode='r', shape=shape)
+
+    def __len__(self):
+        return self.frames
+
+    def index_range(self, start=None, end=None):
+        """时间范围 [start, end) 对应的帧下标范围"""
+        i = 0 if start is None else int(np.searchsorted(self.timestamps, start, side='left'))
+        j = self.frames if end is None else int(np.searchsorted(self.timestamps, end, side='left'))
+        return i, j
+
+    def read_range(self, start=None, end=None):
+        """返回 [start, end) 内的 (timestamps, landmarks, valid) 视图"""
+        i, j = self.index_range(start, end)
+        return self.timestamps[i:j], self.landmarks[i:j], self.valid[i:j]
@@ -0,0 +1,213 @@
+import math
+import time
+
+import numpy as np
+
+from state_tracker import POSTURE_TYPES
+
+# 每帧记录的坐姿规则输入
+METRIC_NAMES = ('head_forward_angle', 'tilt_deviation', 'shoulder_level_diff')
+# StateTracker.curr_state 的编码
+STATE_CODES = {None: 0, 'no_posture': 1, 'good_posture': 2, 'bad_posture': 3}
+
+# 逐级降采样的层：(每个桶的秒数, 保留的桶数)，依次覆盖 1 小时、1 天、1 周
+HISTORY_TIERS = ((1, 3600), (60, 1440), (600, 1008))
+
+
+def frame_dtype(num_postures):
+    """原始帧：时间、各项指标、是否检测到完整关键点、状态编码、每种不良姿势是否正在计时"""
+    return np.dtype([
+        ('time', np.float64),
+        ('values', np.float32, (len(METRIC_NAMES),)),
+        ('valid', np.bool_),
+        ('state', np.int8),
+        ('bad', np.bool_, (num_postures,)),
+    ])
+
+
+def bucket_dtype(num_postures):
+    """降采样桶：起始时间、帧数、有效帧数、有效帧指标的 min/mean/max、各不良姿势所占帧比例"""
+    return np.dtype([
+        ('time', np.float64),
+        ('frames', np.int32),
+        ('valid', np.int32),
+        ('min', np.float32, (len(METRIC_NAMES),)),
+        ('mean', np.float32, (len(METRIC_NAMES),)),
+        ('max', np.float32, (len(METRIC_NAMES),)),
+        ('bad', np.float32, (num_postures,)),
+    ])
+
+
+class RingTable:
+    """预分配的结构化数组环形缓冲区，count 为累计写入的行数"""
+
+    def __init__(self, dtype, capacity):
+        self.rows = np.zeros(capacity, dtype=dtype)
+        self.count = 0
+
+    def next_index(self):
+        """下一行的位置；调用方写完该行后再调用 commit()"""
+        return self.count % len(self.rows)
+
+    def commit(self):
+        self.count += 1
+
+    def since(self, start):
+        """累计序号从 start 起、仍在缓冲区中的行，按时间顺序复制出来"""
+        start = max(start, self.count - len(self.rows), 0)
+        return self.rows.take(np.arange(start, self.count) % len(self.rows))
+
+    def tail(self, n):
+        return self.since(self.count - n)
+
+
+def reduce_frames(frames, dtype):
+    """把一个桶内的原始帧汇总成一行"""
+    bucket = np.zeros((), dtype=dtype)
+    bucket['frames'] = len(frames)
+    values = frames['values'][frames['valid']]
+    bucket['valid'] = len(values)
+    if len(values):
+        bucket['min'] = values.min(axis=0)
+        bucket['mean'] = values.mean(axis=0)
+        bucket['max'] = values.max(axis=0)
+    else:
+        bucket['min'] = bucket['mean'] = bucket['max'] = np.nan
+    bucket['bad'] = frames['bad'].mean(axis=0)
+    return bucket
+
+
+def reduce_buckets(buckets, dtype):
+    """把若干个低一级的桶合并成一行：均值按有效帧数加权，比例按帧数加权"""
+    bucket = np.zeros((), dtype=dtype)
+    frames = buckets['frames']
+    bucket['frames'] = frames.sum()
+    valid = buckets['valid']
+    bucket['valid'] = valid.sum()
+    has_values = valid > 0
+    if has_values.any():
+        weights = valid[has_values, None].astype(np.float64)
+        bucket['min'] = buckets['min'][has_values].min(axis=0)
+        bucket['mean'] = (buckets['mean'][has_values] * weights).sum(axis=0) / weights.sum()
+        bucket['max'] = buckets['max'][has_values].max(axis=0)
+    else:
+        bucket['min'] = bucket['mean'] = bucket['max'] = np.nan
+    bucket['bad'] = (buckets['bad'] * frames[:, None]).sum(axis=0) / max(frames.sum(), 1)
+    return bucket
+
+
+class _Tier:
+    __slots__ = ('resolution', 'table', 'key', 'start')
+
+    def __init__(self, resolution, capacity, dtype):
+        self.resolution = resolution
+        self.table = RingTable(dtype, capacity)
+        self.key = None    # 正在累积的桶编号（时间 // resolution）
+        self.start = 0     # 该桶在下一级输入中的起始累计序号
+
+
+class MetricHistory:
+    """
+    每帧坐姿指标的定长历史：原始帧写入预分配的环形缓冲区，
+    每过一个整秒/整分钟/整 10 分钟，把刚结束的桶从下一级汇总成 min/mean/max 写入对应的层。
+    写入一帧只是几次数组赋值，汇总只在桶结束时对不超过一个桶的数据进行；内存与运行时长无关
+    """
+
+    def __init__(self, raw_capacity=4096, tiers=HISTORY_TIERS, clock=time.time):
+        # 记录时间所用的时钟：默认墙上时间，桶边界对齐到真实的整秒/整分钟，系统休眠后也不会错位
+        self.clock = clock
+        num_postures = len(POSTURE_TYPES)
+        self.raw = RingTable(frame_dtype(num_postures), raw_capacity)
+        self._bucket_dtype = bucket_dtype(num_postures)
+        self.tiers = [_Tier(resolution, capacity, self._bucket_dtype) for resolution, capacity in tiers]
+        # 每结束一个桶回调 on_bucket(桶秒数, 桶)，用于把分钟汇总持久化
+        self.on_bucket = None
+        # 原始缓冲区各列的视图，逐帧写入直接在列上进行
+        rows = self.raw.rows
+        self._time = rows['time']
+        self._values = rows['values']
+        self._valid = rows['valid']
+        self._state = rows['state']
+        self._bad = rows['bad']
+
+    def record(self, timestamp, metrics, state, bad):
+        """
+        追加一帧。metrics 为 trainer_process 返回的 PostureMetrics，state 为 StateTracker 的当前状态，
+        bad 为按姿势 id 排列的正在计时标志（StateTracker.active_mask）
+        """
+        self._advance(0, timestamp)
+        i = self.raw.next_index()
+        self._time[i] = timestamp
+        self._values[i] = (metrics.head_forward_angle, metrics.tilt_deviation, metrics.shoulder_level_diff)
+        self._valid[i] = metrics.detected
+        self._state[i] = STATE_CODES.get(state, 0)
+        self._bad[i] = bad
+        self.raw.commit()
+
+    def _advance(self, level, timestamp):
+        """第 level 层的输入将追加一行时间为 timestamp 的数据：若它属于新的桶，先结束当前的桶"""
+        tier = self.tiers[level]
+        key = math.floor(timestamp / tier.resolution)
+        if key == tier.key:
+            return
+        self._finish(level)
+        tier.key = key
+        tier.start = (self.raw if level == 0 else self.tiers[level - 1].table).count
+
+    def _finish(self, level):
+        """把第 level 层正在累积的桶汇总写入该层，并通知 on_bucket"""
+        tier = self.tiers[level]
+        if tier.key is None:
+            return
+        source = self.raw if level == 0 else self.tiers[level - 1].table
+        rows = source.since(tier.start)
+        if not len(rows):
+            return
+        reduce = reduce_frames if level == 0 else reduce_buckets
+        bucket = reduce(rows, self._bucket_dtype)
+        bucket['time'] = tier.key * tier.resolution
+        if level + 1 < len(self.tiers):
+            self._advance(level + 1, float(bucket['time']))
+        tier.table.rows[tier.table.next_index()] = bucket
+        tier.table.commit()
+        if self.on_bucket is not None:
+            self.on_bucket(tier.resolution, bucket)
+
+    def flush(self):
+        """
+        结束所有层正在累积的桶（会话结束时调用），最后不足一个桶的数据也写入各层并通知 on_bucket；
+        之后再记录的帧从新的桶开始
+        """
+        for level, tier in enumerate(self.tiers):
+            self._finish(level)
+            tier.key = None
+
+    def latest_time(self):
+        return float(self._time[(self.raw.count - 1) % len(self._time)]) if self.raw.count else None
+
+    def frames(self, seconds):
+        """最近 seconds 秒内的原始帧"""
+        now = self.latest_time()
+        if now is None:
+            return self.raw.rows[:0]
+        rows = self.raw.tail(len(self._time))
+        return rows[rows['time'] > now - seconds]
+
+    def series(self, seconds, max_points=600):
+        """
+        最近 seconds 秒的降采样序列：选择桶数不超过 max_points 的最细的一层，
+        返回 (桶秒数, 桶数组)；还没有结束的桶不包括在内
+        """
+        now = self.latest_time()
+        tier = self.tiers[-1]
+        for candidate in self.tiers:
+            if seconds / candidate.resolution <= max_points:
+                tier = candidate
+                break
+        if now is None:
+            return tier.resolution, tier.table.rows[:0]
+        rows = tier.table.tail(len(tier.table.rows))
+        return tier.resolution, rows[rows['time'] > now - seconds]
+
+    def memory_bytes(self):
+        return self.raw.rows.nbytes + sum(tier.table.rows.nbytes for tier in self.tiers)
@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+
+# 实时流水线计时的阶段：等待推理的排队时间、解码、姿态推理、坐姿规则、关键点记录与提醒检查、叠加层合成、编码
+PIPELINE_STAGES = ('queue_wait', 'decode', 'inference', 'rules', 'record', 'overlay', 'encode')
+PIPELINE_COUNTERS = ('frames_in', 'processed', 'dropped')
+
+
+class LatencyRing:
+    """
+    固定容量的耗时环形缓冲区：写入只是一次数组赋值，不分配内存，
+    分位数在读取时才对最近 capacity 个样本计算
+    """
+
+    __slots__ = ('_samples', '_index', 'count')
+
+    def __init__(self, capacity=512):
+        self._samples = np.zeros(capacity, dtype=np.float64)
+        self._index = 0
+        self.count = 0
+
+    def record(self, seconds):
+        self._samples[self._index] = seconds
+        self._index = (self._index + 1) % len(self._samples)
+        self.count += 1
+
+    def values(self):
+        """最近的样本（秒），顺序不保证"""
+        return self._samples[:min(self.count, len(self._samples))].copy()
+
+    def percentiles(self, q=(50, 95, 99)):
+        """毫秒分位数，还没有样本时为 None"""
+        values = self.values()
+        if len(values) == 0:
+            return None
+        return np.percentile(values * 1000, q)
+
+
+class RateMeter:
+    """用最近 capacity 个事件的时间戳估计每秒事件数"""
+
+    __slots__ = ('_times', '_index', 'count')
+
+    def __init__(self, capacity=64):
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._index = 0
+        self.count = 0
+
+    def tick(self, now):
+        self._times[self._index] = now
+        self._index = (self._index + 1) % len(self._times)
+        self.count += 1
+
+    def rate(self):
+        n = min(self.count, len(self._times))
+        if n < 2:
+            return 0.0
+        times = self._times[:n]
+        span = times.max() - times.min()
+        return (n - 1) / span if span > 0 else 0.0
+
+
+class PipelineMetrics:
+    """
+    一个检测会话的热路径指标：各阶段耗时环形缓冲区、帧计数与输入/推理帧率。
+    每个阶段和计数器只由一个线程写入（视频回调线程或推理线程），读取方拿到的是近似快照
+    """
+
+    def __init__(self, capacity=512, clock=time.perf_counter):
+        self.clock = clock
+        self.stages = {stage: LatencyRing(capacity) for stage in PIPELINE_STAGES}
+        self.counters = dict.fromkeys(PIPELINE_COUNTERS, 0)
+        self.input_rate = RateMeter()
+        self.inference_rate = RateMeter()
+
+    def record(self, stage, seconds):
+        self.stages[stage].record(seconds)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def snapshot(self):
+        """{'fps': {...}, 'counters': {...}, 'stages': {阶段: {'p50', 'p95', 'p99', 'count'}}}，耗时单位毫秒"""
+        stages = {}
+        for stage, ring in self.stages.items():
+            percentiles = ring.percentiles()
+            if percentiles is not None:
+                p50, p95, p99 = percentiles
+                stages[stage] = {'p50': p50, 'p95': p95, 'p99': p99, 'count': ring.count}
+        return {
+            'fps': {'input': self.input_rate.rate(), 'inference': self.inference_rate.rate()},
+            'counters': dict(self.counters),
+            'stages': stages,
+        }
@@ -0,0 +1,201 @@
+import cv2
+import numpy as np
+
+from utils import draw_dotted_line
+from label_cache import label_cache
+
+
+def _pt(coord):
+    return int(coord[0]), int(coord[1])
+
+
+class ImmediateCanvas:
+    """立即模式：每个绘制调用直接修改帧"""
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def line(self, pt1, pt2, color, thickness, line_type=cv2.LINE_8):
+        cv2.line(self.frame, _pt(pt1), _pt(pt2), color, thickness, line_type)
+
+    def circle(self, center, radius, color, thickness=-1, line_type=cv2.LINE_8):
+        cv2.circle(self.frame, _pt(center), radius, color, thickness, line_type)
+
+    def ellipse(self, center, axes, start_angle, end_angle, color, thickness, line_type=cv2.LINE_8):
+        cv2.ellipse(self.frame, _pt(center), axes, angle=0, startAngle=start_angle, endAngle=end_angle,
+                    color=color, thickness=thickness, lineType=line_type)
+
+    def dotted_line(self, coord, start, end, color):
+        draw_dotted_line(self.frame, _pt(coord), start, end, color)
+
+    def text(self, text, org, font_scale, color, thickness, line_type=cv2.LINE_8, font=cv2.FONT_HERSHEY_SIMPLEX):
+        cv2.putText(self.frame, text, _pt(org), font, font_scale, color, thickness, line_type)
+
+    def label(self, text, width, pos, font_scale, text_color, bg_color):
+        self.frame = label_cache.draw(self.frame, text, width, pos, font_scale, text_color, bg_color)
+
+    def composite(self, frame, clear=True):
+        return self.frame
+
+    def clear(self):
+        pass
+
+
+def cluster_boxes(boxes, gap=8):
+    """
+    把相互重叠或间距不超过 gap 像素的矩形 (x0, y0, x1, y1) 合并成簇，
+    返回 [(簇包围框, 成员下标列表)]，不同簇的包围框互不重叠
+    """
+    clusters = []
+    for i, (x0, y0, x1, y1) in enumerate(boxes):
+        members = [i]
+        k = 0
+        while k < len(clusters):
+            (cx0, cy0, cx1, cy1), cluster_members = clusters[k]
+            if cx0 - gap <= x1 and x0 - gap <= cx1 and cy0 - gap <= y1 and y0 - gap <= cy1:
+                # 合并后包围框变大，可能与之前不相交的簇相交，从头重新检查
+                x0, y0, x1, y1 = min(x0, cx0), min(y0, cy0), max(x1, cx1), max(y1, cy1)
+                members += cluster_members
+                clusters.pop(k)
+                k = 0
+            else:
+                k += 1
+        clusters.append(((x0, y0, x1, y1), members))
+    return clusters
+
+
+def _draw(buf, layer, item, x0, y0):
+    """在左上角对应帧坐标 (x0, y0) 的缓冲区上绘制一个图元"""
+    if layer == 'line':
+        pt1, pt2, color, thickness, line_type = item
+        cv2.line(buf, (pt1[0] - x0, pt1[1] - y0), (pt2[0] - x0, pt2[1] - y0), color, thickness, line_type)
+    elif layer == 'ellipse':
+        center, axes, start_angle, end_angle, color, thickness, line_type = item
+        cv2.ellipse(buf, (center[0] - x0, center[1] - y0), axes, angle=0, startAngle=start_angle,
+                    endAngle=end_angle, color=color, thickness=thickness, lineType=line_type)
+    elif layer == 'circle':
+        center, radius, color, thickness, line_type = item
+        cv2.circle(buf, (center[0] - x0, center[1] - y0), radius, color, thickness, line_type)
+    elif layer == 'text':
+        text, org, font, font_scale, color, thickness, line_type = item
+        cv2.putText(buf, text, (org[0] - x0, org[1] - y0), font, font_scale, color, thickness, line_type)
+    else:
+        sprite, x, y = item
+        sprite.blit(buf, x - x0, y - y0)
+
+
+class DisplayList:
+    """
+    延迟模式：绘制调用只记录图元，每帧末尾由 composite 统一合成
+    图元按所在位置聚成互不重叠的脏矩形（如骨架与分处两角的 HUD 标签各成一块），
+    每块复制到叠加缓冲区、按图层顺序绘制后单独写回，只触及图元实际覆盖的区域。
+    脏矩形与标签精灵在第一次合成时解析并保留到图元改变为止，
+    异步推理把同一叠加层合成到后续多帧上时不再重新栅格化含数字的标签
+    """
+
+    # 合成顺序：线条在下，关键点在上，文字与 HUD 标签位于最上层
+    LAYERS = ('line', 'ellipse', 'circle', 'text', 'label')
+
+    def __init__(self, merge_gap=8):
+        self.items = {layer: [] for layer in self.LAYERS}
+        self.merge_gap = merge_gap  # 间距不超过该值（像素）的脏矩形合并写回
+        self._buffer = None
+        self._regions_cache = None  # 已解析的脏矩形与精灵，记录新图元或清空时作废
+
+    def __len__(self):
+        return sum(len(items) for items in self.items.values())
+
+    def line(self, pt1, pt2, color, thickness, line_type=cv2.LINE_8):
+        self._regions_cache = None
+        self.items['line'].append((_pt(pt1), _pt(pt2), color, thickness, line_type))
+
+    def circle(self, center, radius, color, thickness=-1, line_type=cv2.LINE_8):
+        self._regions_cache = None
+        self.items['circle'].append((_pt(center), radius, color, thickness, line_type))
+
+    def ellipse(self, center, axes, start_angle, end_angle, color, thickness, line_type=cv2.LINE_8):
+        self._regions_cache = None
+        self.items['ellipse'].append((_pt(center), axes, start_angle, end_angle, color, thickness, line_type))
+
+    def dotted_line(self, coord, start, end, color):
+        x = int(coord[0])
+        for i in range(start, end + 1, 8):
+            self.circle((x, i), 2, color, -1, cv2.LINE_AA)
+
+    def text(self, text, org, font_scale, color, thickness, line_type=cv2.LINE_8, font=cv2.FONT_HERSHEY_SIMPLEX):
+        self._regions_cache = None
+        self.items['text'].append((text, _pt(org), font, font_scale, color, thickness, line_type))
+
+    def label(self, text, width, pos, font_scale, text_color, bg_color):
+        self._regions_cache = None
+        self.items['label'].append((text, width, _pt(pos), font_scale, tuple(text_color), tuple(bg_color)))
+
+    def clear(self):
+        self._regions_cache = None
+        for items in self.items.values():
+            items.clear()
+
+    def _primitives(self):
+        """按合成顺序列出 (图层, 图元, 包围框)；标签图元换成 (精灵, x, y)"""
+        primitives = []
+        for item in self.items['line']:
+            pt1, pt2, color, thickness, line_type = item
+            pad = thickness + 2
+            primitives.append(('line', item, (min(pt1[0], pt2[0]) - pad, min(pt1[1], pt2[1]) - pad,
+                                              max(pt1[0], pt2[0]) + pad, max(pt1[1], pt2[1]) + pad)))
+        for item in self.items['ellipse']:
+            center, axes, start_angle, end_angle, color, thickness, line_type = item
+            pad = thickness + 2
+            primitives.append(('ellipse', item, (center[0] - axes[0] - pad, center[1] - axes[1] - pad,
+                                                 center[0] + axes[0] + pad, center[1] + axes[1] + pad)))
+        for item in self.items['circle']:
+            center, radius, color, thickness, line_type = item
+            pad = radius + max(thickness, 0) + 2
+            primitives.append(('circle', item, (center[0] - pad, center[1] - pad, center[0] + pad, center[1] + pad)))
+        for item in self.items['text']:
+            text, org, font, font_scale, color, thickness, line_type = item
+            (w, h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+            primitives.append(('text', item, (org[0] - thickness, org[1] - h - thickness,
+                                              org[0] + w + thickness, org[1] + baseline + thickness)))
+        for text, width, pos, font_scale, text_color, bg_color in self.items['label']:
+            sprite = label_cache.sprite_for(text, width, font_scale, text_color, bg_color)
+            x, y = pos[0] + sprite.offset[0], pos[1] + sprite.offset[1]
+            h, w = sprite.inv_alpha.shape[:2]
+            primitives.append(('label', (sprite, x, y), (x, y, x + w, y + h)))
+        return primitives
+
+    def _regions(self):
+        """脏矩形及其中按合成顺序排列的图元：[(包围框, [(图层, 图元)])]，图元不变时复用上次的结果"""
+        if self._regions_cache is None:
+            primitives = self._primitives()
+            clusters = cluster_boxes([box for _, _, box in primitives], self.merge_gap)
+            self._regions_cache = [(box, [primitives[k][:2] for k in sorted(members)]) for box, members in clusters]
+        return self._regions_cache
+
+    def composite(self, frame, clear=True):
+        """
+        把记录的图元合成到 frame 上并返回 frame
+        clear=False 时保留图元与已解析的精灵，同一叠加层重复合成到后续帧上时只做绘制与混合
+        """
+        if not len(self):
+            return frame
+
+        # 叠加缓冲区按帧尺寸分配一次，之后每块脏矩形只取其中的视图
+        if self._buffer is None or self._buffer.shape != frame.shape or self._buffer.dtype != frame.dtype:
+            self._buffer = np.empty_like(frame)
+
+        frame_h, frame_w = frame.shape[:2]
+        for (x0, y0, x1, y1), primitives in self._regions():
+            x0, y0 = max(int(x0), 0), max(int(y0), 0)
+            x1, y1 = min(int(x1) + 1, frame_w), min(int(y1) + 1, frame_h)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            buf = self._buffer[:y1 - y0, :x1 - x0]
+            np.copyto(buf, frame[y0:y1, x0:x1])
+            for layer, item in primitives:
+                _draw(buf, layer, item, x0, y0)
+            frame[y0:y1, x0:x1] = buf
+
+        if clear:
+            self.clear()
+        return frame
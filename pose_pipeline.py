@@ -0,0 +1,406 @@
+import math
+import time
+
+import cv2
+import numpy as np
+
+from utils import pose_result_array, face_result_array
+
+# 坐姿判断依赖的上半身关键点：鼻子、眼、耳、嘴、双肩
+UPPER_BODY_LANDMARKS = np.arange(13)
+
+
+def _reset_model(model):
+    """清除模型的时序状态（MediaPipe 解决方案与本模块的包装器都提供 reset）"""
+    reset = getattr(model, 'reset', None)
+    if reset is not None:
+        reset()
+
+
+class FaceResult:
+    """以数组保存第一张人脸关键点、可交给 FrameInstance 的 Face Mesh 结果"""
+
+    __slots__ = ('landmark_array',)
+
+    def __init__(self, landmark_array):
+        self.landmark_array = landmark_array  # 归一化 (478, 4) float32，未检测到为 None
+
+    @property
+    def multi_face_landmarks(self):
+        return self.landmark_array is not None
+
+
+class PoseResult:
+    """以数组保存关键点、接口与 MediaPipe 姿态结果兼容的结果对象"""
+
+    __slots__ = ('landmark_array',)
+
+    def __init__(self, landmark_array):
+        self.landmark_array = landmark_array  # 归一化 (33, 4) float32，未检测到为 None
+
+    @property
+    def pose_landmarks(self):
+        return self.landmark_array is not None
+
+
+class ScaledPose:
+    """
+    降分辨率推理：把帧缩放到 width 宽（保持宽高比）的复用缓冲区后再交给模型
+    MediaPipe 输出的是归一化坐标，FrameInstance 仍按显示分辨率反归一化，
+    因此叠加层和基于像素的阈值（如肩膀差 20px）不受影响；同样适用于 Face Mesh
+    """
+
+    def __init__(self, model, width=640):
+        self.model = model
+        self.width = width
+        self._buffer = None
+
+    def process(self, frame, timestamp=None):
+        # timestamp 只为与 KeyframePose 的接口一致，这里不使用
+        height, width = frame.shape[:2]
+        if self.width is None or width <= self.width:
+            return self.model.process(frame)
+
+        size = (self.width, max(int(round(height * self.width / width)), 1))
+        if self._buffer is None or self._buffer.shape[1::-1] != size:
+            self._buffer = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+        cv2.resize(frame, size, dst=self._buffer, interpolation=cv2.INTER_AREA)
+        return self.model.process(self._buffer)
+
+    def reset(self):
+        _reset_model(self.model)
+
+
+class RoiPose:
+    """
+    上半身 ROI 跟踪：以上一帧上半身关键点的外扩包围框裁剪画面后推理，
+    再把结果映射回整帧的归一化坐标；跟丢（未检测到人体）时当帧改用整帧重新搜索
+    送入模型的像素更少，关键点的有效分辨率更高
+    ROI 对齐到 grid 像素的网格并带滞回：关键点仍在当前 ROI 的内缩区域内时保持不动。
+    跟踪模式的 MediaPipe 模型按输入图像坐标做 ROI 跟踪与关键点平滑，
+    因此 ROI 改变或在裁剪与整帧之间切换时先清除模型的时序状态
+    """
+
+    def __init__(self, model, padding=0.6, min_size=0.3, min_visibility=0.5, min_points=5, grid=32,
+                 keep_margin=0.1, shrink_ratio=0.5):
+        self.model = model
+        self.padding = padding  # 包围框每边外扩的比例（相对包围框长边）
+        self.min_size = min_size  # ROI 最小边长（相对整帧对应边长）
+        self.min_visibility = min_visibility
+        self.min_points = min_points  # 至少需要这么多可见的上半身关键点才继续跟踪
+        self.grid = grid  # ROI 边界对齐的像素网格
+        self.keep_margin = keep_margin  # 关键点离 ROI 边缘不少于 ROI 边长的该比例时保持 ROI
+        self.shrink_ratio = shrink_ratio  # 新 ROI 面积不到当前的该比例时才收缩
+
+        self.roi = None  # (x0, y0, x1, y1) 像素坐标，None 表示整帧搜索
+        self.full_searches = 0
+        self.roi_searches = 0
+        self.model_resets = 0
+        self._model_roi = None  # 模型上次处理的区域，None 表示整帧
+
+    def reset(self):
+        """放弃当前 ROI，下一帧回到整帧搜索"""
+        self.roi = None
+        self._model_roi = None
+        _reset_model(self.model)
+
+    def process(self, frame, timestamp=None):
+        # timestamp 只为与 KeyframePose 的接口一致，这里不使用
+        height, width = frame.shape[:2]
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            self.roi_searches += 1
+            result = self._infer(frame, self.roi)
+            landmarks = pose_result_array(result)
+            if landmarks is not None:
+                landmarks = landmarks.copy()
+                landmarks[:, 0] = (x0 + landmarks[:, 0] * (x1 - x0)) / width
+                landmarks[:, 1] = (y0 + landmarks[:, 1] * (y1 - y0)) / height
+                landmarks[:, 2] *= (x1 - x0) / width
+                self.roi = self._track(landmarks, width, height)
+                return PoseResult(landmarks)
+            # 跟丢：当帧回到整帧搜索
+            self.roi = None
+
+        self.full_searches += 1
+        result = self._infer(frame, None)
+        landmarks = pose_result_array(result)
+        self.roi = None if landmarks is None else self._track(landmarks, width, height)
+        return result
+
+    def _infer(self, frame, roi):
+        """在 roi（None 为整帧）上推理；与上次的区域不同时先清除模型的跟踪与平滑状态"""
+        if roi != self._model_roi:
+            _reset_model(self.model)
+            self._model_roi = roi
+            self.model_resets += 1
+        if roi is None:
+            return self.model.process(frame)
+        x0, y0, x1, y1 = roi
+        return self.model.process(np.ascontiguousarray(frame[y0:y1, x0:x1]))
+
+    def _track(self, landmarks, width, height):
+        """
+        根据整帧归一化关键点决定下一帧的 ROI：可见点不足时返回 None；
+        关键点仍在当前 ROI 的内缩区域内且 ROI 没有明显偏大时沿用当前 ROI，否则重新计算
+        """
+        upper_body = landmarks[UPPER_BODY_LANDMARKS]
+        visible = upper_body[upper_body[:, 3] >= self.min_visibility, :2]
+        if len(visible) < self.min_points:
+            return None
+
+        scale = np.array([width, height], dtype=np.float32)
+        (left, top), (right, bottom) = visible.min(axis=0) * scale, visible.max(axis=0) * scale
+        candidate = self._fit(left, top, right, bottom, width, height)
+        if candidate is None or self.roi is None:
+            return candidate
+
+        x0, y0, x1, y1 = self.roi
+        margin_x, margin_y = self.keep_margin * (x1 - x0), self.keep_margin * (y1 - y0)
+        # 贴着画面边缘的一侧不要求留边
+        inside = ((x0 == 0 or left >= x0 + margin_x) and (x1 == width or right <= x1 - margin_x) and
+                  (y0 == 0 or top >= y0 + margin_y) and (y1 == height or bottom <= y1 - margin_y))
+        area = (candidate[2] - candidate[0]) * (candidate[3] - candidate[1])
+        if inside and area >= self.shrink_ratio * (x1 - x0) * (y1 - y0):
+            return self.roi
+        return candidate
+
+    def _fit(self, left, top, right, bottom, width, height):
+        """包住上半身包围框的外扩 ROI，边界向外对齐到网格；过小时返回 None"""
+        pad = self.padding * max(right - left, bottom - top)
+        half_w = max((right - left) / 2 + pad, self.min_size * width / 2)
+        half_h = max((bottom - top) / 2 + pad, self.min_size * height / 2)
+        center_x, center_y = (left + right) / 2, (top + bottom) / 2
+
+        grid = self.grid
+        x0 = max(math.floor((center_x - half_w) / grid) * grid, 0)
+        y0 = max(math.floor((center_y - half_h) / grid) * grid, 0)
+        x1 = min(math.ceil((center_x + half_w) / grid) * grid, width)
+        y1 = min(math.ceil((center_y + half_h) / grid) * grid, height)
+        if x1 - x0 < 2 or y1 - y0 < 2:
+            return None
+        return int(x0), int(y0), int(x1), int(y1)
+
+    def stats(self):
+        return {
+            'roi': self.roi,
+            'roi_searches': self.roi_searches,
+            'full_searches': self.full_searches,
+            'model_resets': self.model_resets,
+        }
+
+
+class KeyframePose:
+    """
+    关键帧调度：每 N 帧或触发条件满足时运行一次完整的姿态模型，
+    中间帧用稀疏光流把上一帧的关键点传播到当前帧
+    N 根据实测推理耗时自适应，使推理平均只占帧间隔的 target_share
+    """
+
+    def __init__(self, pose, max_interval=6, target_share=0.3, motion_thresh=0.02, min_visibility=0.5,
+                 frame_interval=1 / 30):
+        self.pose = pose
+        self.max_interval = max_interval
+        self.target_share = target_share
+        self.motion_thresh = motion_thresh  # 归一化平均位移超过该值即视为大幅运动
+        self.min_visibility = min_visibility
+
+        self.interval = 1
+        self.latency = None  # 推理耗时的指数滑动平均（秒）
+        self.frame_interval = frame_interval  # 摄像头帧间隔的指数滑动平均（秒），按帧的采集时间计算
+
+        self.keyframes = 0
+        self.propagated = 0
+
+        self._landmarks = None
+        self._prev_gray = None
+        self._frames_since_keyframe = 0
+        self._last_timestamp = None
+
+        self._lk_params = dict(winSize=(21, 21), maxLevel=3,
+                               criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+    def process(self, frame, timestamp=None):
+        """
+        timestamp 为帧的采集时间（perf_counter 秒）。在异步推理线程后面，process() 的调用间隔是推理线程自己的
+        处理节奏，传播帧越快间隔越短，会反过来拉长关键帧间隔；按采集时间计算才跟随摄像头的帧率。
+        不给出时使用调用时刻
+        """
+        now = time.perf_counter() if timestamp is None else timestamp
+        if self._last_timestamp is not None and now > self._last_timestamp:
+            self.frame_interval = 0.9 * self.frame_interval + 0.1 * (now - self._last_timestamp)
+        self._last_timestamp = now
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        if self._landmarks is not None and self._frames_since_keyframe + 1 < self.interval:
+            landmarks = self._propagate(gray)
+            if landmarks is not None:
+                self._landmarks = landmarks
+                self._prev_gray = gray
+                self._frames_since_keyframe += 1
+                self.propagated += 1
+                return PoseResult(landmarks)
+
+        return self._keyframe(frame, gray)
+
+    def _keyframe(self, frame, gray):
+        start = time.perf_counter()
+        result = self.pose.process(frame)
+        latency = time.perf_counter() - start
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        self.interval = self._adapt_interval()
+
+        landmarks = pose_result_array(result)
+        self._landmarks = None if landmarks is None else landmarks.copy()
+        self._prev_gray = gray
+        self._frames_since_keyframe = 0
+        self.keyframes += 1
+        return result
+
+    def _adapt_interval(self):
+        budget = self.target_share * self.frame_interval
+        if budget <= 0:
+            return self.max_interval
+        return int(min(max(math.ceil(self.latency / budget), 1), self.max_interval))
+
+    def _propagate(self, gray):
+        """
+        光流传播上一帧的关键点；跟踪失败、置信度不足或运动过大时返回 None，
+        由调用方改为运行完整推理
+        """
+        landmarks = self._landmarks
+        tracked = UPPER_BODY_LANDMARKS[landmarks[UPPER_BODY_LANDMARKS, 3] >= self.min_visibility]
+        if len(tracked) == 0:
+            return None
+
+        height, width = gray.shape
+        scale = np.array([width, height], dtype=np.float32)
+        prev_pts = (landmarks[:, :2] * scale).reshape(-1, 1, 2)
+        next_pts, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, prev_pts[tracked], None,
+                                                       **self._lk_params)
+        if not status.all():
+            return None
+
+        displacement = (next_pts - prev_pts[tracked]).reshape(-1, 2) / scale
+        if np.abs(displacement).mean() > self.motion_thresh:
+            return None
+
+        propagated = landmarks.copy()
+        # 未跟踪的关键点按跟踪点的整体位移平移
+        propagated[:, :2] += np.median(displacement, axis=0)
+        propagated[tracked, :2] = next_pts.reshape(-1, 2) / scale
+        return propagated
+
+    def reset(self):
+        """丢弃传播状态，下一帧重新运行完整推理"""
+        self._landmarks = None
+        self._prev_gray = None
+        self._frames_since_keyframe = 0
+        self._last_timestamp = None
+        _reset_model(self.pose)
+
+    def stats(self):
+        return {
+            'keyframes': self.keyframes,
+            'propagated': self.propagated,
+            'interval': self.interval,
+            'latency': self.latency or 0.0,
+        }
+
+
+def build_pose_pipeline(model, inference_width=640, roi_tracking=True, keyframe_interval=6):
+    """组装推理链：关键帧调度 -> 上半身 ROI 裁剪 -> 降分辨率 -> MediaPipe"""
+    model = ScaledPose(model, width=inference_width)
+    if roi_tracking:
+        model = RoiPose(model)
+    if keyframe_interval > 1:
+        model = KeyframePose(model, max_interval=keyframe_interval)
+    return model
+
+
+class FaceMeshStage:
+    """
+    按需调度的 Face Mesh：只在 FrameInstance 第一次请求虹膜等面部关键点时被调用，
+    每 interval 次请求才真正推理一次，其余请求复用上次结果并按鼻子位移平移；
+    crop=True 时只在由姿态鼻子/眼睛/耳朵关键点估计出的人脸区域内推理
+    """
+
+    def __init__(self, face_mesh, interval=3, crop=True, crop_scale=2.5):
+        self.face_mesh = face_mesh
+        self.interval = interval
+        self.crop = crop
+        self.crop_scale = crop_scale  # 人脸区域边长相对双耳（或双眼）间距的倍数
+
+        self.runs = 0
+        self.reused = 0
+
+        self._landmarks = None
+        self._anchor = None  # 上次推理时姿态鼻子的归一化坐标
+        self._requests_since_run = 0
+
+    def process(self, frame):
+        return self.process_with_pose(frame, None)
+
+    def process_with_pose(self, frame, pose_landmarks):
+        nose = None if pose_landmarks is None else pose_landmarks[0, :2]
+        if self._landmarks is not None and self._requests_since_run + 1 < self.interval:
+            self._requests_since_run += 1
+            self.reused += 1
+            landmarks = self._landmarks
+            if nose is not None and self._anchor is not None:
+                landmarks = landmarks.copy()
+                landmarks[:, :2] += nose - self._anchor
+            return FaceResult(landmarks)
+
+        self._landmarks = self._run(frame, pose_landmarks)
+        self._anchor = None if nose is None else nose.copy()
+        self._requests_since_run = 0
+        self.runs += 1
+        return FaceResult(self._landmarks)
+
+    def _run(self, frame, pose_landmarks):
+        height, width = frame.shape[:2]
+        box = self._face_box(pose_landmarks, width, height) if self.crop else None
+        if box is None:
+            return face_result_array(self.face_mesh.process(frame))
+
+        x0, y0, x1, y1 = box
+        landmarks = face_result_array(self.face_mesh.process(np.ascontiguousarray(frame[y0:y1, x0:x1])))
+        if landmarks is None:
+            # 裁剪区域内没有找到人脸，回到整帧
+            return face_result_array(self.face_mesh.process(frame))
+
+        landmarks = landmarks.copy()
+        landmarks[:, 0] = (x0 + landmarks[:, 0] * (x1 - x0)) / width
+        landmarks[:, 1] = (y0 + landmarks[:, 1] * (y1 - y0)) / height
+        landmarks[:, 2] *= (x1 - x0) / width
+        return landmarks
+
+    def _face_box(self, pose_landmarks, width, height):
+        """以姿态鼻子为中心、按双耳/双眼间距估计的正方形人脸区域（像素坐标）"""
+        if pose_landmarks is None:
+            return None
+        scale = np.array([width, height], dtype=np.float32)
+        nose, left_eye, right_eye, left_ear, right_ear = pose_landmarks[[0, 2, 5, 7, 8], :2] * scale
+        span = max(np.linalg.norm(left_ear - right_ear), np.linalg.norm(left_eye - right_eye) * 2)
+        half = self.crop_scale * span / 2
+        if half < 8:
+            return None
+
+        x0, y0 = max(int(nose[0] - half), 0), max(int(nose[1] - half), 0)
+        x1, y1 = min(int(nose[0] + half), width), min(int(nose[1] + half), height)
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+        return x0, y0, x1, y1
+
+    def reset(self):
+        self._landmarks = None
+        self._anchor = None
+        self._requests_since_run = 0
+        _reset_model(self.face_mesh)
+
+    def stats(self):
+        return {
+            'runs': self.runs,
+            'reused': self.reused,
+        }
@@ -0,0 +1,197 @@
+import json
+import math
+import queue
+import sqlite3
+import threading
+import time
+
+from event_log import event_log
+from metric_history import METRIC_NAMES
+from state_tracker import POSTURE_TYPES
+
+# 每分钟汇总中每项指标的列：<指标>_min / <指标>_mean / <指标>_max
+ROLLUP_METRIC_COLUMNS = [f'{name}_{stat}' for name in METRIC_NAMES for stat in ('min', 'mean', 'max')]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    stats TEXT
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    posture TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS episodes_posture_start ON episodes (posture, start);
+CREATE INDEX IF NOT EXISTS episodes_session ON episodes (session_id);
+-- 按日期范围汇总所有姿势时使用的覆盖索引
+CREATE INDEX IF NOT EXISTS episodes_start ON episodes (start, posture, duration);
+CREATE TABLE IF NOT EXISTS minute_rollups (
+    session_id TEXT NOT NULL,
+    minute REAL NOT NULL,
+    frames INTEGER NOT NULL,
+    valid INTEGER NOT NULL,
+    {', '.join(f'{column} REAL' for column in ROLLUP_METRIC_COLUMNS)},
+    bad TEXT NOT NULL,
+    PRIMARY KEY (session_id, minute)
+);
+CREATE INDEX IF NOT EXISTS minute_rollups_minute ON minute_rollups (minute);
+"""
+
+_INSERT_ROLLUP = (f"INSERT OR REPLACE INTO minute_rollups (session_id, minute, frames, valid, "
+                  f"{', '.join(ROLLUP_METRIC_COLUMNS)}, bad) "
+                  f"VALUES ({', '.join('?' * (len(ROLLUP_METRIC_COLUMNS) + 5))})")
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def _finite(value):
+    """NaN 存为 NULL"""
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+class PostureStore:
+    """
+    本地 SQLite 坐姿记录：会话、不良姿势片段与每分钟指标汇总。
+    写入方法只把语句放进队列，由后台线程按批在一个事务中提交，调用线程不做磁盘 I/O；
+    查询在调用线程中用各自的只读连接执行（WAL 模式下读写互不阻塞）
+    """
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+
+        with _connect(path) as connection:
+            connection.executescript(SCHEMA)
+        connection.close()
+
+        self._queue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self._run, name='posture-store', daemon=True)
+        self._thread.start()
+
+    # ---- 写入（任意线程调用，只入队） ----
+
+    def start_session(self, session_id, started_at=None):
+        self._queue.put(("INSERT OR IGNORE INTO sessions (id, started_at) VALUES (?, ?)",
+                         (session_id, time.time() if started_at is None else started_at)))
+
+    def end_session(self, session_id, ended_at=None, stats=None):
+        """记录会话结束时间；给出 stats（get_all_stats 的结果）时一并保存"""
+        self._queue.put(("UPDATE sessions SET ended_at = ?, stats = COALESCE(?, stats) WHERE id = ?",
+                         (time.time() if ended_at is None else ended_at,
+                          None if stats is None else json.dumps(stats, ensure_ascii=False), session_id)))
+
+    def add_episode(self, session_id, posture, start, end):
+        self._queue.put(("INSERT INTO episodes (session_id, posture, start, end, duration) VALUES (?, ?, ?, ?, ?)",
+                         (session_id, posture, start, end, end - start)))
+
+    def add_minute_rollup(self, session_id, minute, bucket):
+        """bucket 为 MetricHistory 分钟层的一行"""
+        values = [_finite(bucket[stat][k]) for k in range(len(METRIC_NAMES)) for stat in ('min', 'mean', 'max')]
+        bad = json.dumps(dict(zip(POSTURE_TYPES, (round(float(v), 4) for v in bucket['bad']))))
+        self._queue.put((_INSERT_ROLLUP, (session_id, minute, int(bucket['frames']), int(bucket['valid']),
+                                          *values, bad)))
+
+    def flush(self, timeout=10.0):
+        """等待此前入队的写入全部提交"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        connection = _connect(self.path)
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # 攒够一批或等满 flush_interval 再提交，减少事务次数
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            events = [item for item in batch if isinstance(item, threading.Event)]
+            statements = [item for item in batch if isinstance(item, tuple)]
+            running = None not in batch
+            try:
+                with connection:
+                    for sql, params in statements:
+                        connection.execute(sql, params)
+                self.written += len(statements)
+            except sqlite3.Error as e:
+                self.failed += len(statements)
+                event_log.emit('store_error', error=str(e), statements=len(statements))
+            for event in events:
+                event.set()
+        connection.close()
+
+    # ---- 查询（调用线程中执行） ----
+
+    def _reader(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = _connect(self.path)
+        return connection
+
+    def episodes_by_type(self, posture, start, end, limit=None):
+        """某种不良姿势在 [start, end) 内开始的片段，按开始时间排序：[(session_id, start, end, duration)]"""
+        sql = ("SELECT session_id, start, end, duration FROM episodes "
+               "WHERE posture = ? AND start >= ? AND start < ? ORDER BY start")
+        params = (posture, start, end)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return self._reader().execute(sql, params).fetchall()
+
+    def daily_summary(self, start, end):
+        """[start, end) 内按本地日期与姿势汇总：[(日期, 姿势, 次数, 平均持续, 总持续)]"""
+        return self._reader().execute(
+            "SELECT date(start, 'unixepoch', 'localtime') AS day, posture, COUNT(*), AVG(duration), SUM(duration) "
+            "FROM episodes WHERE start >= ? AND start < ? GROUP BY day, posture ORDER BY day, posture",
+            (start, end)).fetchall()
+
+    def minute_rollups(self, start, end, session_id=None):
+        """[start, end) 内的每分钟汇总，每行为 {列名: 值}，bad 解析为 {姿势: 比例}"""
+        sql = "SELECT * FROM minute_rollups WHERE minute >= ? AND minute < ?"
+        params = (start, end)
+        if session_id is not None:
+            sql += " AND session_id = ?"
+            params += (session_id,)
+        cursor = self._reader().execute(sql + " ORDER BY minute", params)
+        columns = [description[0] for description in cursor.description]
+        rows = []
+        for values in cursor:
+            row = dict(zip(columns, values))
+            row['bad'] = json.loads(row['bad'])
+            rows.append(row)
+        return rows
+
+    def sessions(self, start, end):
+        """[start, end) 内开始的会话：[(id, started_at, ended_at, stats)]，stats 已解析"""
+        return [(session_id, started_at, ended_at, json.loads(stats) if stats else None)
+                for session_id, started_at, ended_at, stats in self._reader().execute(
+                    "SELECT id, started_at, ended_at, stats FROM sessions "
+                    "WHERE started_at >= ? AND started_at < ? ORDER BY started_at", (start, end))]
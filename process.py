@@ -1,21 +1,51 @@
 import time
 import numpy as np
-from trainer_process_example import trainer_process, COMPLETE_STATE_SEQUENCE, INACTIVE_THRESH
+from trainer_process_example import trainer_process, COMPLETE_STATE_SEQUENCE, INACTIVE_THRESH, REQUIRED_FEATURES, \
+    DEFAULT_THRESHOLDS, UNDETECTED_METRICS
 from state_tracker import StateTracker
+from frame_instance import requires_face_mesh
 
-state_tracker = StateTracker(COMPLETE_STATE_SEQUENCE, INACTIVE_THRESH)
+# 已注册规则读取的关键点，用于决定是否需要启用 Face Mesh 等额外模型
+RULE_FEATURES = {}
 
-def process(frame_instance):
+def register_rule_features(rule_name, features):
+    """登记规则会读取的关键点名字"""
+    RULE_FEATURES[rule_name] = tuple(features)
+
+def face_mesh_required():
+    """是否有已注册的规则需要虹膜或其它面部关键点"""
+    return any(requires_face_mesh(features) for features in RULE_FEATURES.values())
+
+register_rule_features('trainer_process', REQUIRED_FEATURES)
+
+def create_state_tracker(clock=time.perf_counter):
+    """每个检测会话使用独立的状态跟踪器；clock 为计时用的时钟，回放时传入 FrameClock"""
+    return StateTracker(COMPLETE_STATE_SEQUENCE, INACTIVE_THRESH, clock)
+
+def evaluate(frame_instance, state_tracker, thresholds=DEFAULT_THRESHOLDS, history=None):
+    """
+    运行坐姿判断与状态跟踪；延迟模式下绘制调用只记录在 frame_instance.canvas 中。
+    返回本帧的 PostureMetrics，给出 history（MetricHistory）时按它的时钟同时记录本帧指标与状态
+    """
     frame_width = frame_instance.get_frame_width()
     frame_height = frame_instance.get_frame_height()
 
     # Process the image.
     state_tracker.before_process()
     if frame_instance.validate():
-        trainer_process(frame_instance, state_tracker, frame_width, frame_height)
+        metrics = trainer_process(frame_instance, state_tracker, frame_width, frame_height, thresholds)
         state_tracker.after_process(frame_instance)
     else:
+        metrics = UNDETECTED_METRICS
         state_tracker.after_process(frame_instance)
         state_tracker.reset()
 
-    return frame_instance.get_frame()
\ No newline at end of file
+    if history is not None:
+        history.record(history.clock(), metrics, state_tracker.curr_state, state_tracker.active_mask())
+    return metrics
+
+def process(frame_instance, state_tracker, render=True):
+    evaluate(frame_instance, state_tracker)
+
+    # 延迟模式下在这里一次性合成整帧叠加层；render=False 时跳过渲染
+    return frame_instance.flush(render)
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+无模型回放：把 landmark_store 记录的关键点直接送入坐姿规则与 StateTracker，
+不需要 MediaPipe，也不解码视频，用于在历史数据上调整判定阈值。
+
+两条路径：
+    replay_recording      逐帧构造无画面的 FrameInstance，运行 trainer_process 与 StateTracker，
+                          与实时检测的判定逻辑完全一致
+    evaluate_posture_batch 一次向量化计算整段录制每帧的不良姿势标志，
+                          不模拟 StateTracker 的长时间无活动重置
+
+用法：
+    python replay.py landmark_recordings/20250101-090000_ab12cd34 --forward-head 100 107 115 --head-tilt 15 20
+"""
+import argparse
+import itertools
+import numpy as np
+
+import trainer_process_example
+from episodes import POSTURE_TYPES, tracker_active_flags, extract_episodes, summarize_episodes
+from frame_instance import FrameInstance, POSE_LANDMARKS
+from landmark_store import LandmarkReader
+from pose_pipeline import PoseResult
+from process import create_state_tracker, evaluate
+from state_tracker import FrameClock
+from trainer_process_example import DEFAULT_THRESHOLDS, HEAD_FORWARD_ANGLE, REQUIRED_FEATURES, PostureThresholds, \
+    PostureMetrics
+from utils import angle_triplets, denormalize_landmarks, find_angles
+
+# posture_flags 各列对应的姿势
+FLAG_POSTURE_TYPES = ('forward_head', 'head_tilt', 'spinal_curvature')
+
+_REQUIRED_INDEX = np.array([POSE_LANDMARKS[name] for name in REQUIRED_FEATURES])
+_LEFT_EAR, _RIGHT_EAR = POSE_LANDMARKS['left_ear'], POSE_LANDMARKS['right_ear']
+_LEFT_SHLDR, _RIGHT_SHLDR = POSE_LANDMARKS['left_shldr'], POSE_LANDMARKS['right_shldr']
+
+
+class RecordedPose:
+    """代替姿态模型：process() 返回 feed() 给出的当前帧关键点"""
+
+    def __init__(self):
+        self._result = PoseResult(None)
+
+    def feed(self, landmarks):
+        self._result = PoseResult(landmarks)
+
+    def process(self, frame):
+        return self._result
+
+    def reset(self):
+        self._result = PoseResult(None)
+
+
+def blank_frame(frame_width, frame_height):
+    """不占内存的只读空白帧，只用来让 FrameInstance 取得画面尺寸"""
+    return np.broadcast_to(np.zeros(3, dtype=np.uint8), (frame_height, frame_width, 3))
+
+
+def replay_recording(timestamps, landmarks, valid, frame_width, frame_height, thresholds=DEFAULT_THRESHOLDS):
+    """
+    逐帧回放：与实时检测相同的 FrameInstance -> trainer_process -> StateTracker，
+    绘制调用只记录不渲染。StateTracker 按帧时间计时，结果与回放速度无关。
+    返回 (按帧时间提取的不良姿势片段, 回放结束时的 StateTracker)
+    """
+    clock = FrameClock(float(timestamps[0]) if len(timestamps) else 0.0)
+    state_tracker = create_state_tracker(clock)
+    pose = RecordedPose()
+    frame = blank_frame(frame_width, frame_height)
+    active = np.zeros((len(timestamps), len(POSTURE_TYPES)), dtype=bool)
+
+    # 回放时不播放提示音
+    sound_enabled = trainer_process_example.SOUND_ENABLED
+    trainer_process_example.SOUND_ENABLED = False
+    try:
+        for i in range(len(timestamps)):
+            clock.set(float(timestamps[i]))
+            pose.feed(np.asarray(landmarks[i], dtype=np.float32) if valid[i] else None)
+            frame_instance = FrameInstance(frame, pose, deferred=True)
+            evaluate(frame_instance, state_tracker, thresholds)
+            frame_instance.flush(render=False)
+            active[i] = tracker_active_flags(state_tracker)
+    finally:
+        trainer_process_example.SOUND_ENABLED = sound_enabled
+    return extract_episodes(timestamps, active), state_tracker
+
+
+def posture_metrics(landmarks, valid, frame_width, frame_height, batch_size=1 << 16):
+    """
+    向量化计算每帧的规则输入，取整方式与 trainer_process 逐帧计算的结果一致。
+    landmarks 为 (T, 33, 4) 归一化坐标（可以是 memmap），按 batch_size 帧分块处理以限制内存
+    """
+    n = len(landmarks)
+    detected = np.zeros(n, dtype=bool)
+    head_forward_angle = np.zeros(n, dtype=np.int64)
+    tilt_deviation = np.zeros(n, dtype=np.float64)
+    shoulder_level_diff = np.zeros(n, dtype=np.int64)
+
+    for start in range(0, n, batch_size):
+        block = slice(start, min(start + batch_size, n))
+        points = denormalize_landmarks(np.asarray(landmarks[block], dtype=np.float32),
+                                       frame_width, frame_height)[..., :2].astype(np.int32)
+
+        # 所需关键点都不在 (0, 0) 才算检测完整
+        required = points[:, _REQUIRED_INDEX]
+        detected[block] = np.asarray(valid[block], dtype=bool) & np.all(np.any(required != 0, axis=-1), axis=-1)
+
+        head_forward_angle[block] = find_angles(
+            angle_triplets(points, [HEAD_FORWARD_ANGLE], frame_width, frame_height))[:, 0]
+
+        # 与 calculate_head_tilt_angle 相同：耳朵连线角度转到 0-360，竖直时取 ±90
+        dx = (points[:, _RIGHT_EAR, 0] - points[:, _LEFT_EAR, 0]).astype(np.float64)
+        dy = (points[:, _RIGHT_EAR, 1] - points[:, _LEFT_EAR, 1]).astype(np.float64)
+        tilt = np.degrees(np.arctan2(dy, dx))
+        tilt = np.where(tilt < 0, tilt + 360, tilt)
+        tilt = np.where(dx == 0, np.where(dy > 0, 90.0, -90.0), tilt)
+        tilt_deviation[block] = np.minimum(np.abs(tilt - 180), np.abs(tilt))
+
+        shoulder_level_diff[block] = np.abs(points[:, _LEFT_SHLDR, 1] - points[:, _RIGHT_SHLDR, 1])
+
+    return PostureMetrics(detected, head_forward_angle, tilt_deviation, shoulder_level_diff)
+
+
+def posture_flags(metrics, thresholds=DEFAULT_THRESHOLDS):
+    """(T, 3) bool，列顺序与 FLAG_POSTURE_TYPES 一致；未检测完整的帧全部为 False"""
+    flags = np.stack([
+        metrics.head_forward_angle > thresholds.forward_head,
+        metrics.tilt_deviation > thresholds.head_tilt,
+        metrics.shoulder_level_diff > thresholds.shoulder_level,
+    ], axis=1)
+    flags &= metrics.detected[:, None]
+    return flags
+
+
+def evaluate_posture_batch(landmarks, valid, frame_width, frame_height, thresholds=DEFAULT_THRESHOLDS):
+    """一次计算整段录制每帧的不良姿势标志"""
+    return posture_flags(posture_metrics(landmarks, valid, frame_width, frame_height), thresholds)
+
+
+def load_recording(path, frame_width=None, frame_height=None):
+    """打开一段记录，返回 (reader, 画面宽, 画面高)；记录里没有画面尺寸时必须显式给出"""
+    reader = LandmarkReader(path)
+    frame_width = frame_width or reader.frame_width
+    frame_height = frame_height or reader.frame_height
+    if not frame_width or not frame_height:
+        raise ValueError(f"{path} 没有记录画面尺寸，请用 --width/--height 指定")
+    return reader, frame_width, frame_height
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recordings', nargs='+', help='landmark_store 记录目录')
+    parser.add_argument('--forward-head', type=float, nargs='+', default=[DEFAULT_THRESHOLDS.forward_head])
+    parser.add_argument('--head-tilt', type=float, nargs='+', default=[DEFAULT_THRESHOLDS.head_tilt])
+    parser.add_argument('--shoulder-level', type=float, nargs='+', default=[DEFAULT_THRESHOLDS.shoulder_level])
+    parser.add_argument('--width', type=int, help='记录中没有画面尺寸时使用的宽度')
+    parser.add_argument('--height', type=int, help='记录中没有画面尺寸时使用的高度')
+    parser.add_argument('--exact', action='store_true',
+                        help='逐帧运行 trainer_process 与 StateTracker，而不是向量化路径')
+    args = parser.parse_args()
+
+    recordings = [load_recording(path, args.width, args.height) for path in args.recordings]
+    # 规则输入与阈值无关，向量化路径对每段记录只计算一次
+    metrics = None if args.exact else [posture_metrics(reader.landmarks, reader.valid, w, h)
+                                       for reader, w, h in recordings]
+
+    print(f"{'前倾°':>6} {'歪斜°':>6} {'肩差px':>6} " + ' '.join(f'{p:>18}' for p in POSTURE_TYPES))
+    for values in itertools.product(args.forward_head, args.head_tilt, args.shoulder_level):
+        thresholds = PostureThresholds(*values)
+        episodes = []
+        for k, (reader, w, h) in enumerate(recordings):
+            if args.exact:
+                episodes += replay_recording(reader.timestamps, reader.landmarks, reader.valid, w, h, thresholds)[0]
+            else:
+                episodes += extract_episodes(reader.timestamps, posture_flags(metrics[k], thresholds),
+                                             FLAG_POSTURE_TYPES)
+        stats = summarize_episodes(episodes)
+        print(f"{values[0]:>6g} {values[1]:>6g} {values[2]:>6g} " + ' '.join(
+            f"{stats[p]['count']:>5} 次 / {stats[p]['avg_duration']:>6.1f} 秒" for p in POSTURE_TYPES))
+
+
+if __name__ == '__main__':
+    main()
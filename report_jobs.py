@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from event_log import event_log
+
+SYSTEM_PROMPT = "你是一个专业的坐姿矫正师，专注于帮助用户改善坐姿问题，预防颈椎和脊柱疾病。"
+
+# 报告任务的状态
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def build_report_payload(stats_data, model="deepseek-chat"):
+    """按检测统计构造 chat/completions 请求体；请求体相同即视为同一份报告"""
+    prompt = f"""
+        你是一个专业的坐姿矫正师，请你依据坐姿检测数据说明用户存在的坐姿问题并且给出建议。
+
+        坐姿检测数据：
+        - 检测总时长：{stats_data['detection_duration']:.1f}秒
+        - 头部前倾：发生了{stats_data['forward_head_count']}次，平均每次持续{stats_data['forward_head_avg_duration']:.1f}秒
+        - 头部歪斜：发生了{stats_data['head_tilt_count']}次，平均每次持续{stats_data['head_tilt_avg_duration']:.1f}秒
+        - 脊柱侧弯：发生了{stats_data['spinal_curvature_count']}次，平均每次持续{stats_data['spinal_curvature_avg_duration']:.1f}秒
+
+        详细记录：
+        {stats_data['detailed_records']}
+
+        请用专业但易懂的语言，以200-300字分析问题、给出建议、指出注意事项。
+        """
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.7,
+        "max_tokens": 800,
+    }
+
+
+def payload_key(payload):
+    """请求体的内容地址：规范化 JSON 的 SHA-256"""
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ReportClient:
+    """
+    复用连接池的 chat/completions 客户端。只重试确定没有被处理的失败：连接错误由连接池重试，
+    429/503 响应按服务端的 Retry-After 或指数退避重试；读取超时等请求可能已被处理并计费的情况不重试。
+    一次 complete() 的总耗时（含重试与退避）不超过 max_time 秒
+    """
+
+    # 服务端明确表示未处理、可以重试的状态码
+    RETRY_STATUSES = (429, 503)
+
+    def __init__(self, api_url, api_key, timeout=30.0, retries=3, backoff=0.5, max_time=60.0, connect_timeout=5.0,
+                 pool_size=4):
+        self.api_url = api_url
+        self.timeout = timeout  # 单次请求等待回复的秒数
+        self.retries = retries
+        self.backoff = backoff
+        self.max_time = max_time
+        self.connect_timeout = connect_timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+        })
+        retry = Retry(total=retries, connect=retries, read=0, status=0, other=0, backoff_factor=backoff)
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def complete(self, payload):
+        """发送请求并返回回复文本；重试用尽或超出 max_time 后抛出 requests 的异常"""
+        deadline = time.monotonic() + self.max_time
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            response = self.session.post(self.api_url, json=payload,
+                                         timeout=(self.connect_timeout, max(min(self.timeout, remaining), 1.0)))
+            if response.status_code not in self.RETRY_STATUSES or attempt >= self.retries:
+                break
+            delay = self._retry_delay(response, attempt)
+            if time.monotonic() + delay >= deadline:
+                break
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+    def _retry_delay(self, response, attempt):
+        """服务端给出 Retry-After（秒）时照办，否则按 backoff * 2^attempt 退避"""
+        retry_after = response.headers.get('Retry-After', '')
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            return self.backoff * 2 ** attempt
+
+    def close(self):
+        self.session.close()
+
+
+class ReportCache:
+    """按请求体哈希保存已生成的报告：内存中一份，目录中每份报告一个 JSON 文件"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._memory = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        report = self._memory.get(key)
+        if report is None and self.directory:
+            try:
+                with open(self._path(key), encoding='utf-8') as f:
+                    report = json.load(f)['report']
+            except (OSError, ValueError, KeyError):
+                return None
+            self._memory[key] = report
+        return report
+
+    def put(self, key, report):
+        self._memory[key] = report
+        if not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再改名，读取方不会看到写了一半的报告
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'created_at': time.time(), 'report': report}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+class ReportJob:
+    """一次报告生成任务；job_id 即请求体哈希"""
+
+    __slots__ = ('job_id', 'state', 'report', 'error', 'cached', 'submitted_at', 'finished_at')
+
+    def __init__(self, job_id, state=PENDING, report=None, cached=False):
+        self.job_id = job_id
+        self.state = state
+        self.report = report
+        self.error = None
+        self.cached = cached
+        self.submitted_at = time.time()
+        self.finished_at = self.submitted_at if state == DONE else None
+
+
+class ReportJobs:
+    """
+    后台报告任务：submit() 立即返回 job_id，由线程池调用接口；
+    相同统计的报告直接取缓存，正在生成的相同请求不会重复提交，调用方用 status() 轮询
+    """
+
+    def __init__(self, client, cache, max_workers=2):
+        self.client = client
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, payload):
+        key = payload_key(payload)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state != FAILED:
+                return key
+            report = self.cache.get(key)
+            if report is not None:
+                self._jobs[key] = ReportJob(key, DONE, report, cached=True)
+                return key
+            job = self._jobs[key] = ReportJob(key)
+        self._executor.submit(self._run, job, payload)
+        return key
+
+    def status(self, job_id):
+        """任务当前的 ReportJob，未知的 job_id 返回 None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, payload):
+        job.state = RUNNING
+        try:
+            report = self.client.complete(payload)
+        except requests.exceptions.RequestException as exc:
+            job.error = f"API调用失败: {exc}"
+            job.state = FAILED
+        except Exception as exc:
+            job.error = f"处理响应时出错: {exc}"
+            job.state = FAILED
+        else:
+            job.report = report
+            job.state = DONE
+            try:
+                self.cache.put(job.job_id, report)
+            except OSError as exc:
+                event_log.emit('report_cache_error', error=str(exc))
+        job.finished_at = time.time()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self.client.close()
@@ -0,0 +1,317 @@
+import sys
+import threading
+import time
+import traceback
+import types
+
+import numpy as np
+
+from event_log import event_log
+from inference_worker import InferenceWorker
+from metrics import PipelineMetrics
+from metric_history import MetricHistory
+from process import create_state_tracker
+from utils import pose_result_array
+
+
+class PosePool:
+    """
+    有界的姿态模型池：MediaPipe 图不能跨线程共用，每个会话独占租用一个实例，
+    实例总数不超过 max_size，归还时清除时序状态后供下一个会话复用。Face Mesh 也用同样的池管理
+    """
+
+    def __init__(self, factory, max_size=8):
+        self.factory = factory
+        self.max_size = max_size
+        self._idle = []
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=0.0):
+        """租用一个实例；池已满且在 timeout 秒内没有归还时返回 None"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.max_size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, pose):
+        reset = getattr(pose, 'reset', None)
+        if reset is not None:
+            reset()
+        with self._cond:
+            self._idle.append(pose)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'created': self._created,
+                'idle': len(self._idle),
+                'leased': self._created - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+
+# 不计入内存估计的对象：线程与锁、函数与类，以及 MediaPipe 的原生对象
+_OPAQUE_TYPES = (threading.Thread, type(threading.Lock()), threading.Condition, types.ModuleType,
+                 types.FunctionType, types.MethodType, types.BuiltinFunctionType, type)
+
+
+def estimate_memory(obj, _seen=None, _depth=0):
+    """
+    粗略估计对象占用的 Python 内存（字节）：递归累加容器、对象属性与 NumPy 缓冲区，
+    不包含 MediaPipe 图等原生内存
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 6:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, _OPAQUE_TYPES) or type(obj).__module__.startswith('mediapipe'):
+        return 0
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_memory(key, _seen, _depth + 1) + estimate_memory(value, _seen, _depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_memory(item, _seen, _depth + 1)
+    else:
+        if hasattr(obj, '__dict__'):
+            size += estimate_memory(vars(obj), _seen, _depth + 1)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                size += estimate_memory(getattr(obj, slot), _seen, _depth + 1)
+    return size
+
+
+class Session:
+    """一个浏览器检测会话：独立的状态跟踪器、租用的姿态模型与推理线程"""
+
+    def __init__(self, session_id, state_tracker, face_mesh=None):
+        self.session_id = session_id
+        self.state_tracker = state_tracker
+        state_tracker.session_id = session_id
+        self.face_mesh = face_mesh
+        self.pose = None
+        self.worker = None
+        self.recorder = None  # 可选的 LandmarkWriter，记录每帧的归一化关键点
+        self.metrics = PipelineMetrics()
+        self.history = MetricHistory()  # 每帧坐姿指标的定长历史，供仪表盘绘制趋势
+        self.store = None  # 可选的 PostureStore，持久化片段与每分钟汇总
+
+        self.created_at = time.time()
+        self.last_seen = time.monotonic()
+        self.frames = 0
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def idle_seconds(self, now=None):
+        return (time.monotonic() if now is None else now) - self.last_seen
+
+    def record(self, frame_instance, timestamp=None):
+        """把本帧关键点追加到记录文件；未启用记录时什么也不做"""
+        if self.recorder is None:
+            return
+        if self.recorder.frame_width is None:
+            self.recorder.set_frame_size(frame_instance.get_frame_width(), frame_instance.get_frame_height())
+        landmarks = pose_result_array(frame_instance.keypoints) if frame_instance.validate() else None
+        self.recorder.append(time.time() if timestamp is None else timestamp, landmarks)
+
+    def attach_store(self, store):
+        """把已计数的片段与每分钟汇总写入 store，时间均为墙上时间"""
+        self.store = store
+        store.start_session(self.session_id)
+        self.state_tracker.on_episode = self._store_episode
+        self.history.on_bucket = self._store_rollup
+
+    def _store_episode(self, posture, start, end):
+        # StateTracker 的 perf_counter 时钟在系统休眠时停走，不能加固定偏移换算；
+        # 片段在此刻结束，按当前墙上时间与持续时间还原
+        now = time.time()
+        self.store.add_episode(self.session_id, posture, now - (end - start), now)
+
+    def _store_rollup(self, resolution, bucket):
+        # MetricHistory 按墙上时间记录，分钟桶的起点就是真实的整分钟
+        if resolution == 60:
+            self.store.add_minute_rollup(self.session_id, float(bucket['time']), bucket)
+
+    def save_stats(self, stats):
+        """保存一轮检测结束时的统计；未启用持久化时什么也不做"""
+        if self.store is not None:
+            self.store.end_session(self.session_id, stats=stats)
+
+    def memory_bytes(self):
+        return estimate_memory([self.state_tracker, self.pose, self.face_mesh, self.history,
+                                None if self.worker is None else self.worker.latest()])
+
+
+class SessionRegistry:
+    """
+    会话注册表：按会话 ID 为每个浏览器会话创建独立的 StateTracker，
+    从有界的 PosePool 租用姿态模型，并回收空闲超时的会话
+    """
+
+    def __init__(self, pose_pool, face_mesh_factory=None, idle_timeout=300.0, async_inference=True,
+                 on_result=None, recorder_factory=None, store=None):
+        self.pose_pool = pose_pool
+        # 每个持有姿态模型的会话至多再租用一个 Face Mesh，池的上限与姿态模型池相同
+        self.face_mesh_pool = None if face_mesh_factory is None else PosePool(face_mesh_factory,
+                                                                              max_size=pose_pool.max_size)
+        self.idle_timeout = idle_timeout
+        self.async_inference = async_inference
+        self.on_result = on_result  # on_result(session, frame_instance)，在推理线程中回调
+        self.recorder_factory = recorder_factory  # recorder_factory(session_id) -> LandmarkWriter
+        self.store = store  # 可选的 PostureStore，所有会话共用一个后台写线程
+
+        self._sessions = {}
+        self._lock = threading.Lock()
+        # 空闲会话由后台线程定期回收：停止推理线程要等待它退出，不能放在视频帧回调里做
+        self._stop_eviction = threading.Event()
+        self._evictor = threading.Thread(target=self._evict_loop, name='session-evictor', daemon=True)
+        self._evictor.start()
+
+    def get(self, session_id, lease=True):
+        """
+        取得（必要时创建）会话。lease=True 时（视频帧到达时）为还没有模型的会话租用姿态模型；
+        页面渲染只读取状态，用 lease=False，没有打开摄像头的页面不占用模型
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id, create_state_tracker())
+        session.touch()
+
+        if lease and session.pose is None:
+            self._lease(session)
+        return session
+
+    def _lease(self, session):
+        """租用姿态模型与 Face Mesh；第一次租到时才创建记录文件与持久化的会话记录，并启动推理线程"""
+        pose = self.pose_pool.acquire()
+        if pose is None:
+            return
+        face_mesh = None
+        if self.face_mesh_pool is not None:
+            face_mesh = self.face_mesh_pool.acquire()
+            if face_mesh is None:
+                self.pose_pool.release(pose)
+                return
+        with self._lock:
+            if session.pose is not None or self._sessions.get(session.session_id) is not session:
+                self.pose_pool.release(pose)
+                if face_mesh is not None:
+                    self.face_mesh_pool.release(face_mesh)
+                return
+            session.pose = pose
+            session.face_mesh = face_mesh
+            if self.recorder_factory is not None and session.recorder is None:
+                session.recorder = self.recorder_factory(session.session_id)
+            if self.store is not None and session.store is None:
+                session.attach_store(self.store)
+            if self.async_inference:
+                on_result = None
+                if self.on_result is not None or session.recorder is not None:
+                    def on_result(frame_instance, timestamp, session=session):
+                        session.record(frame_instance, timestamp)
+                        if self.on_result is not None:
+                            self.on_result(session, frame_instance)
+                session.worker = InferenceWorker(pose, session.state_tracker, session.face_mesh, on_result,
+                                                 session.metrics, session.history)
+
+    def close(self, session_id):
+        """
+        结束会话：停止推理线程，并在线程确实退出后归还姿态模型、关闭记录文件；
+        线程还在推理时这些清理由它退出前完成，姿态模型不会在仍被使用时借给其它会话
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        if session.worker is not None:
+            session.worker.stop(on_stopped=lambda: self._release(session))
+        else:
+            self._release(session)
+
+    def _release(self, session):
+        # 推理线程已退出：结束仍在进行的不良姿势片段，并把最后不足一分钟的指标也汇总写入
+        session.state_tracker.finish()
+        session.history.flush()
+        if session.pose is not None:
+            self.pose_pool.release(session.pose)
+            session.pose = None
+        if session.face_mesh is not None:
+            self.face_mesh_pool.release(session.face_mesh)
+            session.face_mesh = None
+        if session.recorder is not None:
+            session.recorder.close()
+        if session.store is not None:
+            session.store.end_session(session.session_id)
+        event_log.forget_session(session.session_id)
+
+    def close_all(self):
+        """结束全部会话（进程退出前调用，写入会话结束时间与最后的分钟汇总）"""
+        self._stop_eviction.set()
+        with self._lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.close(session_id)
+
+    def evict_idle(self, now=None):
+        """回收空闲超过 idle_timeout 的会话，返回被回收的会话 ID"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [session_id for session_id, session in self._sessions.items()
+                       if session.idle_seconds(now) > self.idle_timeout]
+        for session_id in expired:
+            self.close(session_id)
+        return expired
+
+    def _evict_loop(self):
+        while not self._stop_eviction.wait(min(self.idle_timeout, 30.0)):
+            try:
+                self.evict_idle()
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self):
+        """每个会话的空闲时长、处理帧数与估计内存"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            'pool': self.pose_pool.stats(),
+            'face_mesh_pool': None if self.face_mesh_pool is None else self.face_mesh_pool.stats(),
+            'sessions': [
+                {
+                    'session_id': session.session_id,
+                    'idle_seconds': session.idle_seconds(),
+                    'frames': session.frames,
+                    'has_pose': session.pose is not None,
+                    'memory_bytes': session.memory_bytes(),
+                }
+                for session in sessions
+            ],
+        }
@@ -1,210 +1,252 @@
 import time
 
+import numpy as np
+
+from event_log import event_log
+from episode_stats import EpisodeStats, posture_stats_entry
+
+# 不良姿势注册表：下标即姿势 id。每种姿势的计时状态是计时表中的一行，
+# 每帧的开始/结束/计数判断都是对整张表的向量化运算，注册更多姿势不会增加逐帧的 Python 分支
+POSTURE_TYPES = []
+POSTURE_IDS = {}
+POSTURE_LABELS = []  # 日志中使用的名称，如“头部前倾”
+POSTURE_SHORT_LABELS = []  # 状态栏中使用的简称，如“前倾”
+
+# 不良姿势持续超过该时长（秒）计入一次
+COUNT_THRESH = 15.0
+
+
+def register_posture_type(name, label, short_label):
+    """登记一种不良姿势并返回它的 id；须在创建 StateTracker 之前调用"""
+    if name not in POSTURE_IDS:
+        POSTURE_IDS[name] = len(POSTURE_TYPES)
+        POSTURE_TYPES.append(name)
+        POSTURE_LABELS.append(label)
+        POSTURE_SHORT_LABELS.append(short_label)
+    return POSTURE_IDS[name]
+
+
+FORWARD_HEAD = register_posture_type('forward_head', '头部前倾', '前倾')
+HEAD_TILT = register_posture_type('head_tilt', '歪头', '歪头')
+SPINAL_CURVATURE = register_posture_type('spinal_curvature', '脊柱侧弯', '侧弯')
+
+# 计时表的一行：是否正在计时、开始时间、最近一次计算的持续时间、本次会话的次数、
+# 当前这段是否已计数、对应弹窗是否已显示
+TIMER_DTYPE = np.dtype([
+    ('active', np.bool_),
+    ('start', np.float64),
+    ('duration', np.float64),
+    ('count', np.int64),
+    ('recorded', np.bool_),
+    ('popup_shown', np.bool_),
+])
+
+
+class FrameClock:
+    """
+    由调用方推进的时钟：回放或仿真时每帧调用 set() 设为该帧的时间戳，
+    StateTracker 的所有计时都按帧时间计算，与机器处理速度无关
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def set(self, timestamp):
+        self.now = timestamp
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def __call__(self):
+        return self.now
+
 
 class StateTracker:
-    def __init__(self, complete_state_sequence, inactive_thresh):
+    def __init__(self, complete_state_sequence, inactive_thresh, clock=time.perf_counter):
         self.complete_state_sequence = complete_state_sequence
         self.inactive_thresh = inactive_thresh
+        # 计时用的时钟：实时检测用 time.perf_counter，回放时传入 FrameClock
+        self.clock = clock
 
         self.state_seq = []
         self.curr_state = None
         self.prev_state = None
 
-        self.start_inactive_time = time.perf_counter()
+        self.start_inactive_time = self.clock()
         self.inactive_long = 0.0  # INACTIVE_TIME
 
-        # 头部前倾计时相关变量
-        self.forward_head_start_time = None  # 头部前倾开始时间
-        self.forward_head_duration = 0  # 当前头部前倾持续时间（秒）
-        self.alert_played = False  # 是否已经播放过提示音
+        # 每种不良姿势一行的计时表，以及每种姿势已结束片段的持续时间统计
+        self.timers = np.zeros(len(POSTURE_TYPES), dtype=TIMER_DTYPE)
+        self.episode_stats = [EpisodeStats() for _ in POSTURE_TYPES]
+        # 已计数的片段结束时回调 on_episode(姿势, 开始时间, 结束时间)，时间取自 clock
+        self.on_episode = None
+        # 所属会话：写入事件日志，并让每个会话的事件分别限速
+        self.session_id = None
+        # 计时表各列的视图，逐帧运算直接在列上进行
+        self._active = self.timers['active']
+        self._start = self.timers['start']
+        self._duration = self.timers['duration']
+        self._count = self.timers['count']
+        self._recorded = self.timers['recorded']
+        self._popup_shown = self.timers['popup_shown']
+        self._mask_cache = {}
+        # 尚未计数、尚未弹窗的正在计时姿势中最早的开始时间（没有时为 inf）。
+        # 只在计时表变化时重新计算，逐帧检查只需与当前时间比较一次
+        self._count_from = np.inf
+        self._alert_from = np.inf
 
-        # 新增：头部前倾统计变量
-        self.forward_head_count = 0  # 头部前倾总次数
-        self.forward_head_durations = []  # 每次头部前倾的持续时间列表
-        self.current_forward_head_recorded = False  # 当前头部前倾是否已记录
-        self.forward_head_popup_shown = False  # 头部前倾弹窗是否已显示
-
-        # 新增：歪头统计变量
-        self.head_tilt_start_time = None  # 歪头开始时间
-        self.head_tilt_duration = 0  # 当前歪头持续时间（秒）
-        self.head_tilt_count = 0  # 歪头总次数
-        self.head_tilt_durations = []  # 每次歪头的持续时间列表
-        self.current_head_tilt_recorded = False  # 当前歪头是否已记录
-        self.head_tilt_popup_shown = False  # 歪头弹窗是否已显示
-
-        # 新增：脊柱侧弯统计变量
-        self.spinal_curvature_start_time = None  # 脊柱侧弯开始时间
-        self.spinal_curvature_duration = 0  # 当前脊柱侧弯持续时间（秒）
-        self.spinal_curvature_count = 0  # 脊柱侧弯总次数
-        self.spinal_curvature_durations = []  # 每次脊柱侧弯的持续时间列表
-        self.current_spinal_curvature_recorded = False  # 当前脊柱侧弯是否已记录
-        self.spinal_curvature_popup_shown = False  # 脊柱侧弯弹窗是否已显示
+        self.alert_played = False  # 是否已经播放过提示音
 
         # 记录上次显示弹窗的姿势类型
         self.last_shown_posture = None
-        
+
         # 新增：用于防止同一帧内多次触发警报的标志
         self.alert_triggered_this_frame = False
 
+    def posture_mask(self, bad_posture_types):
+        """把姿势名字列表转换为按姿势 id 排列的只读布尔数组，相同的组合只转换一次"""
+        key = tuple(bad_posture_types)
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = np.zeros(len(self.timers), dtype=bool)
+            mask[[POSTURE_IDS[name] for name in key]] = True
+            mask.flags.writeable = False
+            self._mask_cache[key] = mask
+        return mask
+
+    def active_mask(self):
+        """每种不良姿势当前是否正在计时"""
+        return self._active.copy()
+
     def set_state(self, state, bad_posture_types=None):
+        """
+        更新坐姿状态。bad_posture_types 为不良姿势名字的列表，
+        也可以直接传入按姿势 id 排列的布尔数组
+        """
         # 保存之前的状态
         old_state = self.curr_state
         self.curr_state = state
 
-        # 如果没有指定不良姿势类型，默认为空
-        if bad_posture_types is None:
-            bad_posture_types = []
-            
         # 重置当前帧警报触发状态
         self.alert_triggered_this_frame = False
 
-        current_time = time.perf_counter()
-        
+        current_time = self.clock()
+
         # 处理从不良状态回到正常状态的情况
         if old_state == 'bad_posture' and state != 'bad_posture':
             # 从不良状态切换到正常状态，重置所有弹窗状态
-            self.forward_head_popup_shown = False
-            self.head_tilt_popup_shown = False
-            self.spinal_curvature_popup_shown = False
+            self._popup_shown[:] = False
             self.last_shown_posture = None
-        
+
         # 检测状态变化，用于各种不良姿势计时
         if state == 'bad_posture':
-            # 处理不良姿势状态
+            if isinstance(bad_posture_types, np.ndarray):
+                active = bad_posture_types
+            else:
+                active = self.posture_mask(bad_posture_types or ())
+
             if old_state != 'bad_posture':
-                # 从良好状态切换到不良状态
-                self.alert_played = False  # 重置提示音状态
-                # 重置所有弹窗状态
-                self.forward_head_popup_shown = False
-                self.head_tilt_popup_shown = False
-                self.spinal_curvature_popup_shown = False
+                # 从良好状态切换到不良状态：重置提示音与所有弹窗状态
+                self.alert_played = False
+                self._popup_shown[:] = False
                 self.last_shown_posture = None
             else:
-                # 如果不良姿势类型发生变化，重置对应的弹窗状态
-                active_postures = set(bad_posture_types)
-                if 'forward_head' not in active_postures and self.forward_head_popup_shown:
-                    self.forward_head_popup_shown = False
-                if 'head_tilt' not in active_postures and self.head_tilt_popup_shown:
-                    self.head_tilt_popup_shown = False
-                if 'spinal_curvature' not in active_postures and self.spinal_curvature_popup_shown:
-                    self.spinal_curvature_popup_shown = False
-            
-            # 对于每种不良姿势类型，单独处理计时开始和重置
-            # 开始头部前倾计时或重置不需要的计时
-            if 'forward_head' in bad_posture_types and self.forward_head_start_time is None:
-                self.forward_head_start_time = current_time
-                self.current_forward_head_recorded = False
-                self.forward_head_popup_shown = False  # 新开始计时时重置弹窗状态
-                print(f"开始头部前倾计时: {self.forward_head_start_time}")
-            elif 'forward_head' not in bad_posture_types and self.forward_head_start_time is not None:
-                # 如果不再是头部前倾，停止计时
-                forward_head_duration = current_time - self.forward_head_start_time
-                print(f"结束头部前倾状态，持续了: {forward_head_duration:.1f}秒")
-                if self.current_forward_head_recorded:
-                    self.forward_head_durations.append(forward_head_duration)
-                    print(f"记录头部前倾持续时间: {forward_head_duration:.1f}秒")
-                self.forward_head_start_time = None
-                self.forward_head_popup_shown = False  # 停止计时时重置弹窗状态
-
-            # 开始歪头计时或重置不需要的计时
-            if 'head_tilt' in bad_posture_types and self.head_tilt_start_time is None:
-                self.head_tilt_start_time = current_time
-                self.current_head_tilt_recorded = False
-                self.head_tilt_popup_shown = False  # 新开始计时时重置弹窗状态
-                print(f"开始歪头计时: {self.head_tilt_start_time}")
-            elif 'head_tilt' not in bad_posture_types and self.head_tilt_start_time is not None:
-                # 如果不再是歪头，停止计时
-                head_tilt_duration = current_time - self.head_tilt_start_time
-                print(f"结束歪头状态，持续了: {head_tilt_duration:.1f}秒")
-                if self.current_head_tilt_recorded:
-                    self.head_tilt_durations.append(head_tilt_duration)
-                    print(f"记录歪头持续时间: {head_tilt_duration:.1f}秒")
-                self.head_tilt_start_time = None
-                self.head_tilt_popup_shown = False  # 停止计时时重置弹窗状态
-
-            # 开始脊柱侧弯计时或重置不需要的计时
-            if 'spinal_curvature' in bad_posture_types and self.spinal_curvature_start_time is None:
-                self.spinal_curvature_start_time = current_time
-                self.current_spinal_curvature_recorded = False
-                self.spinal_curvature_popup_shown = False  # 新开始计时时重置弹窗状态
-                print(f"开始脊柱侧弯计时: {self.spinal_curvature_start_time}")
-            elif 'spinal_curvature' not in bad_posture_types and self.spinal_curvature_start_time is not None:
-                # 如果不再是脊柱侧弯，停止计时
-                spinal_curvature_duration = current_time - self.spinal_curvature_start_time
-                print(f"结束脊柱侧弯状态，持续了: {spinal_curvature_duration:.1f}秒")
-                if self.current_spinal_curvature_recorded:
-                    self.spinal_curvature_durations.append(spinal_curvature_duration)
-                    print(f"记录脊柱侧弯持续时间: {spinal_curvature_duration:.1f}秒")
-                self.spinal_curvature_start_time = None
-                self.spinal_curvature_popup_shown = False  # 停止计时时重置弹窗状态
-
-        elif state != 'bad_posture' and old_state == 'bad_posture':
+                # 重置不再出现的姿势的弹窗状态（只涉及未在计时的姿势，不影响弹窗检查）
+                self._popup_shown &= active
+
+            # 新出现的姿势开始计时，消失的姿势结束计时
+            changed = active ^ self._active
+            if changed.any():
+                self._update_timers(changed & active, changed & self._active, current_time)
+            elif old_state != 'bad_posture':
+                self._refresh_deadlines()
+
+        elif old_state == 'bad_posture':
             # 结束不良姿势状态，回到良好状态
-            # 结束头部前倾计时
-            if self.forward_head_start_time is not None:
-                forward_head_duration = current_time - self.forward_head_start_time
-                print(f"结束头部前倾状态，持续了: {forward_head_duration:.1f}秒")
-                if self.current_forward_head_recorded:
-                    self.forward_head_durations.append(forward_head_duration)
-                    print(f"记录头部前倾持续时间: {forward_head_duration:.1f}秒")
-                self.forward_head_start_time = None
-                self.forward_head_popup_shown = False  # 重置弹窗状态
-
-            # 结束歪头计时
-            if self.head_tilt_start_time is not None:
-                head_tilt_duration = current_time - self.head_tilt_start_time
-                print(f"结束歪头状态，持续了: {head_tilt_duration:.1f}秒")
-                if self.current_head_tilt_recorded:
-                    self.head_tilt_durations.append(head_tilt_duration)
-                    print(f"记录歪头持续时间: {head_tilt_duration:.1f}秒")
-                self.head_tilt_start_time = None
-                self.head_tilt_popup_shown = False  # 重置弹窗状态
-
-            # 结束脊柱侧弯计时
-            if self.spinal_curvature_start_time is not None:
-                spinal_curvature_duration = current_time - self.spinal_curvature_start_time
-                print(f"结束脊柱侧弯状态，持续了: {spinal_curvature_duration:.1f}秒")
-                if self.current_spinal_curvature_recorded:
-                    self.spinal_curvature_durations.append(spinal_curvature_duration)
-                    print(f"记录脊柱侧弯持续时间: {spinal_curvature_duration:.1f}秒")
-                self.spinal_curvature_start_time = None
-                self.spinal_curvature_popup_shown = False  # 重置弹窗状态
+            if self._active.any():
+                self._update_timers(None, self._active.copy(), current_time)
 
             # 重置计时和提醒状态
             self.alert_played = False
             self.last_shown_posture = None  # 重置上次显示弹窗的姿势类型
 
+    def finish(self, current_time=None):
+        """
+        会话结束时调用：正在计时的不良姿势在 current_time（默认为当前时钟）结束，
+        已计数的片段照常计入统计并回调 on_episode，关闭页面时仍在进行的片段不会丢失
+        """
+        if self._active.any():
+            self._update_timers(None, self._active.copy(), self.clock() if current_time is None else current_time)
+
+    def _update_timers(self, starting, ending, current_time):
+        """
+        starting 中的姿势开始计时，ending 中的姿势结束计时（已计数的这一段记录持续时间）；
+        只在有姿势开始或结束的帧调用，逐个处理的循环只经过状态变化的姿势
+        """
+        changed = ending if starting is None else starting | ending
+        for i in np.flatnonzero(changed):
+            if ending[i]:
+                duration = current_time - self._start[i]
+                recorded = bool(self._recorded[i])
+                if recorded:
+                    self.episode_stats[i].add(float(duration))
+                    if self.on_episode is not None:
+                        self.on_episode(POSTURE_TYPES[i], float(self._start[i]), current_time)
+                event_log.emit('posture_end', session=self.session_id, posture=POSTURE_TYPES[i],
+                               label=POSTURE_LABELS[i], duration=duration, recorded=recorded)
+            else:
+                event_log.emit('posture_start', session=self.session_id, posture=POSTURE_TYPES[i],
+                               label=POSTURE_LABELS[i], time=current_time)
+
+        if starting is not None:
+            self._start[starting] = current_time
+            self._recorded[starting] = False
+            self._active[starting] = True
+        self._active[ending] = False
+        # 开始或停止计时时都重置弹窗状态
+        self._popup_shown[changed] = False
+        self._refresh_deadlines()
+
+    def _refresh_deadlines(self):
+        """重新计算计数与弹窗检查用的最早开始时间"""
+        pending = self._active & ~self._recorded
+        self._count_from = self._start[pending].min() if pending.any() else np.inf
+        pending = self._active & ~self._popup_shown
+        self._alert_from = self._start[pending].min() if pending.any() else np.inf
+
     def get_state(self):
         return self.curr_state
 
+    def update_durations(self):
+        """
+        刷新正在计时的姿势的持续时间并返回整列（按姿势 id 排列）；
+        已结束的姿势保留最后一次的持续时间
+        """
+        np.copyto(self._duration, self.clock() - self._start, where=self._active)
+        return self._duration
+
+    def get_duration(self, posture_type):
+        """获取某种不良姿势当前的持续时间"""
+        i = POSTURE_IDS[posture_type]
+        if self._active[i]:
+            self._duration[i] = self.clock() - self._start[i]
+        return float(self._duration[i])
+
     def get_forward_head_duration(self):
         """获取当前头部前倾持续时间"""
-        if self.forward_head_start_time is not None:
-            current_time = time.perf_counter()
-            self.forward_head_duration = current_time - self.forward_head_start_time
-        return self.forward_head_duration
+        return self.get_duration('forward_head')
 
     def get_head_tilt_duration(self):
         """获取当前歪头持续时间"""
-        if self.head_tilt_start_time is not None:
-            current_time = time.perf_counter()
-            self.head_tilt_duration = current_time - self.head_tilt_start_time
-        return self.head_tilt_duration
+        return self.get_duration('head_tilt')
 
     def get_spinal_curvature_duration(self):
         """获取当前脊柱侧弯持续时间"""
-        if self.spinal_curvature_start_time is not None:
-            current_time = time.perf_counter()
-            self.spinal_curvature_duration = current_time - self.spinal_curvature_start_time
-        return self.spinal_curvature_duration
+        return self.get_duration('spinal_curvature')
 
     def get_bad_posture_durations(self):
         """返回各类不良姿势的当前持续时间"""
-        return {
-            'forward_head': self.get_forward_head_duration(),
-            'head_tilt': self.get_head_tilt_duration(),
-            'spinal_curvature': self.get_spinal_curvature_duration(),
-        }
+        return dict(zip(POSTURE_TYPES, self.update_durations().tolist()))
 
     def should_trigger_alert(self, threshold_seconds=10.0):
         """
@@ -214,132 +256,72 @@ class StateTracker:
         # 如果当前帧已经触发过警报，不再重复触发
         if self.alert_triggered_this_frame:
             return False, None, 0.0
-            
+
         if self.curr_state != 'bad_posture':
             return False, None, 0.0
 
-        durations = self.get_bad_posture_durations()
-        
-        # 检查是否有不良姿势持续时间超过阈值且弹窗未显示
-        if durations['forward_head'] >= threshold_seconds and not self.forward_head_popup_shown:
-            # 标记该类型弹窗已显示
-            self.forward_head_popup_shown = True
-            self.alert_triggered_this_frame = True
-            self.last_shown_posture = 'forward_head'
-            return True, 'forward_head', durations['forward_head']
-        elif durations['head_tilt'] >= threshold_seconds and not self.head_tilt_popup_shown:
-            # 标记该类型弹窗已显示
-            self.head_tilt_popup_shown = True
-            self.alert_triggered_this_frame = True
-            self.last_shown_posture = 'head_tilt'
-            return True, 'head_tilt', durations['head_tilt']
-        elif durations['spinal_curvature'] >= threshold_seconds and not self.spinal_curvature_popup_shown:
-            # 标记该类型弹窗已显示
-            self.spinal_curvature_popup_shown = True
-            self.alert_triggered_this_frame = True
-            self.last_shown_posture = 'spinal_curvature'
-            return True, 'spinal_curvature', durations['spinal_curvature']
-        
-        return False, None, 0.0
-    
+        # 开始最早的候选姿势都没到阈值时，其他姿势也不会到
+        if self.clock() - self._alert_from < threshold_seconds:
+            return False, None, 0.0
+
+        # 按注册顺序取第一个正在计时、超过阈值且弹窗未显示的姿势
+        durations = self.update_durations()
+        candidates = np.flatnonzero(self._active & (durations >= threshold_seconds) & ~self._popup_shown)
+        if len(candidates) == 0:
+            return False, None, 0.0
+
+        i = candidates[0]
+        # 标记该类型弹窗已显示
+        self._popup_shown[i] = True
+        self._refresh_deadlines()
+        self.alert_triggered_this_frame = True
+        self.last_shown_posture = POSTURE_TYPES[i]
+        return True, POSTURE_TYPES[i], float(durations[i])
+
     def mark_popup_shown(self, posture_type):
         """
         标记特定类型的不良姿势弹窗已显示
         """
-        if posture_type == 'forward_head':
-            self.forward_head_popup_shown = True
-        elif posture_type == 'head_tilt':
-            self.head_tilt_popup_shown = True
-        elif posture_type == 'spinal_curvature':
-            self.spinal_curvature_popup_shown = True
+        if posture_type in POSTURE_IDS:
+            self._popup_shown[POSTURE_IDS[posture_type]] = True
+            self._refresh_deadlines()
         self.last_shown_posture = posture_type
 
     def check_and_record_bad_postures(self):
         """检查并记录各种不良姿势次数"""
-        # 检查头部前倾
-        forward_head_duration = self.get_forward_head_duration()
-        if (forward_head_duration > 15.0 and
-                not self.current_forward_head_recorded and
-                self.forward_head_start_time is not None):
-            self.forward_head_count += 1
-            self.current_forward_head_recorded = True
-            print(f"头部前倾次数加1，当前次数: {self.forward_head_count}")
-
-        # 检查歪头
-        head_tilt_duration = self.get_head_tilt_duration()
-        if (head_tilt_duration > 15.0 and
-                not self.current_head_tilt_recorded and
-                self.head_tilt_start_time is not None):
-            self.head_tilt_count += 1
-            self.current_head_tilt_recorded = True
-            print(f"歪头次数加1，当前次数: {self.head_tilt_count}")
-
-        # 检查脊柱侧弯
-        spinal_curvature_duration = self.get_spinal_curvature_duration()
-        if (spinal_curvature_duration > 15.0 and
-                not self.current_spinal_curvature_recorded and
-                self.spinal_curvature_start_time is not None):
-            self.spinal_curvature_count += 1
-            self.current_spinal_curvature_recorded = True
-            print(f"脊柱侧弯次数加1，当前次数: {self.spinal_curvature_count}")
+        # 开始最早的未计数姿势都没超过阈值时，其他姿势也不会超过
+        if not self.clock() - self._count_from > COUNT_THRESH:
+            return
+        durations = self.update_durations()
+        newly = (durations > COUNT_THRESH) & self._active & ~self._recorded
+        if newly.any():
+            self._count[newly] += 1
+            self._recorded[newly] = True
+            for i in np.flatnonzero(newly):
+                event_log.emit('posture_counted', session=self.session_id, posture=POSTURE_TYPES[i],
+                               label=POSTURE_LABELS[i], count=self._count[i])
+            self._refresh_deadlines()
 
     def get_all_stats(self):
-        """获取所有不良姿势统计信息"""
-        # 计算头部前倾平均持续时间
-        forward_head_avg = 0.0
-        if self.forward_head_count > 0 and len(self.forward_head_durations) > 0:
-            forward_head_avg = sum(self.forward_head_durations) / len(self.forward_head_durations)
-
-        # 计算歪头平均持续时间
-        head_tilt_avg = 0.0
-        if self.head_tilt_count > 0 and len(self.head_tilt_durations) > 0:
-            head_tilt_avg = sum(self.head_tilt_durations) / len(self.head_tilt_durations)
-
-        # 计算脊柱侧弯平均持续时间
-        spinal_curvature_avg = 0.0
-        if self.spinal_curvature_count > 0 and len(self.spinal_curvature_durations) > 0:
-            spinal_curvature_avg = sum(self.spinal_curvature_durations) / len(self.spinal_curvature_durations)
-
-        return {
-            'forward_head': {
-                'count': self.forward_head_count,
-                'avg_duration': forward_head_avg,
-                'durations': self.forward_head_durations.copy()
-            },
-            'head_tilt': {
-                'count': self.head_tilt_count,
-                'avg_duration': head_tilt_avg,
-                'durations': self.head_tilt_durations.copy()
-            },
-            'spinal_curvature': {
-                'count': self.spinal_curvature_count,
-                'avg_duration': spinal_curvature_avg,
-                'durations': self.spinal_curvature_durations.copy()
-            }
-        }
+        """获取所有不良姿势统计信息；开销与会话中记录的片段数无关"""
+        return {posture_type: posture_stats_entry(int(self._count[i]), self.episode_stats[i])
+                for i, posture_type in enumerate(POSTURE_TYPES)}
+
+    def _clear_timers(self):
+        self._active[:] = False
+        self._duration[:] = 0
+        self._recorded[:] = False
+        self._popup_shown[:] = False
+        self._count_from = self._alert_from = np.inf
+        self.alert_played = False
+        self.last_shown_posture = None
 
     def reset_state(self):
         self.state_seq = []
         self.curr_state = None
         self.prev_state = None
         # 重置计时
-        self.forward_head_start_time = None
-        self.forward_head_duration = 0
-        self.alert_played = False
-        self.current_forward_head_recorded = False
-        self.forward_head_popup_shown = False
-
-        self.head_tilt_start_time = None
-        self.head_tilt_duration = 0
-        self.current_head_tilt_recorded = False
-        self.head_tilt_popup_shown = False
-
-        self.spinal_curvature_start_time = None
-        self.spinal_curvature_duration = 0
-        self.current_spinal_curvature_recorded = False
-        self.spinal_curvature_popup_shown = False
-        
-        self.last_shown_posture = None
+        self._clear_timers()
 
     def before_process(self):
         # 保存之前的状态用于比较
@@ -350,7 +332,7 @@ class StateTracker:
 
         # 检查无活动状态
         if self.curr_state is None or self.curr_state == self.prev_state:
-            current_time = time.perf_counter()
+            current_time = self.clock()
             self.inactive_long += current_time - self.start_inactive_time
             self.start_inactive_time = current_time
             if self.inactive_long >= self.inactive_thresh:
@@ -370,30 +352,23 @@ class StateTracker:
         # 更新各种不良姿势持续时间并检查是否需要记录
         self.check_and_record_bad_postures()
 
-        # 获取当前各种不良姿势的持续时间
-        forward_head_duration = self.get_forward_head_duration()
-        head_tilt_duration = self.get_head_tilt_duration()
-        spinal_curvature_duration = self.get_spinal_curvature_duration()
-
         # 显示状态和持续时间
         if self.curr_state == 'bad_posture':
             # 构建状态文本
-            status_parts = []
-            if self.forward_head_start_time is not None:
-                status_parts.append(f"前倾: {forward_head_duration:.1f}秒")
-            if self.head_tilt_start_time is not None:
-                status_parts.append(f"歪头: {head_tilt_duration:.1f}秒")
-            if self.spinal_curvature_start_time is not None:
-                status_parts.append(f"侧弯: {spinal_curvature_duration:.1f}秒")
+            durations = self.update_durations()
+            status_parts = [f"{POSTURE_SHORT_LABELS[i]}: {durations[i]:.1f}秒"
+                            for i in np.flatnonzero(self._active)]
 
             duration_text = "不良坐姿 - " + " | ".join(status_parts)
             color = (221, 0, 0)  # 红色表示警告
 
             # 检查是否需要播放提示音（仅针对头部前倾）
-            if forward_head_duration > 15.0 and not self.alert_played:
+            forward_head_duration = durations[FORWARD_HEAD]
+            if forward_head_duration > COUNT_THRESH and not self.alert_played:
                 self.alert_played = True
                 # 设置标志，在trainer_process中播放音频
-                print(f"需要播放提示音，头部前倾持续时间: {forward_head_duration:.1f}秒")
+                event_log.emit('alert_needed', session=self.session_id, posture='forward_head',
+                               duration=forward_head_duration)
         else:
             duration_text = "姿态良好"
             color = (18, 185, 0)  # 绿色表示良好
@@ -414,51 +389,27 @@ class StateTracker:
         self.curr_state = None
         self.prev_state = None
 
-        self.start_inactive_time = time.perf_counter()
+        self.start_inactive_time = self.clock()
         self.inactive_long = 0.0  # INACTIVE_TIME
 
-        # 重置计时和统计
-        self.forward_head_start_time = None
-        self.forward_head_duration = 0
-        self.alert_played = False
-        self.current_forward_head_recorded = False
-        self.forward_head_popup_shown = False
-
-        self.head_tilt_start_time = None
-        self.head_tilt_duration = 0
-        self.current_head_tilt_recorded = False
-        self.head_tilt_popup_shown = False
-
-        self.spinal_curvature_start_time = None
-        self.spinal_curvature_duration = 0
-        self.current_spinal_curvature_recorded = False
-        self.spinal_curvature_popup_shown = False
-        
-        self.last_shown_posture = None
-        # 注意：这里不重置计数和持续时间列表，因为用户可能想要保留整个检测会话的统计
+        # 重置计时；不重置计数和持续时间列表，因为用户可能想要保留整个检测会话的统计
+        self._clear_timers()
 
     def reset_stats(self):
         """重置统计信息（用于开始新的检测会话）"""
-        self.forward_head_count = 0
-        self.forward_head_durations = []
-        self.current_forward_head_recorded = False
-
-        self.head_tilt_count = 0
-        self.head_tilt_durations = []
-        self.current_head_tilt_recorded = False
-
-        self.spinal_curvature_count = 0
-        self.spinal_curvature_durations = []
-        self.current_spinal_curvature_recorded = False
+        self._count[:] = 0
+        self._recorded[:] = False
+        self._refresh_deadlines()
+        self.episode_stats = [EpisodeStats() for _ in POSTURE_TYPES]
 
     def __reset_inactive_tracker__(self):
-        self.start_inactive_time = time.perf_counter()
+        self.start_inactive_time = self.clock()
         self.inactive_long = 0.0
 
     def should_play_alert(self):
         """检查是否需要播放提示音"""
         return (self.curr_state == 'bad_posture' and
-                self.get_forward_head_duration() > 15.0 and
+                self.get_forward_head_duration() > COUNT_THRESH and
                 not self.alert_played)
 
     def mark_alert_played(self):
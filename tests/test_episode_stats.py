@@ -0,0 +1,121 @@
+"""
+片段持续时间统计测试：流式均值/方差、分位数草图的误差，以及两份统计合并后与一次性统计全部样本的结果一致。
+
+用法：
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from episode_stats import EPISODE_QUANTILES, EpisodeStats, QuantileSketch, RunningStats
+
+
+def durations(seed, n):
+    """类似真实片段的持续时间：15 秒以上、长尾"""
+    return (15 + np.random.default_rng(seed).exponential(20, n)).tolist()
+
+
+class RunningStatsTest(unittest.TestCase):
+    def test_merge_matches_single_pass(self):
+        values = durations(0, 1000)
+        left, right = RunningStats(), RunningStats()
+        for value in values[:300]:
+            left.add(value)
+        for value in values[300:]:
+            right.add(value)
+        left.merge(right)
+
+        self.assertEqual(left.count, 1000)
+        self.assertAlmostEqual(left.mean, np.mean(values), places=9)
+        self.assertAlmostEqual(left.variance(), np.var(values, ddof=1), places=6)
+        self.assertEqual((left.min, left.max), (min(values), max(values)))
+
+    def test_merge_with_empty(self):
+        stats = RunningStats()
+        stats.add(20.0)
+        stats.merge(RunningStats())
+        self.assertEqual((stats.count, stats.mean, stats.variance()), (1, 20.0, 0.0))
+
+        empty = RunningStats()
+        empty.merge(stats)
+        self.assertEqual((empty.count, empty.mean, empty.min, empty.max), (1, 20.0, 20.0, 20.0))
+
+
+class QuantileSketchTest(unittest.TestCase):
+    def test_relative_accuracy(self):
+        values = durations(1, 5000)
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        estimates = sketch.quantiles(EPISODE_QUANTILES)
+        exact = np.percentile(values, EPISODE_QUANTILES, method='inverted_cdf')
+        np.testing.assert_allclose(estimates, exact, rtol=0.01)
+
+    def test_merge_equals_adding_all(self):
+        values = durations(2, 2000)
+        merged, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for value in values:
+            merged.add(value)
+        for value in values[:700]:
+            left.add(value)
+        for value in values[700:]:
+            right.add(value)
+        left.merge(right)
+        self.assertEqual(left.count, merged.count)
+        np.testing.assert_array_equal(left.counts, merged.counts)
+
+    def test_merge_rejects_different_parameters(self):
+        with self.assertRaises(ValueError):
+            QuantileSketch(relative_accuracy=0.01).merge(QuantileSketch(relative_accuracy=0.02))
+
+    def test_empty(self):
+        self.assertIsNone(QuantileSketch().quantiles(EPISODE_QUANTILES))
+
+
+class EpisodeStatsTest(unittest.TestCase):
+    def test_merge_summary(self):
+        values = durations(3, 150)
+        whole, left, right = EpisodeStats(recent=100), EpisodeStats(recent=100), EpisodeStats(recent=100)
+        for value in values:
+            whole.add(value)
+        for value in values[:60]:
+            left.add(value)
+        for value in values[60:]:
+            right.add(value)
+        left.merge(right)
+
+        merged, expected = left.summary(), whole.summary()
+        self.assertEqual(merged['total'], 150)
+        self.assertAlmostEqual(merged['mean'], expected['mean'], places=9)
+        self.assertAlmostEqual(merged['std'], expected['std'], places=9)
+        self.assertEqual((merged['min'], merged['max']), (expected['min'], expected['max']))
+        self.assertEqual(merged['quantiles'], expected['quantiles'])
+        # 最近记录按合并顺序保留最后 100 条，序号接着总次数
+        self.assertEqual(merged['recent'], values[50:])
+        self.assertEqual(merged['first_index'], 51)
+
+    def test_summary_cache_invalidated(self):
+        stats = EpisodeStats()
+        stats.add(20.0)
+        self.assertEqual(stats.summary()['total'], 1)
+        stats.add(30.0)
+        self.assertEqual(stats.summary()['total'], 2)
+        other = EpisodeStats()
+        other.add(40.0)
+        stats.merge(other)
+        self.assertEqual((stats.summary()['total'], stats.summary()['max']), (3, 40.0))
+
+    def test_empty_summary(self):
+        summary = EpisodeStats().summary()
+        self.assertEqual((summary['total'], summary['min'], summary['max']), (0, 0.0, 0.0))
+        self.assertEqual(summary['quantiles'], dict.fromkeys(EPISODE_QUANTILES, 0.0))
+        self.assertEqual(summary['first_index'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+分段片段合并测试：把同一段逐帧计时状态切成若干分段分别提取片段，合并后应与整段一次提取的结果相同。
+
+用法：
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from episodes import Episode, extract_episodes, merge_chunk_episodes, summarize_episodes
+
+POSTURES = ['forward_head', 'head_tilt']
+
+
+def split_and_merge(timestamps, active, bounds):
+    """按 bounds（帧下标）切分后逐段提取，再合并"""
+    chunks = []
+    edges = [0] + list(bounds) + [len(timestamps)]
+    for i, j in zip(edges, edges[1:]):
+        next_timestamp = timestamps[j] if j < len(timestamps) else None
+        chunks.append(extract_episodes(timestamps[i:j], active[i:j], POSTURES, next_timestamp))
+    return merge_chunk_episodes(chunks)
+
+
+class MergeChunkEpisodesTest(unittest.TestCase):
+    def test_episode_crossing_boundaries(self):
+        timestamps = np.arange(12, dtype=np.float64)
+        active = np.zeros((12, 2), dtype=bool)
+        active[2:10, 0] = True  # 跨越两个分段边界
+        active[3:4, 1] = True
+        active[8:12, 1] = True  # 持续到视频结尾
+
+        self.assertEqual(split_and_merge(timestamps, active, [4, 8]), [
+            Episode('forward_head', 2.0, 10.0, 9.0, False, False),
+            Episode('head_tilt', 3.0, 4.0, 3.0, False, False),
+            Episode('head_tilt', 8.0, 11.0, 11.0, False, True),
+        ])
+
+    def test_episode_ending_at_boundary(self):
+        timestamps = np.arange(8, dtype=np.float64)
+        active = np.zeros((8, 2), dtype=bool)
+        active[1:4, 0] = True  # 在分段末尾仍持续，下一分段第一帧已结束
+        active[5:6, 0] = True  # 隔一帧后的新片段不与上一段合并
+        active[4:7, 1] = True  # 恰好从分段边界开始
+        self.assertEqual(split_and_merge(timestamps, active, [4]), [
+            Episode('forward_head', 1.0, 4.0, 3.0, False, False),
+            Episode('head_tilt', 4.0, 7.0, 6.0, False, False),
+            Episode('forward_head', 5.0, 6.0, 5.0, False, False),
+        ])
+
+    def test_matches_single_pass_extraction(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            n = int(rng.integers(1, 60))
+            timestamps = np.cumsum(rng.uniform(0.02, 0.1, n))
+            # 长短不一的连续段
+            active = np.repeat(rng.random((n, 2)) < 0.5, rng.integers(1, 8), axis=0)[:n]
+            bounds = sorted(set(rng.integers(1, n, int(rng.integers(0, 5))).tolist())) if n > 1 else []
+            self.assertEqual(split_and_merge(timestamps, active, bounds),
+                             extract_episodes(timestamps, active, POSTURES))
+
+    def test_summary_counts_only_long_episodes(self):
+        episodes = [
+            Episode('forward_head', 0.0, 20.0, 19.5, False, False),
+            Episode('forward_head', 30.0, 40.0, 39.5, False, False),   # 不足 15 秒
+            Episode('head_tilt', 50.0, 80.0, 79.5, False, False),
+        ]
+        stats = summarize_episodes(episodes, POSTURES)
+        self.assertEqual((stats['forward_head']['count'], stats['forward_head']['durations']), (1, [20.0]))
+        self.assertEqual((stats['head_tilt']['count'], stats['head_tilt']['avg_duration']), (1, 30.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+分层指标历史测试：按帧时间写入合成指标，检查整秒/整分钟/整 10 分钟桶的逐级汇总、
+无效帧的处理、flush() 写入不足一个桶的数据，以及 on_bucket 回调。
+
+用法：
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from collections import namedtuple
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from metric_history import MetricHistory, STATE_CODES
+
+# 与 trainer_process 返回的 PostureMetrics 字段相同
+Metrics = namedtuple('Metrics', ['detected', 'head_forward_angle', 'tilt_deviation', 'shoulder_level_diff'])
+
+T0 = 6000.0  # 对齐到整 10 分钟
+FPS = 10
+FRAMES = 1250  # 125 秒
+
+
+def frame(i):
+    """第 i 帧：时间、指标、状态、正在计时的姿势"""
+    metrics = Metrics(i % 5 != 0, float(i), float(i % 7), float(-i))
+    bad = np.array([i % 2 == 0, False, True])
+    return T0 + i / FPS, metrics, 'bad_posture', bad
+
+
+class MetricHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.history = MetricHistory(raw_capacity=4096)
+        self.buckets = []
+        self.history.on_bucket = lambda resolution, bucket: self.buckets.append((resolution, float(bucket['time'])))
+        for i in range(FRAMES):
+            self.history.record(*frame(i))
+
+    def rows(self, level):
+        table = self.history.tiers[level].table
+        return table.tail(table.count)
+
+    def expected(self, first, last):
+        """帧 [first, last) 中有效帧指标的均值、最小值、最大值与有效帧数"""
+        frames = [frame(i)[1] for i in range(first, last)]
+        values = np.array([m[1:] for m in frames if m.detected], dtype=np.float64)
+        return values.mean(axis=0), values.min(axis=0), values.max(axis=0), len(values)
+
+    def test_cascade(self):
+        seconds, minutes, ten_minutes = self.rows(0), self.rows(1), self.rows(2)
+        # 还在累积的最后一秒、最后一分钟和第一个 10 分钟桶不包括在内
+        self.assertEqual(len(seconds), 124)
+        self.assertEqual(len(minutes), 2)
+        self.assertEqual(len(ten_minutes), 0)
+        np.testing.assert_array_equal(seconds['time'], T0 + np.arange(124))
+        np.testing.assert_array_equal(minutes['time'], [T0, T0 + 60])
+
+        mean, low, high, valid = self.expected(30, 40)
+        second = seconds[3]
+        self.assertEqual((second['frames'], second['valid']), (10, valid))
+        np.testing.assert_allclose(second['mean'], mean, rtol=1e-6)
+        np.testing.assert_array_equal(second['min'], low)
+        np.testing.assert_array_equal(second['max'], high)
+
+        mean, low, high, valid = self.expected(600, 1200)
+        minute = minutes[1]
+        self.assertEqual((minute['frames'], minute['valid']), (600, valid))
+        np.testing.assert_allclose(minute['mean'], mean, rtol=1e-5)
+        np.testing.assert_array_equal(minute['min'], low)
+        np.testing.assert_array_equal(minute['max'], high)
+        np.testing.assert_allclose(minute['bad'], [0.5, 0.0, 1.0])
+
+    def test_invalid_second(self):
+        history = MetricHistory()
+        for i in range(20):
+            timestamp, metrics, state, bad = frame(i)
+            history.record(timestamp, metrics._replace(detected=i >= 10), state, bad)
+        first = history.tiers[0].table.tail(1)[0]
+        self.assertEqual((first['frames'], first['valid']), (10, 0))
+        self.assertTrue(np.isnan(first['mean']).all())
+
+    def test_flush_writes_partial_buckets(self):
+        self.assertEqual(self.buckets.count((60, T0 + 60)), 1)
+        self.assertNotIn((600, T0), self.buckets)
+
+        self.history.flush()
+        self.assertEqual(len(self.rows(0)), 125)
+        self.assertEqual(len(self.rows(1)), 3)
+        ten_minutes = self.rows(2)
+        self.assertEqual(len(ten_minutes), 1)
+
+        mean, low, high, valid = self.expected(0, FRAMES)
+        self.assertEqual((ten_minutes[0]['frames'], ten_minutes[0]['valid']), (FRAMES, valid))
+        np.testing.assert_allclose(ten_minutes[0]['mean'], mean, rtol=1e-5)
+        np.testing.assert_array_equal(ten_minutes[0]['min'], low)
+        np.testing.assert_array_equal(ten_minutes[0]['max'], high)
+        # 每一层的最后一个桶都回调了一次
+        self.assertEqual(self.buckets[-3:], [(1, T0 + 124), (60, T0 + 120), (600, T0)])
+
+        # 再次 flush 没有新数据，不会重复写入
+        self.history.flush()
+        self.assertEqual(len(self.rows(2)), 1)
+        self.assertEqual(len(self.buckets), 125 + 3 + 1)
+
+    def test_record_after_flush(self):
+        self.history.flush()
+        self.history.record(*frame(FRAMES))
+        self.history.record(*frame(FRAMES + 10))
+        self.assertEqual(float(self.rows(0)[-1]['time']), T0 + FRAMES // FPS)
+        self.assertEqual(self.rows(0)[-1]['frames'], 1)
+
+    def test_recent_frames_and_series(self):
+        frames = self.history.frames(1.0)
+        self.assertEqual(len(frames), 10)
+        self.assertEqual(frames['state'][-1], STATE_CODES['bad_posture'])
+        resolution, rows = self.history.series(60)
+        self.assertEqual(resolution, 1)
+        self.assertEqual(len(rows), 59)
+        resolution, rows = self.history.series(3600)
+        self.assertEqual(resolution, 60)
+        self.assertEqual(len(rows), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+坐姿记录库测试：经后台写线程写入会话、片段与每分钟汇总后，用各查询读回，
+并检查 close() 提交队列中剩余的写入。
+
+用法：
+    python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from metric_history import bucket_dtype
+from posture_store import PostureStore
+from state_tracker import POSTURE_TYPES
+
+DAY = 86400.0
+
+
+def local_noon(days_ago=0):
+    """本地时间今天（或 days_ago 天前）的中午：片段都在中午附近，按日期汇总时不会跨天"""
+    today = time.localtime()
+    noon = time.mktime((today.tm_year, today.tm_mon, today.tm_mday, 12, 0, 0, 0, 0, -1))
+    return noon - days_ago * DAY
+
+
+def minute_bucket(mean, valid=60):
+    bucket = np.zeros((), dtype=bucket_dtype(len(POSTURE_TYPES)))
+    bucket['frames'] = 60
+    bucket['valid'] = valid
+    bucket['min'] = np.asarray(mean) - 1
+    bucket['mean'] = mean
+    bucket['max'] = np.asarray(mean) + 1
+    bucket['bad'] = [0.25, 0.0, 1.0]
+    return bucket
+
+
+class PostureStoreTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'posture.db')
+        self.store = PostureStore(self.path, flush_interval=0.05)
+        self.addCleanup(self.store.close)
+
+    def test_session_and_episodes(self):
+        yesterday, today = local_noon(1), local_noon()
+        self.store.start_session('a', yesterday)
+        self.store.add_episode('a', 'forward_head', yesterday + 10, yesterday + 30)
+        self.store.add_episode('a', 'head_tilt', yesterday + 40, yesterday + 60)
+        self.store.end_session('a', yesterday + 100, stats={'forward_head': {'count': 1}})
+        self.store.start_session('b', today)
+        self.store.add_episode('b', 'forward_head', today + 5, today + 25)
+        self.store.add_episode('b', 'forward_head', today + 50, today + 100)
+        self.assertTrue(self.store.flush())
+
+        self.assertEqual(self.store.sessions(yesterday - DAY, today + DAY), [
+            ('a', yesterday, yesterday + 100, {'forward_head': {'count': 1}}),
+            ('b', today, None, None),
+        ])
+        self.assertEqual(self.store.episodes_by_type('forward_head', yesterday - DAY, today + DAY), [
+            ('a', yesterday + 10, yesterday + 30, 20.0),
+            ('b', today + 5, today + 25, 20.0),
+            ('b', today + 50, today + 100, 50.0),
+        ])
+        self.assertEqual(len(self.store.episodes_by_type('forward_head', today, today + DAY)), 2)
+        self.assertEqual(len(self.store.episodes_by_type('forward_head', yesterday - DAY, today + DAY, limit=1)), 1)
+
+        summary = self.store.daily_summary(yesterday - DAY, today + DAY)
+        self.assertEqual([row[1:] for row in summary], [
+            ('forward_head', 1, 20.0, 20.0),
+            ('head_tilt', 1, 20.0, 20.0),
+            ('forward_head', 2, 35.0, 70.0),
+        ])
+        self.assertLess(summary[0][0], summary[2][0])
+
+    def test_end_session_keeps_saved_stats(self):
+        now = local_noon()
+        self.store.start_session('a', now)
+        self.store.start_session('a', now + 1)  # 重复开始不覆盖
+        self.store.end_session('a', now + 10, stats={'head_tilt': {'count': 2}})
+        self.store.end_session('a', now + 20)  # 会话关闭时只更新结束时间
+        self.store.flush()
+        self.assertEqual(self.store.sessions(now - 1, now + 1), [('a', now, now + 20, {'head_tilt': {'count': 2}})])
+
+    def test_minute_rollups(self):
+        minute = local_noon() - local_noon() % 60
+        self.store.add_minute_rollup('a', minute, minute_bucket([100.0, 5.0, 10.0]))
+        self.store.add_minute_rollup('a', minute + 60, minute_bucket([np.nan] * 3, valid=0))
+        self.store.add_minute_rollup('b', minute, minute_bucket([90.0, 1.0, 2.0]))
+        # 同一会话同一分钟再次写入时替换
+        self.store.add_minute_rollup('b', minute, minute_bucket([95.0, 1.0, 2.0]))
+        self.store.flush()
+
+        rows = self.store.minute_rollups(minute, minute + 120, session_id='a')
+        self.assertEqual([row['minute'] for row in rows], [minute, minute + 60])
+        self.assertEqual((rows[0]['frames'], rows[0]['valid']), (60, 60))
+        self.assertEqual((rows[0]['head_forward_angle_min'], rows[0]['head_forward_angle_mean'],
+                          rows[0]['head_forward_angle_max']), (99.0, 100.0, 101.0))
+        self.assertEqual(rows[0]['bad'], dict(zip(POSTURE_TYPES, [0.25, 0.0, 1.0])))
+        # 没有有效帧的分钟，指标存为 NULL
+        self.assertIsNone(rows[1]['tilt_deviation_mean'])
+
+        rows = self.store.minute_rollups(minute, minute + 60)
+        self.assertEqual(sorted((row['session_id'], row['head_forward_angle_mean']) for row in rows),
+                         [('a', 100.0), ('b', 95.0)])
+
+    def test_close_commits_pending_writes(self):
+        now = local_noon()
+        store = PostureStore(self.path, flush_interval=10.0)
+        store.start_session('c', now)
+        store.add_episode('c', 'spinal_curvature', now, now + 16)
+        store.close()
+        self.assertEqual(store.written, 2)
+        self.assertEqual(self.store.episodes_by_type('spinal_curvature', now - 1, now + 1),
+                         [('c', now, now + 16, 16.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
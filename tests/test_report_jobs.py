@@ -0,0 +1,100 @@
+"""
+报告任务测试：在本地启动 bench_reports 中的替身 chat/completions 服务，验证重试、磁盘缓存、相同请求去重与失败处理。
+不访问外部网络。
+
+用法：
+    python -m unittest discover tests
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from benchmarks.bench_reports import STATS_DATA, StandInServer
+from report_jobs import (DONE, FAILED, PENDING, RUNNING, ReportCache, ReportClient, ReportJobs, build_report_payload,
+                         payload_key)
+
+
+def wait(jobs, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while jobs.status(job_id).state not in (DONE, FAILED):
+        if time.monotonic() > deadline:
+            raise AssertionError(f"任务 {job_id} 在 {timeout} 秒内没有结束")
+        time.sleep(0.01)
+    return jobs.status(job_id)
+
+
+class ReportJobsTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.payload = build_report_payload(STATS_DATA)
+
+    def start_server(self, latency=0.0, failures=0):
+        server = StandInServer(latency, failures)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        server.url = f"http://127.0.0.1:{server.server_address[1]}/chat/completions"
+        return server
+
+    def make_jobs(self, server, retries=3):
+        jobs = ReportJobs(ReportClient(server.url, 'stand-in', retries=retries, backoff=0.01),
+                          ReportCache(self.cache_dir.name))
+        self.addCleanup(jobs.shutdown)
+        return jobs
+
+    def test_retries_503_then_succeeds(self):
+        server = self.start_server(failures=2)
+        jobs = self.make_jobs(server)
+        job = wait(jobs, jobs.submit(self.payload))
+        self.assertEqual(job.state, DONE)
+        self.assertTrue(job.report.startswith("替身报告"))
+        self.assertEqual(server.requests, 3)
+
+    def test_second_instance_reads_disk_cache(self):
+        server = self.start_server()
+        jobs = self.make_jobs(server)
+        self.assertEqual(wait(jobs, jobs.submit(self.payload)).state, DONE)
+        self.assertEqual(server.requests, 1)
+
+        # 相当于进程重启：新的执行器与新的内存缓存，只共用缓存目录
+        fresh = self.make_jobs(server)
+        job = fresh.status(fresh.submit(build_report_payload(dict(STATS_DATA))))
+        self.assertEqual(job.state, DONE)
+        self.assertTrue(job.cached)
+        self.assertTrue(job.report.startswith("替身报告"))
+        self.assertEqual(server.requests, 1)
+
+    def test_identical_inflight_request_is_deduplicated(self):
+        server = self.start_server(latency=0.3)
+        jobs = self.make_jobs(server)
+        first = jobs.submit(self.payload)
+        second = jobs.submit(build_report_payload(dict(STATS_DATA)))
+        self.assertEqual(first, second)
+        self.assertIn(jobs.status(first).state, (PENDING, RUNNING))
+        self.assertEqual(wait(jobs, first).state, DONE)
+        self.assertEqual(server.requests, 1)
+
+    def test_failed_job_is_not_cached(self):
+        server = self.start_server(failures=1000)
+        jobs = self.make_jobs(server, retries=1)
+        job_id = jobs.submit(self.payload)
+        job = wait(jobs, job_id)
+        self.assertEqual(job.state, FAILED)
+        self.assertIsNotNone(job.error)
+        self.assertEqual(server.requests, 2)
+        self.assertIsNone(jobs.cache.get(payload_key(self.payload)))
+        self.assertIsNone(ReportCache(self.cache_dir.name).get(job_id))
+
+        # 失败的任务可以重新提交，会再次访问服务而不是返回失败结果
+        self.assertEqual(wait(jobs, jobs.submit(self.payload)).state, FAILED)
+        self.assertEqual(server.requests, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+坐姿状态跟踪测试：用 FrameClock 按帧时间驱动 StateTracker，检查计时开始、超过 15 秒计数、弹窗提醒、
+片段结束、长时间无活动重置，以及 get_all_stats 与 on_episode 回调。
+期望的统计与改为计时表之前逐姿势实现的 StateTracker 在同一脚本上的结果相同。
+
+用法：
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.abspath(os.path.join(__file__, '../../')))
+
+from event_log import event_log
+from state_tracker import FrameClock, StateTracker
+
+COMPLETE_STATE_SEQUENCE = ['good_posture', 'bad_posture']
+INACTIVE_THRESH = 60.0
+
+# 每秒一帧的脚本：(起始秒, 结束秒（不含）, 状态, 不良姿势)
+SCRIPT = [
+    (0, 5, 'good_posture', []),
+    (5, 25, 'bad_posture', ['forward_head']),                        # 20 秒，计数
+    (25, 30, 'good_posture', []),
+    (30, 38, 'bad_posture', ['head_tilt']),                          # 8 秒，不计数
+    (38, 41, 'good_posture', []),
+    (41, 61, 'bad_posture', ['forward_head', 'spinal_curvature']),
+    (61, 71, 'bad_posture', ['spinal_curvature']),                   # 前倾 20 秒、侧弯 30 秒
+    (71, 76, 'good_posture', []),
+    (76, 160, 'bad_posture', ['head_tilt']),                         # 状态不变 60 秒后无活动重置
+]
+
+
+class StubFrameInstance:
+    """after_process 只用到的绘制接口"""
+
+    def put_text(self, **kwargs):
+        pass
+
+    def draw_text(self, **kwargs):
+        pass
+
+    def get_frame_height(self):
+        return 480
+
+    def get_frame_width(self):
+        return 640
+
+
+class StateTrackerTest(unittest.TestCase):
+    def setUp(self):
+        enabled = event_log.enabled
+        event_log.enabled = False
+        self.addCleanup(setattr, event_log, 'enabled', enabled)
+
+        self.clock = FrameClock()
+        self.tracker = StateTracker(COMPLETE_STATE_SEQUENCE, INACTIVE_THRESH, self.clock)
+        self.episodes = []
+        self.tracker.on_episode = lambda posture, start, end: self.episodes.append((posture, start, end))
+        self.frame_instance = StubFrameInstance()
+
+    def step(self, t, state, bad_posture_types):
+        """与 evaluate 相同的逐帧调用顺序，返回本帧的提醒检查结果"""
+        self.clock.set(float(t))
+        self.tracker.before_process()
+        self.tracker.set_state(state, bad_posture_types)
+        self.tracker.after_process(self.frame_instance)
+        return self.tracker.should_trigger_alert(10.0)
+
+    def run_script(self, until=None):
+        alerts = []
+        for first, last, state, bad_posture_types in SCRIPT:
+            for t in range(first, last):
+                if until is not None and t >= until:
+                    return alerts
+                alert_needed, posture, duration = self.step(t, state, bad_posture_types)
+                if alert_needed:
+                    alerts.append((t, posture, duration))
+        return alerts
+
+    def test_counts_after_fifteen_seconds(self):
+        self.run_script(until=21)
+        self.assertEqual(self.tracker.get_all_stats()['forward_head']['count'], 0)
+        self.assertEqual(self.tracker.get_duration('forward_head'), 15.0)
+
+        self.step(21, 'bad_posture', ['forward_head'])
+        self.assertEqual(self.tracker.get_all_stats()['forward_head']['count'], 1)
+        # 计数之后片段仍在持续，结束前不回调
+        self.assertEqual(self.episodes, [])
+
+    def test_alerts_once_per_episode(self):
+        alerts = self.run_script()
+        self.assertEqual(alerts, [
+            (15, 'forward_head', 10.0),
+            (51, 'forward_head', 10.0),
+            (52, 'spinal_curvature', 11.0),
+            (86, 'head_tilt', 10.0),
+            (147, 'head_tilt', 10.0),  # 无活动重置后重新开始计时
+        ])
+
+    def test_stats_and_episodes(self):
+        self.run_script()
+        stats = self.tracker.get_all_stats()
+        self.assertEqual({posture: (entry['count'], entry['avg_duration'], entry['durations'])
+                          for posture, entry in stats.items()}, {
+            'forward_head': (2, 20.0, [20.0, 20.0]),
+            # 歪头两次都超过 15 秒计数，但都在无活动重置时被丢弃，没有持续时间记录
+            'head_tilt': (2, 0.0, []),
+            'spinal_curvature': (1, 30.0, [30.0]),
+        })
+        self.assertEqual(stats['spinal_curvature']['min_duration'], 30.0)
+        self.assertEqual(stats['spinal_curvature']['first_index'], 1)
+        # 8 秒的歪头没有计数，不回调；无活动重置丢弃的计时也不回调
+        self.assertEqual(self.episodes, [
+            ('forward_head', 5.0, 25.0),
+            ('forward_head', 41.0, 61.0),
+            ('spinal_curvature', 41.0, 71.0),
+        ])
+
+    def test_inactivity_reset_restarts_timers(self):
+        self.run_script(until=137)
+        self.assertIsNone(self.tracker.get_state())
+        self.assertFalse(self.tracker.active_mask().any())
+
+        self.step(137, 'bad_posture', ['head_tilt'])
+        self.clock.set(140.0)
+        self.assertEqual(self.tracker.get_duration('head_tilt'), 3.0)
+
+    def test_finish_ends_open_episode(self):
+        self.run_script()
+        self.tracker.finish(160.0)
+        self.assertEqual(self.episodes[-1], ('head_tilt', 137.0, 160.0))
+        self.assertEqual(self.tracker.get_all_stats()['head_tilt']['durations'], [23.0])
+        self.assertFalse(self.tracker.active_mask().any())
+
+        # 没有正在计时的姿势时什么也不做
+        self.tracker.finish(170.0)
+        self.assertEqual(len(self.episodes), 4)
+
+    def test_reset_stats(self):
+        self.run_script()
+        self.tracker.reset_stats()
+        for entry in self.tracker.get_all_stats().values():
+            self.assertEqual((entry['count'], entry['durations']), (0, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,19 @@
 import cv2
 import math
-from frame_instance import FrameInstance
+from collections import namedtuple
+from frame_instance import FrameInstance, compile_angle_spec
 from state_tracker import StateTracker
+from event_log import event_log
+from utils import warm_glyph_cache
 import simpleaudio as sa
 import threading
 
 # 全局变量，用于跟踪音频的播放状态
 is_playing = False
 
+# 是否播放提示音；离线批量分析时关闭
+SOUND_ENABLED = True
+
 def play_sound(sound_file):
     global is_playing
     try:
@@ -15,9 +21,9 @@ def play_sound(sound_file):
         play_obj = wave_obj.play()
         play_obj.wait_done()
         is_playing = False  # 音频播放完成，更新状态
-        print(f"音频播放完成: {sound_file}")
+        event_log.emit('sound_done', sound=sound_file)
     except Exception as e:
-        print(f"播放音频失败: {e}")
+        event_log.emit('sound_error', sound=sound_file, error=str(e))
         is_playing = False
 
 # 坐姿状态序列
@@ -26,6 +32,39 @@ COMPLETE_STATE_SEQUENCE = ['good_posture', 'bad_posture']
 # 未活动监测的时长阈值，单位秒
 INACTIVE_THRESH = 60.0
 
+# trainer_process 读取的关键点（不含虹膜，因此不需要运行 Face Mesh）
+REQUIRED_FEATURES = ('nose', 'left_shldr', 'right_shldr', 'left_ear', 'right_ear')
+
+# 坐姿判定阈值：头部前倾角度（°）、歪头偏差（°）、肩膀高度差（像素），超过即判为对应的不良姿势
+PostureThresholds = namedtuple('PostureThresholds', ['forward_head', 'head_tilt', 'shoulder_level'])
+DEFAULT_THRESHOLDS = PostureThresholds(forward_head=107, head_tilt=15, shoulder_level=20)
+
+# trainer_process 返回的本帧规则输入：是否检测到全部所需关键点、前倾角、歪头偏差、肩膀高度差
+PostureMetrics = namedtuple('PostureMetrics',
+                            ['detected', 'head_forward_angle', 'tilt_deviation', 'shoulder_level_diff'])
+UNDETECTED_METRICS = PostureMetrics(False, 0, 0.0, 0)
+
+# 头部前倾角度：左肩-鼻子-右肩夹角
+HEAD_FORWARD_ANGLE = compile_angle_spec('left_shldr', 'nose', 'right_shldr')
+
+# HUD 上会出现的全部文字，启动时预先光栅化字形，逐帧绘制不再解析字体
+HUD_TEXTS = [
+    '请正对屏幕',
+    '确保摄像头能清晰看到您的头部和肩膀',
+    '处于不良坐姿',
+    '头部前倾 + 歪头 + 脊柱侧弯',
+    '头部歪斜',
+    '姿态良好',
+    '不良坐姿 - 前倾: 歪头: 侧弯: 秒 |',
+    '前倾角度: ° | 歪斜角度: 肩膀差: px',
+    '0123456789.',
+]
+
+try:
+    warm_glyph_cache(HUD_TEXTS)
+except OSError as e:
+    event_log.emit('font_error', error=str(e))
+
 def calculate_head_tilt_angle(left_ear, right_ear):
     """计算头部倾斜角度（修正版）"""
     if left_ear is None or right_ear is None:
@@ -58,7 +97,7 @@ def calculate_shoulder_level(left_shldr, right_shldr):
 
     return y_diff
 
-def trainer_process(frame_instance, state_tracker, frame_width, frame_height):
+def trainer_process(frame_instance, state_tracker, frame_width, frame_height, thresholds=DEFAULT_THRESHOLDS):
     global is_playing
 
     # 检测是否能够获取到鼻子、肩膀和耳朵的关键点
@@ -106,10 +145,11 @@ def trainer_process(frame_instance, state_tracker, frame_width, frame_height):
             font_scale=0.65,
             bg_color=(255, 153, 0),
         )
+        return UNDETECTED_METRICS
 
     else:
         # 成功检测到所有关键点，计算头部前倾角度和歪头角度
-        head_forward_angle = frame_instance.get_angle('left_shldr', 'nose', 'right_shldr')
+        head_forward_angle = frame_instance.get_angle(HEAD_FORWARD_ANGLE)
         head_tilt_angle = calculate_head_tilt_angle(left_ear_coord, right_ear_coord)
 
         # 计算与水平线(180度)的偏差
@@ -129,43 +169,42 @@ def trainer_process(frame_instance, state_tracker, frame_width, frame_height):
         frame_instance.line('left_ear', 'right_ear', 'pink', 2)  # 用粉色显示耳朵连线
 
         # 显示角度值
-        cv2.putText(frame_instance.frame, f'{head_forward_angle}°',
-                    (nose_coord[0] + 20, nose_coord[1]),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 230), 2)
+        frame_instance.put_text(f'{head_forward_angle}°',
+                                (nose_coord[0] + 20, nose_coord[1]),
+                                0.6, (255, 255, 230), 2, cv2.LINE_8)
 
         # 在耳朵连线中点显示歪头角度
         ear_mid_x = (left_ear_coord[0] + right_ear_coord[0]) // 2
         ear_mid_y = (left_ear_coord[1] + right_ear_coord[1]) // 2
-        cv2.putText(frame_instance.frame, f'{tilt_deviation:.1f}°',
-                    (ear_mid_x, ear_mid_y - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 192, 203), 2)
+        frame_instance.put_text(f'{tilt_deviation:.1f}°',
+                                (ear_mid_x, ear_mid_y - 10),
+                                0.5, (255, 192, 203), 2, cv2.LINE_8)
 
         # 在肩膀连线中点显示肩膀水平度
         shldr_mid_x = (left_shldr_coord[0] + right_shldr_coord[0]) // 2
         shldr_mid_y = (left_shldr_coord[1] + right_shldr_coord[1]) // 2
-        cv2.putText(frame_instance.frame, f'{shoulder_level_diff:.0f}px',
-                    (shldr_mid_x, shldr_mid_y - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+        frame_instance.put_text(f'{shoulder_level_diff:.0f}px',
+                                (shldr_mid_x, shldr_mid_y - 10),
+                                0.5, (0, 255, 255), 2, cv2.LINE_8)
 
         # 判断坐姿状态
-        has_forward_head = head_forward_angle > 107
-        has_head_tilt = tilt_deviation > 15  # 歪头偏差阈值设为15度
-        has_spinal_curvature = shoulder_level_diff > 20  # 脊柱侧弯阈值设为20像素
+        has_forward_head = head_forward_angle > thresholds.forward_head
+        has_head_tilt = tilt_deviation > thresholds.head_tilt
+        has_spinal_curvature = shoulder_level_diff > thresholds.shoulder_level
 
         # 绘制水平参考线（用于可视化肩膀水平度）
         if has_spinal_curvature:
             # 如果肩膀不平，绘制水平参考线
             ref_y = min(left_shldr_coord[1], right_shldr_coord[1]) + 20
-            cv2.line(frame_instance.frame,
-                     (left_shldr_coord[0] - 30, ref_y),
-                     (right_shldr_coord[0] + 30, ref_y),
-                     (0, 255, 255), 2, cv2.LINE_AA)
+            frame_instance.draw_line((left_shldr_coord[0] - 30, ref_y),
+                                     (right_shldr_coord[0] + 30, ref_y),
+                                     (0, 255, 255), 2, cv2.LINE_AA)
 
             # 标记较高的肩膀
             higher_shoulder = "左肩" if left_shldr_coord[1] < right_shldr_coord[1] else "右肩"
-            cv2.putText(frame_instance.frame, f'{higher_shoulder}较高',
-                        (shldr_mid_x, shldr_mid_y + 20),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+            frame_instance.put_text(f'{higher_shoulder}较高',
+                                    (shldr_mid_x, shldr_mid_y + 20),
+                                    0.5, (0, 255, 255), 2, cv2.LINE_8)
 
         # 设置状态 - 现在需要传递具体的不良姿势类型
         bad_posture_types = []
@@ -225,10 +264,10 @@ def trainer_process(frame_instance, state_tracker, frame_width, frame_height):
             )
 
             # 检查是否需要播放提示音（仅针对头部前倾）
-            if has_forward_head and state_tracker.should_play_alert() and not is_playing:
+            if SOUND_ENABLED and has_forward_head and state_tracker.should_play_alert() and not is_playing:
                 # 播放提示音
                 is_playing = True
-                print("开始播放提示音")
+                event_log.emit('sound_start', sound='incorrect')
                 sound_thread = threading.Thread(target=play_sound, args=("incorrect",))
                 sound_thread.start()
                 state_tracker.mark_alert_played()
@@ -254,4 +293,6 @@ def trainer_process(frame_instance, state_tracker, frame_width, frame_height):
                 text_color=(255, 255, 230),
                 font_scale=0.6,
                 bg_color=(18, 185, 0),
-            )
\ No newline at end of file
+            )
+
+        return PostureMetrics(True, head_forward_angle, tilt_deviation, shoulder_level_diff)
\ No newline at end of file
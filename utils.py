@@ -41,8 +41,125 @@ def draw_dotted_line(frame, lm_coord, start, end, line_color):
     return frame
 
 
+import threading
+from collections import OrderedDict
 from PIL import Image, ImageDraw, ImageFont
 
+FONT_PATH = "simhei.ttf"  # 字体文件路径
+FONT_SIZE = 20  # 字体大小
+GLYPH_CACHE_SIZE = 4096  # 字形缓存的最大字形数，超出时淘汰最久未用的
+
+# 进程级字体注册表与字形缓存，避免逐帧打开、解析字体文件；
+# 页面线程与各会话的推理线程都会绘制文字，缓存的读写都在锁内进行
+_font_registry = {}
+_font_lock = threading.Lock()
+_glyph_cache = OrderedDict()
+_glyph_lock = threading.Lock()
+
+
+def get_font(path=None, size=None):
+    """按 (路径, 字号) 返回已加载的字体，同一字体只解析一次"""
+    key = (path or FONT_PATH, size or FONT_SIZE)
+    font = _font_registry.get(key)
+    if font is None:
+        with _font_lock:
+            font = _font_registry.get(key)
+            if font is None:
+                font = ImageFont.truetype(key[0], key[1], encoding="utf-8")
+                _font_registry[key] = font
+    return font
+
+
+def get_glyph(ch, path=None, size=None):
+    """
+    返回单个字符预光栅化后的字形
+    (灰度掩码, 相对书写原点的左偏移, 上偏移, 步进宽度)
+    """
+    key = (path or FONT_PATH, size or FONT_SIZE, ch)
+    with _glyph_lock:
+        glyph = _glyph_cache.get(key)
+        if glyph is not None:
+            _glyph_cache.move_to_end(key)
+            return glyph
+
+        # 未命中时在锁内光栅化：同一字形只生成一次，也不会有两个线程同时使用同一个字体对象
+        font = get_font(path, size)
+        left, top, right, bottom = font.getbbox(ch)
+        if right > left and bottom > top:
+            glyph_img = Image.new('L', (right - left, bottom - top), 0)
+            ImageDraw.Draw(glyph_img).text((-left, -top), ch, fill=255, font=font)
+            mask = np.array(glyph_img)
+        else:
+            # 空格等不可见字符只有步进宽度
+            mask = np.zeros((0, 0), dtype=np.uint8)
+        glyph = (mask, left, top, font.getlength(ch))
+        _glyph_cache[key] = glyph
+        if len(_glyph_cache) > GLYPH_CACHE_SIZE:
+            _glyph_cache.popitem(last=False)
+    return glyph
+
+
+def warm_glyph_cache(texts, path=None, size=None):
+    """预先光栅化给定文本中出现的全部字符"""
+    for ch in set(''.join(texts)):
+        get_glyph(ch, path, size)
+
+
+def _layout_glyphs(text, path, size):
+    x = 0.0
+    placed = []
+    for ch in text:
+        mask, left, top, advance = get_glyph(ch, path, size)
+        if mask.size:
+            placed.append((int(round(x)) + left, top, mask))
+        x += advance
+    return placed
+
+
+def _placed_bbox(placed):
+    if not placed:
+        return 0, 0, 0, 0
+    left = min(gx for gx, gy, mask in placed)
+    top = min(gy for gx, gy, mask in placed)
+    right = max(gx + mask.shape[1] for gx, gy, mask in placed)
+    bottom = max(gy + mask.shape[0] for gx, gy, mask in placed)
+    return left, top, right, bottom
+
+
+def text_bbox(text, path=None, size=None):
+    """与 font.getbbox 等价，但只使用缓存的字形度量"""
+    return _placed_bbox(_layout_glyphs(text, path, size))
+
+
+def rasterize_text(text, path=None, size=None):
+    """
+    用缓存字形拼出整行文本的灰度掩码
+    返回 (掩码, (左偏移, 上偏移))，偏移相对于 PIL 的书写原点
+    """
+    placed = _layout_glyphs(text, path, size)
+    left, top, right, bottom = _placed_bbox(placed)
+    canvas = np.zeros((bottom - top, right - left), dtype=np.uint8)
+    for gx, gy, mask in placed:
+        h, w = mask.shape
+        region = canvas[gy - top:gy - top + h, gx - left:gx - left + w]
+        np.maximum(region, mask, out=region)
+    return canvas, (left, top)
+
+
+def blend_mask(img, mask, x, y, color):
+    """按灰度掩码把纯色原地混合到 img 的 (x, y) 处，只访问掩码覆盖的区域"""
+    h, w = mask.shape
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, img.shape[1]), min(y + h, img.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return img
+
+    roi = img[y0:y1, x0:x1]
+    alpha = mask[y0 - y:y1 - y, x0 - x:x1 - x, None].astype(np.uint16)
+    color = np.asarray(color, dtype=np.uint16)
+    roi[...] = (roi * (255 - alpha) + color * alpha + 127) // 255
+    return img
+
 
 def draw_zh(
         img,
@@ -50,21 +167,30 @@ def draw_zh(
         pos,
         text_color,
 ):
-    # cv2读取图
-    cv2img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)  # cv2和PIL中颜色的hex码的储存顺序不同
-    pil_img = Image.fromarray(cv2img)
-
-    # PIL图片上打印汉字
-    draw = ImageDraw.Draw(pil_img)  # 图片上打印
-    font = ImageFont.truetype("simhei.ttf", 20, encoding="utf-8")  # 参数1：字体文件路径，参数2：字体大小
-    text_color_bgr = (text_color[2], text_color[1], text_color[0])  # 将RGB转换为BGR
-    draw.text(pos, msg, text_color, font=font)  # 参数1：打印坐标，参数2：文本，参数3：字体颜色，参数4：字体
-
-    # PIL图片转cv2 图片
-    img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+    # 只在文字包围盒内原地混合，不再整帧做颜色转换和 PIL 往返
+    mask, (offset_x, offset_y) = rasterize_text(msg)
+    if mask.size:
+        # 旧实现先互换通道再绘制，文字颜色实际按逆序写入画面，这里保持同样的显示效果
+        blend_mask(img, mask, int(pos[0]) + offset_x, int(pos[1]) + offset_y, tuple(text_color)[::-1])
     return img
 
 
+def label_layout(text, pos=(0, 0), font_scale=1, box_offset=(20, 10)):
+    """
+    计算 draw_text 的排版
+    返回 (背景框左上角, 背景框右下角, 文字书写原点)
+    """
+    left, top, right, bottom = text_bbox(text)
+    text_w = right - left
+    text_h = bottom - top
+    x, y = pos
+
+    rec_start = tuple(p - o for p, o in zip(pos, box_offset))
+    rec_end = tuple(m + n - o for m, n, o in zip((x + text_w, y + text_h), box_offset, (25, 0)))
+    text_pos = (int(rec_start[0] + 10), int(y + text_h + font_scale) - 19)
+    return rec_start, rec_end, text_pos
+
+
 def draw_text(
         img,
         text,
@@ -77,25 +203,15 @@ def draw_text(
         text_color_bg=(0, 0, 0),
         box_offset=(20, 10),
 ):
-    msg = text
-    offset = box_offset
-    x, y = pos
-
-    font = ImageFont.truetype("simhei.ttf", 20, encoding="utf-8")  # 参数1：字体文件路径，参数2：字体大小
-    left, top, right, bottom = font.getbbox(msg)
-    text_w = right - left
-    text_h = bottom - top
-
     # text_size, _ = cv2.getTextSize(msg, font, font_scale, font_thickness)
     # text_w, text_h = text_size
-    rec_start = tuple(p - o for p, o in zip(pos, offset))
-    rec_end = tuple(m + n - o for m, n, o in zip((x + text_w, y + text_h), offset, (25, 0)))
+    rec_start, rec_end, text_pos = label_layout(text, pos, font_scale, box_offset)
 
     img = draw_rounded_rect(img, rec_start, rec_end, width, text_color_bg)
 
     img = draw_zh(img,
-                  msg,
-                  (int(rec_start[0] + 10), int(y + text_h + font_scale) - 19),
+                  text,
+                  text_pos,
                   text_color,
                   )
 
@@ -118,6 +234,57 @@ def find_angle(p1, p2, ref_pt=np.array([0, 0])):
         return int(degree)
 
 
+# find_angle 以 int(180 / pi) = 57 作为弧度换算系数，现有阈值（如前倾 107°）都据此标定，批量版本保持一致
+ANGLE_SCALE = int(180 / np.pi)
+
+# 角度规格中的参考方向：第三个点取顶点正上方/正左方/正下方/正右方的画面边缘
+REF_VERTICAL = -1
+REF_HORIZONTAL = -2
+REF_NVERTICAL = -3
+REF_NHORIZONTAL = -4
+
+
+def find_angles(triplets):
+    """
+    批量计算夹角，triplets 形状为 (..., 3, 2)，每组依次为 (点1, 顶点, 点3)
+    返回形状 (...) 的整数角度，与 find_angle 的取整方式一致；退化的点组记为 0
+    """
+    triplets = np.asarray(triplets, dtype=np.float64)
+    v1 = triplets[..., 0, :] - triplets[..., 1, :]
+    v2 = triplets[..., 2, :] - triplets[..., 1, :]
+
+    dot = np.einsum('...i,...i->...', v1, v2)
+    norms = np.sqrt(np.einsum('...i,...i->...', v1, v1)) * np.sqrt(np.einsum('...i,...i->...', v2, v2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_theta = dot / norms
+    theta = np.arccos(np.clip(cos_theta, -1.0, 1.0))
+
+    return np.nan_to_num(ANGLE_SCALE * theta).astype(np.int64)
+
+
+def angle_triplets(points, specs, frame_width, frame_height):
+    """
+    按角度规格从关键点数组中取出点组
+    points 形状为 (..., 33, 2)（单帧或多帧录制），specs 为 (K, 3) 整数下标，
+    返回 (..., K, 3, 2)，可直接交给 find_angles
+    """
+    specs = np.asarray(specs, dtype=np.intp).reshape(-1, 3)
+    index = np.where(specs < 0, specs[:, 1:2], specs)
+    triplets = np.take(points, index, axis=-2).astype(np.float64)
+
+    references = {
+        REF_VERTICAL: (1, 0),
+        REF_HORIZONTAL: (0, 0),
+        REF_NVERTICAL: (1, frame_height),
+        REF_NHORIZONTAL: (0, frame_width),
+    }
+    for code, (axis, value) in references.items():
+        rows, cols = np.nonzero(specs == code)
+        if len(rows):
+            triplets[..., rows, cols, axis] = value
+    return triplets
+
+
 def get_landmark_array(pose_landmark, key, frame_width, frame_height):
     denorm_x = int(pose_landmark[key].x * frame_width)
     denorm_y = int(pose_landmark[key].y * frame_height)
@@ -125,6 +292,37 @@ def get_landmark_array(pose_landmark, key, frame_width, frame_height):
     return np.array([denorm_x, denorm_y])
 
 
+def landmarks_to_array(landmarks):
+    """把 MediaPipe 关键点列表一次性转成 (N, 4) float32 数组 (x, y, z, visibility)，坐标为归一化值"""
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks], dtype=np.float32)
+
+
+def pose_result_array(result):
+    """
+    取姿态结果的归一化 (33, 4) 数组，未检测到人体时返回 None
+    兼容 MediaPipe 原始结果与带 landmark_array 的数组结果
+    """
+    array = getattr(result, 'landmark_array', None)
+    if array is None and result.pose_landmarks:
+        array = landmarks_to_array(result.pose_landmarks.landmark)
+    return array
+
+
+def face_result_array(result):
+    """取 Face Mesh 结果中第一张人脸的归一化 (N, 4) 数组，兼容数组结果，未检测到时返回 None"""
+    if result is None:
+        return None
+    array = getattr(result, 'landmark_array', None)
+    if array is None and result.multi_face_landmarks:
+        array = landmarks_to_array(result.multi_face_landmarks[0].landmark)
+    return array
+
+
+def denormalize_landmarks(landmarks, frame_width, frame_height):
+    """一次向量化乘法把归一化关键点换算到像素坐标（z 与 x 同尺度）"""
+    return landmarks * np.array([frame_width, frame_height, frame_width, 1.0], dtype=np.float32)
+
+
 dict_features = {
     'nose': 0,
     'left_eye_inner': 1,  # 左眼内眼角